@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Category, Course, Module, Lesson
+
+from apps.enrollments.models import Enrollment
+from .models import (
+    Category, Course, Module, Lesson, CourseFacetCount, RelatedCourse, SearchIndexChange, UserRecommendation,
+)
+from .outline import recompute_positions
 
 
 @admin.register(Category)
@@ -44,6 +49,17 @@ class CourseAdmin(admin.ModelAdmin):
         }),
     )
 
+    actions = ['recompute_progress']
+
+    def recompute_progress(self, request, queryset):
+        updated = 0
+        for course in queryset:
+            recompute_positions(course.pk)
+            updated += Enrollment.recompute_course_progress(course.pk)
+        self.message_user(request, f"Progression recalculée pour {updated} inscriptions")
+
+    recompute_progress.short_description = "Recalculer la progression des inscrits"
+
 
 class LessonInline(admin.TabularInline):
     model = Lesson
@@ -64,4 +80,31 @@ class LessonAdmin(admin.ModelAdmin):
     list_display = ['title', 'module', 'lesson_type', 'duration', 'order', 'is_published']
     list_filter = ['lesson_type', 'is_published', 'is_preview']
     search_fields = ['title', 'module__title']
-    prepopulated_fields = {'slug': ('title',)}
\ No newline at end of file
+    prepopulated_fields = {'slug': ('title',)}
+
+
+@admin.register(CourseFacetCount)
+class CourseFacetCountAdmin(admin.ModelAdmin):
+    list_display = ['category', 'difficulty', 'price_bucket', 'count']
+    list_filter = ['difficulty', 'price_bucket']
+    readonly_fields = ['category', 'difficulty', 'price_bucket', 'count']
+
+
+@admin.register(UserRecommendation)
+class UserRecommendationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'course', 'rank', 'score']
+    search_fields = ['user__email', 'course__title']
+    raw_id_fields = ['user', 'course']
+
+
+@admin.register(RelatedCourse)
+class RelatedCourseAdmin(admin.ModelAdmin):
+    list_display = ['course', 'related', 'rank', 'score']
+    search_fields = ['course__title', 'related__title']
+    raw_id_fields = ['course', 'related']
+
+
+@admin.register(SearchIndexChange)
+class SearchIndexChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'course_id', 'created_at']
+    readonly_fields = ['course_id', 'created_at']
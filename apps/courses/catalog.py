@@ -0,0 +1,362 @@
+# apps/courses/catalog.py
+"""
+Instantané du catalogue - WIM Platform
+Colonnes NumPy des cours publiés, partagées entre les workers gunicorn par un
+fichier mappé en mémoire et remplacé atomiquement après chaque modification
+(les compteurs de popularité sont regroupés périodiquement, et un seul
+worker reconstruit pour une même série de modifications).
+Le filtrage et le tri se font en mémoire ; la base ne sert plus qu'à
+hydrater les cours affichés.
+"""
+
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .pagination import KeysetPage, decode_cursor, encode_cursor
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Champs du cours présents dans l'instantané
+SNAPSHOT_FIELDS = {
+    'is_published', 'slug', 'title', 'category', 'category_id', 'difficulty',
+    'price', 'rating', 'total_students', 'created_at',
+}
+
+# Compteurs de popularité (inscriptions, avis) : reconstruction groupée périodique,
+# les tris par popularité ou par note ont au plus CATALOG_POPULARITY_REBUILD_INTERVAL de retard
+POPULARITY_FIELDS = {'rating', 'total_students'}
+
+# Tri du catalogue -> (colonne, décroissant)
+SORT_COLUMNS = {
+    '-created_at': ('created_at', True),
+    'title': ('title', False),
+    '-rating': ('rating', True),
+    'price': ('price', False),
+    '-total_students': ('total_students', True),
+}
+
+CHECK_INTERVAL = 1.0
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def snapshot_path():
+    return str(getattr(settings, 'CATALOG_SNAPSHOT_PATH', settings.BASE_DIR / 'var' / 'catalog_snapshot.npy'))
+
+
+def difficulty_codes():
+    from .models import Course
+    return {code: index for index, (code, _) in enumerate(Course.DIFFICULTY_CHOICES)}
+
+
+def to_timestamp(value):
+    """datetime -> microsecondes depuis l'epoch (entier)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+# ----------------------------------------------------------------------
+# Construction
+# ----------------------------------------------------------------------
+
+def build_array():
+    """Charge les cours publiés dans un tableau structuré NumPy"""
+    from .models import Course
+
+    # Ordre des titres donné par la base (sa collation), pas par les octets UTF-8
+    rows = list(Course.objects.filter(is_published=True).order_by('title', 'id').values_list(
+        'id', 'slug', 'title', 'category_id', 'difficulty', 'price', 'rating', 'total_students', 'created_at'
+    ))
+    codes = difficulty_codes()
+
+    title_ranks, rank = [], -1
+    for index, row in enumerate(rows):
+        if not index or row[2] != rows[index - 1][2]:
+            rank += 1
+        title_ranks.append(rank)
+
+    slugs = [row[1].encode() for row in rows]
+    titles = [row[2].encode() for row in rows]
+
+    dtype = np.dtype([
+        ('id', np.int64),
+        ('category_id', np.int64),
+        ('difficulty', np.int8),
+        ('price', np.float64),
+        ('rating', np.float64),
+        ('total_students', np.int64),
+        ('created_at', np.int64),
+        ('slug', f'S{max(map(len, slugs), default=1)}'),
+        ('title', f'S{max(map(len, titles), default=1)}'),
+        ('title_rank', np.int64),
+    ])
+
+    data = np.zeros(len(rows), dtype=dtype)
+    for i, (pk, _, _, category_id, difficulty, price, rating, students, created_at) in enumerate(rows):
+        data[i] = (
+            pk, category_id or 0, codes.get(difficulty, -1), float(price), float(rating),
+            students, to_timestamp(created_at), slugs[i], titles[i], title_ranks[i],
+        )
+    return np.sort(data, order='id')
+
+
+def rebuild():
+    """Reconstruit l'instantané et le remplace atomiquement sur disque"""
+    started = time.monotonic()
+    # Date de lecture de la base, portée par la date de modification du fichier
+    read_at = time.time()
+    data = build_array()
+
+    path = snapshot_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npy.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            np.save(handle, data, allow_pickle=False)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.utime(tmp_path, (read_at, read_at))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    logger.info("Instantané du catalogue reconstruit: %s cours en %.2fs", len(data), time.monotonic() - started)
+    return len(data)
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Verrou exclusif partagé par les workers (un seul reconstruit à la fois)"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def rebuild_since(changed_at):
+    """
+    Reconstruit l'instantané sauf si un autre worker l'a déjà reconstruit à
+    partir d'une lecture postérieure à `changed_at` ; retourne None dans ce cas
+    """
+    path = snapshot_path()
+    with _file_lock(path + '.lock'):
+        try:
+            if os.stat(path).st_mtime >= changed_at:
+                return None
+        except FileNotFoundError:
+            pass
+        return rebuild()
+
+
+class _RebuildScheduler:
+    """Regroupe les reconstructions déclenchées en rafale dans un worker"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.timer = None
+        self.changed_at = 0.0
+
+    def schedule(self):
+        with self.lock:
+            # Appelé après validation : la dernière modification à couvrir
+            self.changed_at = time.time()
+            if self.timer is not None:
+                return
+            self.timer = threading.Timer(self.delay, self._run)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _run(self):
+        with self.lock:
+            self.timer = None
+            changed_at = self.changed_at
+        try:
+            rebuild_since(changed_at)
+        except Exception as e:
+            logger.error(f"Erreur reconstruction instantané catalogue: {e}")
+        finally:
+            connection.close()
+
+
+_scheduler = _RebuildScheduler(getattr(settings, 'CATALOG_SNAPSHOT_REBUILD_DELAY', 2.0))
+_popularity_scheduler = _RebuildScheduler(getattr(settings, 'CATALOG_POPULARITY_REBUILD_INTERVAL', 60.0))
+
+
+def schedule_rebuild():
+    _scheduler.schedule()
+
+
+def schedule_popularity_rebuild():
+    """Compteurs seulement : une reconstruction par intervalle, la première qui passe couvre les autres"""
+    _popularity_scheduler.schedule()
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+class CatalogSnapshot:
+    """Vue en lecture seule sur les colonnes du catalogue"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def mask(self, category_id=None, difficulty=None, price=None):
+        data = self.data
+        mask = np.ones(len(data), dtype=bool)
+        if category_id is not None:
+            mask &= data['category_id'] == category_id
+        if difficulty:
+            mask &= data['difficulty'] == difficulty_codes().get(difficulty, -1)
+        if price == 'free':
+            mask &= data['price'] <= 0
+        elif price == 'paid':
+            mask &= data['price'] > 0
+        return mask
+
+    def sort_keys(self, column):
+        # Les titres se trient sur leur rang dans l'ordre de la base
+        return self.data['title_rank' if column == 'title' else column]
+
+    def _cursor_value(self, column, value):
+        from .models import Course
+
+        value = Course._meta.get_field(column).to_python(value)
+        if column == 'created_at':
+            return to_timestamp(value)
+        if column == 'title':
+            data = self.data
+            ranks = data['title_rank'][data['title'] == value.encode()]
+            if len(ranks):
+                return ranks[0]
+            # Titre absent de l'instantané (modifié depuis) : placé entre ses voisins d'octets
+            lower = data['title_rank'][data['title'] < value.encode()]
+            return (lower.max() if len(lower) else -1) + 0.5
+        return float(value) if column in ('price', 'rating') else int(value)
+
+    def cursor_value(self, sort, pk):
+        """Valeur de tri d'un cours dans l'instantané, au format du curseur de la base"""
+        column = SORT_COLUMNS[sort][0]
+        value = self.data[column][self.data['id'] == pk][0]
+        if column == 'created_at':
+            return (EPOCH + timedelta(microseconds=int(value))).isoformat()
+        if column == 'title':
+            return value.decode()
+        return float(value) if column in ('price', 'rating') else int(value)
+
+    def select(self, sort='-created_at', limit=12, after=None, **filters):
+        """Identifiants des cours filtrés et triés (id en départage)"""
+        column, descending = SORT_COLUMNS.get(sort, SORT_COLUMNS['-created_at'])
+        data = self.data
+        mask = self.mask(**filters)
+
+        if after is not None:
+            value, last_id = after
+            value = self._cursor_value(column, value)
+            values, ids = self.sort_keys(column), data['id']
+            if descending:
+                mask &= (values < value) | ((values == value) & (ids < last_id))
+            else:
+                mask &= (values > value) | ((values == value) & (ids > last_id))
+
+        rows, keys = data[mask], self.sort_keys(column)[mask]
+        if descending:
+            order = np.lexsort((-rows['id'], -keys))
+        else:
+            order = np.lexsort((rows['id'], keys))
+
+        if limit is not None:
+            order = order[:limit]
+        return rows['id'][order].tolist()
+
+
+_state = {'snapshot': None, 'signature': None, 'checked_at': 0.0}
+_state_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Instantané courant du processus, rechargé si le fichier a changé"""
+    now = time.monotonic()
+    if _state['snapshot'] is not None and now - _state['checked_at'] < CHECK_INTERVAL:
+        return _state['snapshot']
+
+    with _state_lock:
+        path = snapshot_path()
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            rebuild()
+            stat = os.stat(path)
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != _state['signature']:
+            data = np.load(path, mmap_mode='r', allow_pickle=False)
+            if 'title_rank' not in data.dtype.names:
+                # Instantané écrit par une version antérieure
+                rebuild()
+                data = np.load(path, mmap_mode='r', allow_pickle=False)
+                stat = os.stat(path)
+                signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            _state['snapshot'] = CatalogSnapshot(data)
+            _state['signature'] = signature
+        _state['checked_at'] = now
+        return _state['snapshot']
+
+
+def hydrate(ids, queryset=None):
+    """Charge les cours d'une liste d'identifiants en conservant l'ordre"""
+    from .models import Course
+
+    if queryset is None:
+        queryset = Course.objects.filter(is_published=True).select_related('category', 'instructor')
+    courses = queryset.in_bulk(ids)
+    return [courses[pk] for pk in ids if pk in courses]
+
+
+def select_courses(sort='-rating', limit=12, **filters):
+    """Cours filtrés et triés en mémoire, hydratés depuis la base"""
+    return hydrate(get_snapshot().select(sort=sort, limit=limit, **filters))
+
+
+def keyset_page(sort, cursor=None, per_page=12, **filters):
+    """Page par curseur calculée sur l'instantané (même format de curseur que la base)"""
+    snapshot = get_snapshot()
+    after = decode_cursor(cursor) if cursor else None
+    ids = snapshot.select(sort=sort, limit=per_page + 1, after=after, **filters)
+    courses = hydrate(ids[:per_page])
+
+    next_cursor = None
+    if len(ids) > per_page:
+        # Position tirée de l'instantané : la ligne en base a pu changer depuis
+        last_id = ids[per_page - 1]
+        next_cursor = encode_cursor(snapshot.cursor_value(sort, last_id), last_id)
+    return KeysetPage(courses, next_cursor)
@@ -0,0 +1,144 @@
+# apps/courses/facets.py
+"""
+Compteurs de facettes du catalogue - WIM Platform
+Un compteur par combinaison (catégorie, difficulté, tranche de prix) des
+cours publiés, maintenu par delta : les filtres n'interrogent plus la
+table des cours pour afficher leurs effectifs
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+CACHE_KEY = 'courses:facet_counts'
+CACHE_TIMEOUT = 60 * 60
+
+# Champs du cours qui déterminent sa combinaison de facettes
+FACET_FIELDS = {'is_published', 'category', 'category_id', 'difficulty', 'price'}
+
+
+def price_bucket(price):
+    """Tranche de prix d'un cours : gratuit ou payant"""
+    try:
+        return 'paid' if Decimal(str(price or 0)) > 0 else 'free'
+    except InvalidOperation:
+        return 'free'
+
+
+def facet_key(course):
+    """Combinaison de facettes d'un cours, ou None s'il n'est pas publié"""
+    if not course.is_published:
+        return None
+    return course.category_id, course.difficulty, price_bucket(course.price)
+
+
+def stored_facet_key(course_id):
+    """Combinaison de facettes du cours telle qu'enregistrée en base"""
+    from .models import Course
+
+    row = Course.objects.filter(pk=course_id).values(
+        'is_published', 'category_id', 'difficulty', 'price'
+    ).first()
+    if not row or not row['is_published']:
+        return None
+    return row['category_id'], row['difficulty'], price_bucket(row['price'])
+
+
+def adjust(key, delta):
+    """Applique un delta au compteur d'une combinaison"""
+    from .models import CourseFacetCount
+
+    if key is None or not delta:
+        return
+
+    category_id, difficulty, bucket = key
+    lookup = {'category_id': category_id, 'difficulty': difficulty, 'price_bucket': bucket}
+
+    updated = CourseFacetCount.objects.filter(**lookup).update(count=F('count') + delta)
+    if not updated and delta > 0:
+        try:
+            with transaction.atomic():
+                CourseFacetCount.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            CourseFacetCount.objects.filter(**lookup).update(count=F('count') + delta)
+
+    transaction.on_commit(invalidate)
+
+
+def move(old_key, new_key):
+    """Déplace un cours d'une combinaison vers une autre"""
+    if old_key == new_key:
+        return
+    adjust(old_key, -1)
+    adjust(new_key, 1)
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def rebuild():
+    """Recalcule tous les compteurs depuis la table des cours"""
+    from .models import Course, CourseFacetCount
+
+    rows = Course.objects.filter(is_published=True).values('category_id', 'difficulty').annotate(
+        free=Count('id', filter=Q(price__lte=0)),
+        paid=Count('id', filter=Q(price__gt=0)),
+    )
+
+    counts = []
+    for row in rows:
+        for bucket in ('free', 'paid'):
+            if row[bucket]:
+                counts.append(CourseFacetCount(
+                    category_id=row['category_id'],
+                    difficulty=row['difficulty'],
+                    price_bucket=bucket,
+                    count=row[bucket],
+                ))
+
+    with transaction.atomic():
+        CourseFacetCount.objects.all().delete()
+        CourseFacetCount.objects.bulk_create(counts)
+        transaction.on_commit(invalidate)
+    return counts
+
+
+def facet_table():
+    """Liste (catégorie, difficulté, tranche, nombre), mise en cache"""
+    from .models import CourseFacetCount
+
+    table = cache.get(CACHE_KEY)
+    if table is None:
+        table = list(CourseFacetCount.objects.filter(count__gt=0).values_list(
+            'category_id', 'difficulty', 'price_bucket', 'count'
+        ))
+        cache.set(CACHE_KEY, table, CACHE_TIMEOUT)
+    return table
+
+
+def facet_counts(category_id=None, difficulty=None, price=None):
+    """
+    Effectifs de chaque valeur de facette pour une combinaison de filtres.
+    Chaque facette est comptée en tenant compte des autres filtres seulement,
+    pour que ses valeurs restent sélectionnables.
+    """
+    counts = {'categories': {}, 'difficulties': {}, 'prices': {}, 'total': 0}
+
+    for row_category, row_difficulty, row_bucket, count in facet_table():
+        category_ok = category_id is None or row_category == category_id
+        difficulty_ok = not difficulty or row_difficulty == difficulty
+        price_ok = not price or row_bucket == price
+
+        if difficulty_ok and price_ok:
+            counts['categories'][row_category] = counts['categories'].get(row_category, 0) + count
+        if category_ok and price_ok:
+            counts['difficulties'][row_difficulty] = counts['difficulties'].get(row_difficulty, 0) + count
+        if category_ok and difficulty_ok:
+            counts['prices'][row_bucket] = counts['prices'].get(row_bucket, 0) + count
+        if category_ok and difficulty_ok and price_ok:
+            counts['total'] += count
+
+    return counts
@@ -0,0 +1,43 @@
+# apps/courses/fragments.py
+"""
+Cache des fragments de cartes de cours - WIM Platform
+Chaque carte rendue est mise en cache par (gabarit, cours, updated_at) :
+une grille de 12 cartes coûte une lecture groupée du cache et une
+concaténation, seules les cartes modifiées sont re-rendues
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .catalog import to_timestamp
+
+CARD_KEY = 'course_card:{}:{}:{}'
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def card_key(template_name, course):
+    """Clé de la carte d'un cours ; change avec updated_at"""
+    template = hashlib.md5(template_name.encode()).hexdigest()[:8]
+    version = to_timestamp(course.updated_at) if course.updated_at else 0
+    return CARD_KEY.format(template, course.pk, version)
+
+
+def render_course_cards(courses, template_name):
+    """Rend les cartes d'une liste de cours en réutilisant les fragments en cache"""
+    keys = [(card_key(template_name, course), course) for course in courses]
+    cached = cache.get_many([key for key, _ in keys])
+
+    rendered = []
+    missing = {}
+    for key, course in keys:
+        html = cached.get(key)
+        if html is None:
+            html = missing[key] = render_to_string(template_name, {'course': course})
+        rendered.append(html)
+
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    return mark_safe(''.join(rendered))
@@ -0,0 +1,78 @@
+# apps/courses/lesson_page.py
+"""
+Chargement de la page leçon - WIM Platform
+Résout inscription, cours, leçon, progression et leçons complétées en un
+nombre fixe de requêtes, quelle que soit la taille du cours
+"""
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+
+from apps.enrollments.models import Enrollment
+from apps.progress.models import LessonProgress
+from .models import Lesson
+from .outline import get_outline, lesson_navigation
+
+
+class LessonPage:
+    """Données de la page d'une leçon pour un utilisateur inscrit"""
+
+    def __init__(self, enrollment, lesson, progress, completed_lesson_ids, outline):
+        self.enrollment = enrollment
+        self.course = enrollment.course
+        self.lesson = lesson
+        self.progress = progress
+        self.completed_lesson_ids = completed_lesson_ids
+        self.outline = outline
+        self.navigation = lesson_navigation(outline, lesson.id)
+
+
+def touch_progress(enrollment, lesson):
+    """Crée la progression de la leçon ou met à jour son dernier accès (upsert)"""
+    LessonProgress.objects.bulk_create(
+        [LessonProgress(enrollment=enrollment, lesson=lesson, last_accessed=timezone.now())],
+        update_conflicts=True,
+        unique_fields=['enrollment', 'lesson'],
+        update_fields=['last_accessed'],
+    )
+
+
+def load_lesson_page(user, course_slug, lesson_slug):
+    """
+    Quatre requêtes : inscription + cours, leçon + module, upsert de la
+    progression, puis progression courante et leçons complétées ensemble.
+    Le plan du cours vient du cache.
+    """
+    enrollment = Enrollment.objects.select_related('course').filter(
+        user=user,
+        course__slug=course_slug,
+        is_active=True
+    ).first()
+    if enrollment is None:
+        raise Http404("Vous n'êtes pas inscrit à ce cours")
+
+    lesson = Lesson.objects.select_related('module').filter(
+        module__course_id=enrollment.course_id,
+        slug=lesson_slug
+    ).order_by('position', 'id').first()
+    if lesson is None:
+        raise Http404("Leçon introuvable")
+    lesson.module.course = enrollment.course
+
+    touch_progress(enrollment, lesson)
+
+    progress = None
+    completed_lesson_ids = set()
+    rows = LessonProgress.objects.filter(enrollment=enrollment).filter(
+        Q(lesson=lesson) | Q(is_completed=True)
+    ).order_by()
+    for row in rows:
+        if row.is_completed:
+            completed_lesson_ids.add(row.lesson_id)
+        if row.lesson_id == lesson.id:
+            row.enrollment = enrollment
+            row.lesson = lesson
+            progress = row
+
+    return LessonPage(enrollment, lesson, progress, completed_lesson_ids, get_outline(enrollment.course))
@@ -0,0 +1,27 @@
+# apps/courses/management/commands/build_recommendations.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les recommandations de cours de chaque utilisateur (similarité de co-inscription)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='Nombre de recommandations par utilisateur')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Nombre d'utilisateurs par bloc de calcul")
+
+    def handle(self, *args, **options):
+        self.stdout.write('Calcul des recommandations...')
+
+        started = time.monotonic()
+        users, saved = recommendations.build(top=options['top'], chunk_size=options['chunk_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {saved} recommandations pour {users} utilisateurs '
+                               f'({time.monotonic() - started:.1f}s)')
+        )
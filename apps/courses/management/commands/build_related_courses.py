@@ -0,0 +1,27 @@
+# apps/courses/management/commands/build_related_courses.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses import related
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les cours associés de chaque cours publié (co-inscription, co-complétion, affinité)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='Nombre de cours associés par cours')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Nombre d'utilisateurs par bloc de calcul")
+
+    def handle(self, *args, **options):
+        self.stdout.write('Calcul des cours associés...')
+
+        started = time.monotonic()
+        courses, changed = related.build(top=options['top'], chunk_size=options['chunk_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {courses} cours publiés, {changed} listes mises à jour '
+                               f'({time.monotonic() - started:.1f}s)')
+        )
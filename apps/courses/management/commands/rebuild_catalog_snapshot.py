@@ -0,0 +1,17 @@
+# apps/courses/management/commands/rebuild_catalog_snapshot.py
+from django.core.management.base import BaseCommand
+
+from apps.courses import catalog
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'instantané du catalogue partagé entre les workers"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reconstruction de l'instantané du catalogue...")
+
+        total = catalog.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {total} cours publiés dans {catalog.snapshot_path()}')
+        )
@@ -0,0 +1,18 @@
+# apps/courses/management/commands/rebuild_course_facets.py
+from django.core.management.base import BaseCommand
+
+from apps.courses import facets
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de facettes du catalogue depuis la table des cours'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recalcul des compteurs de facettes...')
+
+        counts = facets.rebuild()
+        total = sum(c.count for c in counts)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {len(counts)} combinaisons, {total} cours publiés')
+        )
@@ -0,0 +1,29 @@
+# apps/courses/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from apps.courses import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des cours et invalide celui des autres workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            help='Requête de test à exécuter après la reconstruction',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reconstruction de l'index de recherche...")
+
+        index = search.request_full_rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {len(index.documents)} cours indexés, {len(index.postings)} termes'
+            )
+        )
+
+        if options['query']:
+            course_ids = search.search_course_ids(options['query'], limit=10)
+            self.stdout.write(f"Résultats pour '{options['query']}': {course_ids}")
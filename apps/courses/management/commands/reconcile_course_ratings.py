@@ -0,0 +1,49 @@
+# apps/courses/management/commands/reconcile_course_ratings.py
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+
+from apps.courses.models import Course, RATING_FIELDS
+from apps.enrollments.models import Review
+
+STAT_FIELDS = ['rating', 'total_reviews', 'rating_sum', *RATING_FIELDS]
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les notes et histogrammes des cours depuis les avis et corrige les écarts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Affiche les écarts sans les corriger')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Vérification des notes des cours...')
+
+        rows = Review.objects.values('course_id').annotate(
+            total=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+        )
+        expected = {row.pop('course_id'): row for row in rows}
+
+        fixed = []
+        for course in Course.objects.only('id', 'title', *STAT_FIELDS).iterator(chunk_size=2000):
+            row = expected.get(course.pk, {})
+            values = {'total_reviews': row.get('total', 0), 'rating_sum': row.get('rating_sum') or 0}
+            values.update({field: row.get(field, 0) for field in RATING_FIELDS})
+            values['rating'] = (
+                round(Decimal(values['rating_sum']) / values['total_reviews'], 2) if values['total_reviews'] else Decimal('0.00')
+            )
+
+            if any(getattr(course, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(course, field, value)
+                fixed.append(course)
+                self.stdout.write(f'  - {course.title}: {values["total_reviews"]} avis, note {values["rating"]}')
+
+        if fixed and not options['dry_run']:
+            Course.objects.bulk_update(fixed, STAT_FIELDS, batch_size=500)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {len(fixed)} cours {"à corriger" if options["dry_run"] else "corrigés"}')
+        )
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_facet_counts(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    CourseFacetCount = apps.get_model("courses", "CourseFacetCount")
+
+    rows = Course.objects.filter(is_published=True).values("category_id", "difficulty").annotate(
+        free=Count("id", filter=Q(price__lte=0)),
+        paid=Count("id", filter=Q(price__gt=0)),
+    )
+    CourseFacetCount.objects.bulk_create([
+        CourseFacetCount(
+            category_id=row["category_id"],
+            difficulty=row["difficulty"],
+            price_bucket=bucket,
+            count=row[bucket],
+        )
+        for row in rows
+        for bucket in ("free", "paid")
+        if row[bucket]
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0003_add_youtube_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseFacetCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "difficulty",
+                    models.CharField(
+                        choices=[
+                            ("beginner", "Débutant"),
+                            ("intermediate", "Intermédiaire"),
+                            ("advanced", "Avancé"),
+                        ],
+                        max_length=20,
+                        verbose_name="difficulté",
+                    ),
+                ),
+                (
+                    "price_bucket",
+                    models.CharField(
+                        choices=[("free", "Gratuit"), ("paid", "Payant")],
+                        max_length=10,
+                        verbose_name="tranche de prix",
+                    ),
+                ),
+                (
+                    "count",
+                    models.IntegerField(default=0, verbose_name="nombre de cours"),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="facet_counts",
+                        to="courses.category",
+                        verbose_name="catégorie",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "compteur de facettes",
+                "verbose_name_plural": "compteurs de facettes",
+                "unique_together": {("category", "difficulty", "price_bucket")},
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
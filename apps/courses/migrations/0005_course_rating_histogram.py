@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:55
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_rating_histogram(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Review = apps.get_model("enrollments", "Review")
+
+    rows = Review.objects.values("course_id").annotate(
+        total=Count("id"),
+        rating_sum=Sum("rating"),
+        **{f"rating_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)}
+    )
+    courses = []
+    for row in rows:
+        course = Course(pk=row.pop("course_id"))
+        course.total_reviews = row.pop("total")
+        for field, value in row.items():
+            setattr(course, field, value)
+        course.rating = round(Decimal(course.rating_sum) / course.total_reviews, 2)
+        courses.append(course)
+
+    Course.objects.bulk_update(courses, [
+        "rating", "total_reviews", "rating_sum",
+        "rating_1", "rating_2", "rating_3", "rating_4", "rating_5",
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0004_course_facet_count"),
+        ("enrollments", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="rating_1",
+            field=models.IntegerField(default=0, verbose_name="avis 1 étoile"),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_2",
+            field=models.IntegerField(default=0, verbose_name="avis 2 étoiles"),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_3",
+            field=models.IntegerField(default=0, verbose_name="avis 3 étoiles"),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_4",
+            field=models.IntegerField(default=0, verbose_name="avis 4 étoiles"),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_5",
+            field=models.IntegerField(default=0, verbose_name="avis 5 étoiles"),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_sum",
+            field=models.IntegerField(default=0, verbose_name="somme des notes"),
+        ),
+        migrations.RunPython(populate_rating_histogram, migrations.RunPython.noop),
+    ]
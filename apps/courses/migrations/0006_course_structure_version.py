@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0005_course_rating_histogram"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="structure_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="version de la structure"
+            ),
+        ),
+    ]
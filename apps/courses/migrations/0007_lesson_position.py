@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+def populate_positions(apps, schema_editor):
+    Lesson = apps.get_model("courses", "Lesson")
+
+    lessons = Lesson.objects.filter(is_published=True, module__is_published=True).order_by(
+        "module__course_id", "module__order", "module_id", "order", "id"
+    ).values_list("id", "module__course_id")
+
+    changed = []
+    current_course, position = None, 0
+    for lesson_id, course_id in lessons.iterator(chunk_size=2000):
+        if course_id != current_course:
+            current_course, position = course_id, 0
+        position += 1
+        changed.append(Lesson(id=lesson_id, position=position))
+
+    Lesson.objects.bulk_update(changed, ["position"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0006_course_structure_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="position",
+            field=models.PositiveIntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name="position dans le cours",
+            ),
+        ),
+        migrations.RunPython(populate_positions, migrations.RunPython.noop),
+    ]
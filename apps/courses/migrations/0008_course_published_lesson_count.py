@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:01
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_published_lesson_count(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Lesson = apps.get_model("courses", "Lesson")
+
+    counts = Lesson.objects.filter(is_published=True, module__is_published=True).values(
+        "module__course_id"
+    ).annotate(total=Count("id"))
+    Course.objects.bulk_update(
+        [Course(id=row["module__course_id"], published_lesson_count=row["total"]) for row in counts],
+        ["published_lesson_count"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0007_lesson_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="published_lesson_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="leçons publiées"
+            ),
+        ),
+        migrations.RunPython(populate_published_lesson_count, migrations.RunPython.noop),
+    ]
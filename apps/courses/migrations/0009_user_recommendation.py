@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_course_published_lesson_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserRecommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="rang")),
+                ("score", models.FloatField(verbose_name="score")),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="courses.course",
+                        verbose_name="cours",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="course_recommendations",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="utilisateur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "recommandation",
+                "verbose_name_plural": "recommandations",
+                "ordering": ["user", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "rank"], name="courses_use_user_id_09a16d_idx"
+                    )
+                ],
+                "unique_together": {("user", "course")},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0009_user_recommendation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedCourse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="rang")),
+                ("score", models.FloatField(verbose_name="score")),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="courses.course",
+                        verbose_name="cours",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_from",
+                        to="courses.course",
+                        verbose_name="cours associé",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "cours associé",
+                "verbose_name_plural": "cours associés",
+                "ordering": ["course", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["course", "rank"], name="courses_rel_course__db575d_idx"
+                    )
+                ],
+                "unique_together": {("course", "related")},
+            },
+        ),
+    ]
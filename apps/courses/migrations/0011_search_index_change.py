@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0010_related_course"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchIndexChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("course_id", models.BigIntegerField(verbose_name="cours")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="date"),
+                ),
+            ],
+            options={
+                "verbose_name": "modification de l'index de recherche",
+                "verbose_name_plural": "modifications de l'index de recherche",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -1,9 +1,15 @@
 # apps/courses/models.py - Version mise à jour
 
+from decimal import Decimal
+
 from django.db import models
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 
+RATING_FIELDS = ['rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
 
 class Category(models.Model):
     name = models.CharField('nom', max_length=100, unique=True)
@@ -55,6 +61,20 @@ class Course(models.Model):
     total_students = models.IntegerField('étudiants', default=0)
     total_reviews = models.IntegerField('avis', default=0)
 
+    # Histogramme des notes, maintenu par delta à chaque avis
+    rating_1 = models.IntegerField('avis 1 étoile', default=0)
+    rating_2 = models.IntegerField('avis 2 étoiles', default=0)
+    rating_3 = models.IntegerField('avis 3 étoiles', default=0)
+    rating_4 = models.IntegerField('avis 4 étoiles', default=0)
+    rating_5 = models.IntegerField('avis 5 étoiles', default=0)
+    rating_sum = models.IntegerField('somme des notes', default=0)
+
+    # Leçons publiées (modules publiés), recalculé avec le rang des leçons
+    published_lesson_count = models.PositiveIntegerField('leçons publiées', default=0, editable=False)
+
+    # Incrémentée à chaque modification d'un module ou d'une leçon (cache du plan)
+    structure_version = models.PositiveIntegerField('version de la structure', default=0, editable=False)
+
     is_published = models.BooleanField('publié', default=False)
     is_new = models.BooleanField('nouveau', default=True)
     is_featured = models.BooleanField('mis en avant', default=False)
@@ -114,20 +134,58 @@ class Course(models.Model):
     def update_students_count(self):
         """Met à jour le nombre d'étudiants inscrits"""
         self.total_students = self.enrollments.filter(is_active=True).count()
-        self.save(update_fields=['total_students'])
+        self.save(update_fields=['total_students', 'updated_at'])
 
     def update_rating(self):
-        """Met à jour la note moyenne du cours"""
-        from django.db.models import Avg
-        reviews = self.reviews.all()
-        if reviews.exists():
-            avg_rating = reviews.aggregate(avg=Avg('rating'))['avg']
-            self.rating = round(avg_rating, 2) if avg_rating else 0
-            self.total_reviews = reviews.count()
-        else:
-            self.rating = 0
-            self.total_reviews = 0
-        self.save(update_fields=['rating', 'total_reviews'])
+        """Recalcule entièrement la note et l'histogramme depuis les avis"""
+        stats = self.reviews.aggregate(
+            total=models.Count('id'),
+            rating_sum=models.Sum('rating', default=0),
+            **{f'rating_{star}': models.Count('id', filter=models.Q(rating=star)) for star in range(1, 6)}
+        )
+        self.total_reviews = stats.pop('total')
+        for field, value in stats.items():
+            setattr(self, field, value)
+        self.rating = round(Decimal(self.rating_sum) / self.total_reviews, 2) if self.total_reviews else 0
+        self.save(update_fields=['rating', 'total_reviews', 'rating_sum', *RATING_FIELDS, 'updated_at'])
+
+    @classmethod
+    def apply_review_change(cls, course_id, old_rating=None, new_rating=None):
+        """Met à jour note et histogramme par delta (ajout, modification ou suppression d'un avis)"""
+        count_delta = (new_rating is not None) - (old_rating is not None)
+        sum_delta = (new_rating or 0) - (old_rating or 0)
+
+        updates = {}
+        for star, delta in ((old_rating, -1), (new_rating, 1)):
+            if star is not None:
+                field = f'rating_{star}'
+                updates[field] = updates.get(field, models.F(field)) + delta
+
+        total = models.F('total_reviews') + count_delta
+        updates.update(
+            total_reviews=total,
+            rating_sum=models.F('rating_sum') + sum_delta,
+            rating=models.Case(
+                models.When(
+                    total_reviews__gt=-count_delta,
+                    then=Round(Cast(models.F('rating_sum') + sum_delta, models.FloatField()) / total, 2),
+                ),
+                default=models.Value(0),
+                output_field=models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
+        return cls.objects.filter(pk=course_id).update(**updates)
+
+    @property
+    def rating_histogram(self):
+        """[(étoiles, nombre, pourcentage)] de 5 à 1 étoile"""
+        total = self.total_reviews
+        histogram = []
+        for star in range(5, 0, -1):
+            count = getattr(self, f'rating_{star}')
+            histogram.append((star, count, round(count * 100 / total) if total else 0))
+        return histogram
 
     def calculate_duration(self):
         """Calcule la durée totale du cours"""
@@ -136,7 +194,7 @@ class Course(models.Model):
             for lesson in module.lessons.filter(is_published=True):
                 total_duration += lesson.duration
         self.duration = total_duration
-        self.save(update_fields=['duration'])
+        self.save(update_fields=['duration', 'updated_at'])
 
 
 class Module(models.Model):
@@ -192,6 +250,10 @@ class Lesson(models.Model):
     is_preview = models.BooleanField('aperçu gratuit', default=False)
     is_published = models.BooleanField('publié', default=True)
 
+    # Rang de la leçon publiée dans tout le cours (ordre du module puis de la leçon)
+    position = models.PositiveIntegerField('position dans le cours', null=True, blank=True, editable=False,
+                                           db_index=True)
+
     # Champs YouTube
     youtube_video_id = models.CharField('ID Vidéo YouTube', max_length=20, blank=True)
     youtube_title = models.CharField('Titre YouTube', max_length=300, blank=True)
@@ -231,47 +293,95 @@ class Lesson(models.Model):
 
         super().save(*args, **kwargs)
 
-    # ... Autres méthodes existantes ...
+    def _lesson_at(self, position):
+        """Leçon du même cours au rang donné (une requête indexée)"""
+        if not position:
+            return None
+        return Lesson.objects.filter(module__course__modules=self.module_id, position=position).first()
+
     def get_previous_lesson(self):
         """Retourne la leçon précédente"""
-        previous_in_module = self.module.lessons.filter(
-            order__lt=self.order,
-            is_published=True
-        ).order_by('-order').first()
+        return self._lesson_at(self.position - 1) if self.position else None
 
-        if previous_in_module:
-            return previous_in_module
+    def get_next_lesson(self):
+        """Retourne la leçon suivante"""
+        return self._lesson_at(self.position + 1) if self.position else None
 
-        previous_module = self.module.course.modules.filter(
-            order__lt=self.module.order,
-            is_published=True
-        ).order_by('-order').first()
 
-        if previous_module:
-            return previous_module.lessons.filter(
-                is_published=True
-            ).order_by('-order').first()
+class CourseFacetCount(models.Model):
+    """Nombre de cours publiés par combinaison (catégorie, difficulté, prix)"""
+    PRICE_BUCKET_CHOICES = [
+        ('free', 'Gratuit'),
+        ('paid', 'Payant'),
+    ]
 
-        return None
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='facet_counts', verbose_name='catégorie')
+    difficulty = models.CharField('difficulté', max_length=20, choices=Course.DIFFICULTY_CHOICES)
+    price_bucket = models.CharField('tranche de prix', max_length=10, choices=PRICE_BUCKET_CHOICES)
+    count = models.IntegerField('nombre de cours', default=0)
 
-    def get_next_lesson(self):
-        """Retourne la leçon suivante"""
-        next_in_module = self.module.lessons.filter(
-            order__gt=self.order,
-            is_published=True
-        ).order_by('order').first()
+    class Meta:
+        verbose_name = 'compteur de facettes'
+        verbose_name_plural = 'compteurs de facettes'
+        unique_together = [['category', 'difficulty', 'price_bucket']]
 
-        if next_in_module:
-            return next_in_module
+    def __str__(self):
+        return f"{self.category} / {self.difficulty} / {self.price_bucket}: {self.count}"
 
-        next_module = self.module.course.modules.filter(
-            order__gt=self.module.order,
-            is_published=True
-        ).order_by('order').first()
 
-        if next_module:
-            return next_module.lessons.filter(
-                is_published=True
-            ).order_by('order').first()
+class UserRecommendation(models.Model):
+    """Cours recommandés à un utilisateur, précalculés par similarité de co-inscription"""
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='course_recommendations',
+                             verbose_name='utilisateur')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='recommendations',
+                               verbose_name='cours')
+    rank = models.PositiveSmallIntegerField('rang')
+    score = models.FloatField('score')
 
-        return None
\ No newline at end of file
+    class Meta:
+        verbose_name = 'recommandation'
+        verbose_name_plural = 'recommandations'
+        unique_together = [['user', 'course']]
+        indexes = [models.Index(fields=['user', 'rank'])]
+        ordering = ['user', 'rank']
+
+    def __str__(self):
+        return f"{self.user} - {self.course} (#{self.rank})"
+
+
+class RelatedCourse(models.Model):
+    """Cours associés à un cours, précalculés (co-inscription, co-complétion, affinité)"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='related_links',
+                               verbose_name='cours')
+    related = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='related_from',
+                                verbose_name='cours associé')
+    rank = models.PositiveSmallIntegerField('rang')
+    score = models.FloatField('score')
+
+    class Meta:
+        verbose_name = 'cours associé'
+        verbose_name_plural = 'cours associés'
+        unique_together = [['course', 'related']]
+        indexes = [models.Index(fields=['course', 'rank'])]
+        ordering = ['course', 'rank']
+
+    def __str__(self):
+        return f"{self.course} -> {self.related} (#{self.rank})"
+
+
+class SearchIndexChange(models.Model):
+    """
+    Journal des modifications de l'index de recherche : l'identifiant
+    auto-incrémenté sert de version, chaque worker rejoue les lignes suivant la sienne
+    """
+    course_id = models.BigIntegerField('cours')  # 0 : reconstruction complète demandée
+    created_at = models.DateTimeField('date', auto_now_add=True)
+
+    class Meta:
+        verbose_name = "modification de l'index de recherche"
+        verbose_name_plural = "modifications de l'index de recherche"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} cours {self.course_id}"
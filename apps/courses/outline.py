@@ -0,0 +1,157 @@
+# apps/courses/outline.py
+"""
+Plan des cours - WIM Platform
+Arbre modules -> leçons publiés d'un cours, sérialisé une seule fois et mis
+en cache sous la version de structure du cours (incrémentée à chaque
+modification d'un module ou d'une leçon), et rang de chaque leçon dans le cours
+"""
+
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+OUTLINE_KEY = 'course_outline:{}:{}:{}'
+OUTLINE_TIMEOUT = 60 * 60 * 24
+
+
+def outline_key(course):
+    return OUTLINE_KEY.format(course.pk, course.slug, course.structure_version)
+
+
+def build_outline(course):
+    """Construit le plan d'un cours en deux requêtes"""
+    from .models import Lesson, Module
+
+    modules = list(Module.objects.filter(course=course, is_published=True).order_by('order', 'id').values(
+        'id', 'title', 'order'
+    ))
+    lessons = Lesson.objects.filter(
+        module__course=course, module__is_published=True, is_published=True
+    ).order_by('module__order', 'module_id', 'order', 'id').values(
+        'id', 'module_id', 'title', 'slug', 'lesson_type', 'duration', 'is_preview', 'youtube_video_id'
+    )
+
+    by_module = {module['id']: dict(module, lessons=[], duration=0) for module in modules}
+    for lesson in lessons:
+        module = by_module[lesson['module_id']]
+        module['lessons'].append({
+            'id': lesson['id'],
+            'module_id': lesson['module_id'],
+            'title': lesson['title'],
+            'slug': lesson['slug'],
+            'lesson_type': lesson['lesson_type'],
+            'duration': lesson['duration'],
+            'is_preview': lesson['is_preview'],
+            'is_youtube': bool(lesson['youtube_video_id']),
+            'url': reverse('courses:lesson', args=[course.slug, lesson['slug']]),
+        })
+        module['duration'] += lesson['duration']
+
+    tree = [by_module[module['id']] for module in modules]
+    for module in tree:
+        module['lesson_count'] = len(module['lessons'])
+
+    all_lessons = [lesson for module in tree for lesson in module['lessons']]
+    for position, lesson in enumerate(all_lessons, start=1):
+        lesson['position'] = position
+
+    return {
+        'course_id': course.pk,
+        'version': course.structure_version,
+        'modules': tree,
+        'lessons': all_lessons,
+        'positions': {lesson['id']: lesson['position'] for lesson in all_lessons},
+        'module_count': len(tree),
+        'lesson_count': len(all_lessons),
+        'duration': sum(module['duration'] for module in tree),
+        'first_lesson': all_lessons[0] if all_lessons else None,
+    }
+
+
+def get_outline(course):
+    """Plan du cours depuis le cache (reconstruit si la structure a changé)"""
+    key = outline_key(course)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_outline(course)
+        cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+
+def lesson_navigation(outline, lesson_id):
+    """Leçons précédente et suivante, rang et total d'une leçon du plan (sans requête)"""
+    position = outline['positions'].get(lesson_id)
+    if position is None:
+        return None
+    lessons = outline['lessons']
+    return {
+        'previous': lessons[position - 2] if position > 1 else None,
+        'next': lessons[position] if position < len(lessons) else None,
+        'position': position,
+        'total': len(lessons),
+    }
+
+
+def bump_structure_version(course_id):
+    """Invalide le plan d'un cours après une modification de module ou de leçon"""
+    from django.db.models import F
+    from .models import Course
+
+    Course.objects.filter(pk=course_id).update(structure_version=F('structure_version') + 1)
+
+
+def recompute_positions(course_id):
+    """Renumérote les leçons publiées du cours ; les autres n'ont pas de rang"""
+    from .models import Course, Lesson
+
+    lessons = Lesson.objects.filter(module__course_id=course_id).order_by(
+        'module__order', 'module_id', 'order', 'id'
+    ).only('id', 'position', 'is_published', 'module__is_published').select_related('module')
+
+    changed = []
+    position = 0
+    visibility_changed = False
+    for lesson in lessons:
+        if lesson.is_published and lesson.module.is_published:
+            position += 1
+            expected = position
+        else:
+            expected = None
+        if lesson.position != expected:
+            # Leçon publiée ou dépubliée (et pas seulement renumérotée)
+            visibility_changed |= (lesson.position is None) != (expected is None)
+            lesson.position = expected
+            changed.append(lesson)
+
+    if changed:
+        Lesson.objects.bulk_update(changed, ['position'], batch_size=500)
+
+    count_changed = Course.objects.filter(pk=course_id).exclude(published_lesson_count=position).update(
+        published_lesson_count=position
+    )
+    if count_changed or visibility_changed:
+        # Leçons publiées différentes : la progression de tous les inscrits aussi
+        from apps.enrollments.models import Enrollment
+        Enrollment.recompute_course_progress(course_id)
+    return len(changed)
+
+
+_pending = threading.local()
+
+
+def schedule_positions(course_id):
+    """Renumérote le cours après le commit, une seule fois par transaction"""
+    pending = getattr(_pending, 'courses', None)
+    if pending is None:
+        pending = _pending.courses = set()
+    pending.add(course_id)
+
+    def run():
+        # Les autres rappels du même commit trouvent le cours déjà traité
+        if course_id in pending:
+            pending.discard(course_id)
+            recompute_positions(course_id)
+
+    transaction.on_commit(run)
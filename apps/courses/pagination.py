@@ -0,0 +1,94 @@
+# apps/courses/pagination.py
+"""
+Pagination par curseur (keyset) - WIM Platform
+Évite le COUNT(*) et le OFFSET des pages profondes du catalogue
+"""
+
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Q
+
+# Tris autorisés du catalogue ; l'id sert de départage
+KEYSET_SORTS = ['-created_at', 'title', '-rating', 'price', '-total_students']
+
+APPROXIMATE_COUNT_TIMEOUT = 300
+
+
+def encode_cursor(value, pk):
+    """Encode la position (valeur de tri, id) du dernier élément affiché"""
+    payload = json.dumps([value, pk], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Décode un curseur ; retourne None s'il est invalide"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """Page de résultats obtenue par curseur"""
+
+    def __init__(self, object_list, next_cursor, approximate_total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.approximate_total = approximate_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def keyset_paginate(queryset, sort, cursor=None, per_page=12):
+    """Retourne la page qui suit le curseur pour le tri donné"""
+    if sort not in KEYSET_SORTS:
+        sort = KEYSET_SORTS[0]
+
+    descending = sort.startswith('-')
+    field_name = sort.lstrip('-')
+    field = queryset.model._meta.get_field(field_name)
+    lookup = 'lt' if descending else 'gt'
+
+    queryset = queryset.order_by(sort, '-id' if descending else 'id')
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        value, last_id = position
+        value = field.to_python(value)
+        queryset = queryset.filter(
+            Q(**{f'{field_name}__{lookup}': value}) |
+            Q(**{field_name: value, f'id__{lookup}': last_id})
+        )
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(field.value_to_string(last), last.pk)
+
+    return KeysetPage(rows, next_cursor)
+
+
+def approximate_count(queryset, timeout=APPROXIMATE_COUNT_TIMEOUT):
+    """Nombre de résultats mis en cache quelques minutes (ordre de grandeur)"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'approx_count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+
+    total = cache.get(key)
+    if total is None:
+        total = queryset.order_by().count()
+        cache.set(key, total, timeout)
+    return total
@@ -0,0 +1,237 @@
+# apps/courses/recommendations.py
+"""
+Recommandations de cours - WIM Platform
+Calcul hors ligne : la matrice creuse utilisateurs x cours des inscriptions
+(pondérée par la complétion) donne une similarité cosinus creuse entre les
+cours suivis par les mêmes utilisateurs ; les
+meilleurs cours non suivis de chaque utilisateur sont enregistrés dans
+UserRecommendation et lus en une requête par le tableau de bord.
+Les utilisateurs sans recommandation reçoivent les cours les plus populaires.
+"""
+
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from . import catalog
+
+logger = logging.getLogger(__name__)
+
+# Poids d'une inscription dans la matrice, et d'une inscription terminée
+ENROLLED_WEIGHT = 1.0
+COMPLETED_WEIGHT = 2.0
+
+DELETE_CHUNK = 900
+
+
+def recommendations_per_user():
+    return getattr(settings, 'RECOMMENDATIONS_PER_USER', 12)
+
+
+class SparseMatrix:
+    """
+    Matrice creuse au format CSR (lignes compressées) : les valeurs non nulles
+    de la ligne i sont aux positions indptr[i]:indptr[i + 1] de cols et data
+    """
+
+    def __init__(self, rows, cols, data, shape):
+        """Construite depuis des coordonnées : doublons additionnés, zéros retirés"""
+        n_rows, n_cols = shape
+        keys = np.asarray(rows, dtype=np.int64) * n_cols + np.asarray(cols, dtype=np.int64)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        data = np.bincount(inverse.ravel(), weights=data, minlength=len(keys))
+        keep = data != 0
+        self.shape = shape
+        self.rows, self.cols = np.divmod(keys[keep], n_cols)
+        self.data = data[keep]
+        self.indptr = np.searchsorted(self.rows, np.arange(n_rows + 1))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def diagonal(self):
+        diagonal = np.zeros(min(self.shape))
+        on_diagonal = self.rows == self.cols
+        diagonal[self.rows[on_diagonal]] = self.data[on_diagonal]
+        return diagonal
+
+    def expand(self, rows):
+        """
+        Déplie les lignes demandées : (indice dans rows, position de la valeur)
+        pour chaque valeur non nulle de chacune de ces lignes
+        """
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        origin = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(len(origin)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return origin, starts[origin] + offsets
+
+
+class InteractionMatrix(SparseMatrix):
+    """Matrice creuse utilisateurs x cours des inscriptions pondérées"""
+
+    def __init__(self, user_ids, course_ids, rows, cols, weights):
+        super().__init__(rows, cols, weights, (len(user_ids), len(course_ids)))
+        self.user_ids = user_ids
+        self.course_ids = course_ids
+
+    def entries(self, start, stop):
+        """Bornes des inscriptions des utilisateurs start:stop"""
+        return self.indptr[start], self.indptr[min(stop, self.shape[0])]
+
+    def co_occurrence(self, chunk_size=5000):
+        """Produit Xᵀ·X creux (cours x cours), accumulé par tranche d'utilisateurs"""
+        n_users, n_courses = self.shape
+        total = SparseMatrix([], [], [], (n_courses, n_courses))
+        for start in range(0, n_users, chunk_size):
+            lo, hi = self.entries(start, start + chunk_size)
+            # Chaque inscription est associée à toutes celles du même utilisateur
+            origin, positions = self.expand(self.rows[lo:hi])
+            left = lo + origin
+            total = SparseMatrix(
+                np.concatenate((total.rows, self.cols[left])),
+                np.concatenate((total.cols, self.cols[positions])),
+                np.concatenate((total.data, self.data[left] * self.data[positions])),
+                total.shape,
+            )
+        return total
+
+
+def enrollment_rows():
+    """Inscriptions en tableau (utilisateur, cours, terminé)"""
+    from apps.enrollments.models import Enrollment
+
+    return np.array(list(Enrollment.objects.order_by().values_list('user_id', 'course_id', 'is_completed')),
+                    dtype=np.int64).reshape(-1, 3)
+
+
+def load_interactions(weights=None, data=None):
+    """Matrice des inscriptions ; weights = (poids inscrit, poids terminé)"""
+    enrolled_weight, completed_weight = weights or (ENROLLED_WEIGHT, COMPLETED_WEIGHT)
+    data = enrollment_rows() if data is None else data
+
+    user_ids, rows = np.unique(data[:, 0], return_inverse=True)
+    course_ids, cols = np.unique(data[:, 1], return_inverse=True)
+    values = np.where(data[:, 2] == 1, completed_weight, enrolled_weight).astype(np.float64)
+    return InteractionMatrix(user_ids, course_ids, rows.ravel(), cols.ravel(), values)
+
+
+def cosine_similarity(co_occurrence):
+    """Similarité cosinus creuse entre cours à partir de Xᵀ·X, sans la diagonale"""
+    norms = np.sqrt(co_occurrence.diagonal())
+    off_diagonal = co_occurrence.rows != co_occurrence.cols
+    rows, cols = co_occurrence.rows[off_diagonal], co_occurrence.cols[off_diagonal]
+    return SparseMatrix(rows, cols, co_occurrence.data[off_diagonal] / (norms[rows] * norms[cols]),
+                        co_occurrence.shape)
+
+
+def top_n(scores, n):
+    """Indices et scores des n meilleures colonnes de chaque ligne, par score décroissant"""
+    n = min(n, scores.shape[1])
+    if n <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0))
+    best = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def top_per_row(rows, cols, values, n):
+    """Les n meilleures valeurs de chaque ligne d'une matrice en coordonnées, avec leur rang"""
+    order = np.lexsort((cols, -values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows) + 1
+    keep = ranks <= n
+    return rows[keep], cols[keep], values[keep], ranks[keep]
+
+
+def score_users(matrix, similarity, start, stop):
+    """Scores creux X·S des utilisateurs start:stop (somme des similarités de leurs cours)"""
+    lo, hi = matrix.entries(start, stop)
+    origin, positions = similarity.expand(matrix.cols[lo:hi])
+    entries = lo + origin
+    return SparseMatrix(matrix.rows[entries], similarity.cols[positions],
+                        matrix.data[entries] * similarity.data[positions], matrix.shape)
+
+
+def build(top=None, chunk_size=5000):
+    """
+    Recalcule les recommandations de tous les utilisateurs inscrits.
+    Retourne (utilisateurs, recommandations enregistrées).
+    """
+    from .models import Course, UserRecommendation
+
+    top = top or recommendations_per_user()
+    matrix = load_interactions()
+    if not len(matrix.user_ids):
+        UserRecommendation.objects.all().delete()
+        return 0, 0
+
+    similarity = cosine_similarity(matrix.co_occurrence(chunk_size))
+    published = np.isin(matrix.course_ids, list(Course.objects.filter(is_published=True).values_list('id', flat=True)))
+    n_users, n_courses = matrix.shape
+
+    saved = 0
+    for start in range(0, n_users, chunk_size):
+        scores = score_users(matrix, similarity, start, start + chunk_size)
+
+        # Ni les cours déjà suivis, ni les cours non publiés
+        lo, hi = matrix.entries(start, start + chunk_size)
+        followed = np.isin(scores.rows * n_courses + scores.cols, matrix.rows[lo:hi] * n_courses + matrix.cols[lo:hi])
+        keep = ~followed & published[scores.cols] & (scores.data > 0)
+        best = top_per_row(scores.rows[keep], scores.cols[keep], scores.data[keep], top)
+
+        rows = [
+            UserRecommendation(user_id=int(matrix.user_ids[row]), course_id=int(matrix.course_ids[column]),
+                               rank=int(rank), score=float(score))
+            for row, column, score, rank in zip(*best)
+        ]
+
+        user_ids = matrix.user_ids[start:start + chunk_size].tolist()
+        with transaction.atomic():
+            for chunk in range(0, len(user_ids), DELETE_CHUNK):
+                UserRecommendation.objects.filter(user_id__in=user_ids[chunk:chunk + DELETE_CHUNK]).delete()
+            UserRecommendation.objects.bulk_create(rows, batch_size=1000)
+        saved += len(rows)
+
+    # Utilisateurs qui n'ont plus d'inscription
+    stale = set(UserRecommendation.objects.values_list('user_id', flat=True).distinct()) - set(matrix.user_ids.tolist())
+    stale = list(stale)
+    for chunk in range(0, len(stale), DELETE_CHUNK):
+        UserRecommendation.objects.filter(user_id__in=stale[chunk:chunk + DELETE_CHUNK]).delete()
+
+    logger.info("Recommandations recalculées : %s utilisateurs, %s cours", len(matrix.user_ids), saved)
+    return len(matrix.user_ids), saved
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+def popular_courses(limit, exclude=()):
+    """Cours les plus suivis, lus dans l'instantané du catalogue"""
+    exclude = set(exclude)
+    ids = catalog.get_snapshot().select(sort='-total_students', limit=limit + len(exclude))
+    return catalog.hydrate([pk for pk in ids if pk not in exclude][:limit])
+
+
+def recommended_courses(user, limit=4, enrolled=()):
+    """
+    Recommandations précalculées de l'utilisateur, complétées par les cours populaires.
+    `enrolled` : ids des cours déjà suivis, connus de l'appelant (résumé d'apprentissage) ;
+    une seule requête sur l'index (user, rank), les nouvelles inscriptions sont écartées ici
+    """
+    from .models import UserRecommendation
+
+    enrolled = set(enrolled)
+    rows = UserRecommendation.objects.filter(user=user, course__is_published=True).select_related(
+        'course', 'course__category', 'course__instructor'
+    ).order_by('rank')[:limit + len(enrolled)]
+    courses = [row.course for row in rows if row.course_id not in enrolled][:limit]
+
+    if len(courses) < limit:
+        courses += popular_courses(limit - len(courses), exclude=enrolled | {c.pk for c in courses})
+    return courses
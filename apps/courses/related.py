@@ -0,0 +1,149 @@
+# apps/courses/related.py
+"""
+Cours associés - WIM Platform
+Calcul par lot des cours associés à chaque cours publié : similarités de
+co-inscription et de co-complétion (matrices creuses des inscriptions) plus
+une affinité de catégorie et de difficulté, évaluées par blocs de cours. Les
+k meilleurs sont enregistrés dans RelatedCourse ; seuls les cours dont la
+liste a changé sont réécrits.
+"""
+
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .catalog import difficulty_codes
+from .recommendations import (
+    DELETE_CHUNK, SparseMatrix, cosine_similarity, enrollment_rows, load_interactions, top_n,
+)
+
+logger = logging.getLogger(__name__)
+
+# Poids des composantes du score d'association
+CO_ENROLLMENT_WEIGHT = 1.0
+CO_COMPLETION_WEIGHT = 0.5
+CATEGORY_WEIGHT = 0.2
+DIFFICULTY_WEIGHT = 0.1
+
+# Cours par bloc dense de scores
+COURSE_BLOCK_SIZE = 1000
+
+
+def related_per_course():
+    return getattr(settings, 'RELATED_COURSES_PER_COURSE', 6)
+
+
+def co_similarity(course_ids, data, chunk_size=5000):
+    """
+    Similarités pondérées de co-inscription et de co-complétion (creuses),
+    indexées sur les cours publiés course_ids (triés)
+    """
+    size = len(course_ids)
+    data = data[np.isin(data[:, 1], course_ids)]
+
+    rows, cols, values = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+    if len(data):
+        for weight, weights in ((CO_ENROLLMENT_WEIGHT, (1.0, 1.0)), (CO_COMPLETION_WEIGHT, (0.0, 1.0))):
+            matrix = load_interactions(weights, data=data)
+            similarity = cosine_similarity(matrix.co_occurrence(chunk_size))
+            columns = np.searchsorted(course_ids, matrix.course_ids)
+            rows.append(columns[similarity.rows])
+            cols.append(columns[similarity.cols])
+            values.append(weight * similarity.data)
+    return SparseMatrix(np.concatenate(rows), np.concatenate(cols), np.concatenate(values), (size, size))
+
+
+def score_blocks(courses, data, chunk_size=5000, block_size=COURSE_BLOCK_SIZE):
+    """
+    Scores d'association entre cours publiés, par blocs de lignes :
+    (première ligne, bloc dense float32 de block_size x cours).
+    courses : tableau (id, catégorie ou -1, code de difficulté) trié par id.
+    """
+    course_ids = courses[:, 0]
+    size = len(course_ids)
+    similarity = co_similarity(course_ids, data, chunk_size)
+
+    categories = courses[:, 1]
+    levels = max(len(difficulty_codes()) - 1, 1)
+    difficulties = courses[:, 2].astype(np.float32)
+
+    for start in range(0, size, block_size):
+        stop = min(start + block_size, size)
+        block_categories = categories[start:stop, None]
+        scores = (CATEGORY_WEIGHT * ((block_categories == categories[None, :]) & (block_categories >= 0))
+                  ).astype(np.float32)
+        scores += DIFFICULTY_WEIGHT * (1 - np.abs(difficulties[start:stop, None] - difficulties[None, :]) / levels)
+
+        lo, hi = similarity.indptr[start], similarity.indptr[stop]
+        scores[similarity.rows[lo:hi] - start, similarity.cols[lo:hi]] += similarity.data[lo:hi]
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        yield start, scores
+
+
+def published_courses():
+    from .models import Course
+
+    codes = difficulty_codes()
+    rows = Course.objects.filter(is_published=True).order_by('id').values_list('id', 'category_id', 'difficulty')
+    return np.array([(pk, category_id if category_id is not None else -1, codes.get(difficulty, 0))
+                     for pk, category_id, difficulty in rows], dtype=np.int64).reshape(-1, 3)
+
+
+def build(top=None, chunk_size=5000):
+    """
+    Recalcule les cours associés et réécrit les listes modifiées.
+    Retourne (cours publiés, listes réécrites).
+    """
+    from .models import RelatedCourse
+
+    top = top or related_per_course()
+    courses = published_courses()
+    course_ids = courses[:, 0]
+
+    computed = {}
+    for start, scores in score_blocks(courses, enrollment_rows(), chunk_size):
+        best, best_scores = top_n(scores, top)
+        for index, (columns, values) in enumerate(zip(best, best_scores), start=start):
+            computed[int(course_ids[index])] = [
+                (int(course_ids[column]), float(score)) for column, score in zip(columns, values) if score > 0
+            ]
+
+    stored = {}
+    rows = RelatedCourse.objects.order_by('course_id', 'rank').values_list('course_id', 'related_id')
+    for course_id, related_id in rows:
+        stored.setdefault(course_id, []).append(related_id)
+
+    # Listes dont l'ordre a changé, et cours qui ne sont plus publiés
+    changed = [pk for pk, related in computed.items() if [r for r, _ in related] != stored.get(pk, [])]
+    removed = [pk for pk in stored if pk not in computed]
+
+    with transaction.atomic():
+        targets = changed + removed
+        for start in range(0, len(targets), DELETE_CHUNK):
+            RelatedCourse.objects.filter(course_id__in=targets[start:start + DELETE_CHUNK]).delete()
+        RelatedCourse.objects.bulk_create([
+            RelatedCourse(course_id=pk, related_id=related_id, rank=rank, score=score)
+            for pk in changed
+            for rank, (related_id, score) in enumerate(computed[pk], start=1)
+        ], batch_size=1000)
+
+    logger.info("Cours associés recalculés : %s cours, %s listes réécrites", len(computed), len(changed))
+    return len(computed), len(changed)
+
+
+def related_courses(course, limit=3):
+    """Cours associés précalculés, à défaut les cours de la même catégorie"""
+    from .models import Course
+
+    courses = list(Course.objects.filter(
+        related_from__course=course, is_published=True
+    ).select_related('category', 'instructor').order_by('related_from__rank')[:limit])
+    if courses:
+        return courses
+
+    # Cours publié après le dernier calcul
+    return list(Course.objects.filter(
+        category_id=course.category_id, is_published=True
+    ).exclude(id=course.id).select_related('category', 'instructor')[:limit])
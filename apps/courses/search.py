@@ -0,0 +1,402 @@
+# apps/courses/search.py
+"""
+Moteur de recherche des cours - WIM Platform
+Index inversé en mémoire (titre, description, catégorie) avec pliage des
+accents, racinisation française légère, trigrammes et classement BM25
+"""
+
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db.models import Case, IntegerField, Value, When
+
+from apps.text import fold
+
+logger = logging.getLogger(__name__)
+
+# Pondération des champs (BM25F simplifié)
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'category': 2.0,
+    'description': 1.0,
+}
+
+# Champs du cours dont dépend son document indexé
+INDEXED_FIELDS = {'title', 'description', 'category', 'category_id', 'is_published'}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Nombre maximum de termes du vocabulaire retenus par mot de la requête
+MAX_EXPANSIONS = 10
+# Similarité minimale (Jaccard sur les trigrammes) pour la tolérance aux fautes
+FUZZY_THRESHOLD = 0.3
+MIN_PREFIX_LENGTH = 2
+
+# Synchronisation entre workers : journal des modifications en base (SearchIndexChange),
+# au-delà de MAX_REPLAY lignes de retard un worker reconstruit son index
+MAX_REPLAY = 500
+FULL_REBUILD = 0
+FRESHNESS_INTERVAL = 1.0
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui
+ma mais me meme mes moi mon ne nos notre nous on ou par pas pour qu que qui sa
+se ses son sur ta te tes toi ton tu un une vos votre vous c d j l m n s t y
+est sont etre avoir comme plus tout tous cette cet
+the and of to in for on with an is
+""".split())
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Suffixes retirés par la racinisation, du plus long au plus court
+SUFFIXES = (
+    'issements', 'issement', 'atrices', 'atrice', 'ateurs', 'ateur',
+    'ations', 'ation', 'ements', 'ement', 'ismes', 'isme', 'istes', 'iste',
+    'iques', 'ique', 'ables', 'able', 'euses', 'euse', 'ments', 'ment',
+    'ites', 'ite', 'eurs', 'eur', 'ives', 'ive', 'ifs', 'if', 'eux',
+    'ees', 'ee', 'er', 'ez', 'es', 'e', 's',
+)
+MIN_STEM_LENGTH = 3
+
+
+def stem(word):
+    """Racinisation française légère par suppression de suffixes"""
+    if len(word) <= MIN_STEM_LENGTH or word.isdigit():
+        return word
+
+    if word.endswith('aux') and len(word) > 4:
+        return word[:-3] + 'al'
+
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+
+    return word
+
+
+def split_words(text):
+    """Découpe un texte plié en mots, sans les mots vides"""
+    return [w for w in TOKEN_RE.findall(fold(text)) if w not in STOPWORDS]
+
+
+def tokenize(text):
+    """Texte brut -> liste de racines indexables"""
+    return [stem(w) for w in split_words(text)]
+
+
+def trigrams(term):
+    """Trigrammes d'un terme, bornés par des espaces"""
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def preserve_order(ids):
+    """Expression ORDER BY qui conserve l'ordre d'une liste d'identifiants"""
+    return Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+        default=Value(len(ids)),
+        output_field=IntegerField(),
+    )
+
+
+class CourseSearchIndex:
+    """Index inversé des cours publiés, propre à chaque processus"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+        self.version = None
+        self.checked_at = 0.0
+
+    def reset(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.total_length = 0.0
+        self.trigram_terms = defaultdict(set)
+        self._sorted_terms = None
+
+    @property
+    def is_built(self):
+        return self.version is not None
+
+    # ------------------------------------------------------------------
+    # Indexation
+    # ------------------------------------------------------------------
+
+    def add(self, course_id, title, description, category_name):
+        """Indexe (ou réindexe) un cours"""
+        weighted = Counter()
+        length = 0.0
+        for field, text in (('title', title), ('description', description), ('category', category_name)):
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                weighted[term] += weight
+                length += weight
+
+        with self.lock:
+            self.remove(course_id)
+            for term, frequency in weighted.items():
+                if term not in self.postings:
+                    self._add_term(term)
+                self.postings[term][course_id] = frequency
+            self.documents[course_id] = (length, tuple(weighted))
+            self.total_length += length
+
+    def remove(self, course_id):
+        """Retire un cours de l'index"""
+        with self.lock:
+            document = self.documents.pop(course_id, None)
+            if document is None:
+                return
+            length, terms = document
+            self.total_length -= length
+            for term in terms:
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(course_id, None)
+                if not posting:
+                    del self.postings[term]
+                    self._remove_term(term)
+
+    def _add_term(self, term):
+        for gram in trigrams(term):
+            self.trigram_terms[gram].add(term)
+        self._sorted_terms = None
+
+    def _remove_term(self, term):
+        for gram in trigrams(term):
+            terms = self.trigram_terms.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.trigram_terms[gram]
+        self._sorted_terms = None
+
+    def load(self, rows):
+        """Reconstruit l'index à partir de tuples (id, titre, description, catégorie)"""
+        with self.lock:
+            self.reset()
+            for row in rows:
+                self.add(*row)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def _prefix_terms(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        position = bisect.bisect_left(terms, prefix)
+        matches = []
+        while position < len(terms) and terms[position].startswith(prefix):
+            matches.append(terms[position])
+            position += 1
+        return matches
+
+    def _fuzzy_terms(self, term):
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self.trigram_terms.get(gram, ()):
+                shared[candidate] += 1
+
+        matches = []
+        for candidate, common in shared.items():
+            similarity = common / (len(grams) + len(trigrams(candidate)) - common)
+            if similarity >= FUZZY_THRESHOLD:
+                matches.append((candidate, similarity))
+        return matches
+
+    def expand(self, word, is_last):
+        """Termes du vocabulaire correspondant à un mot de la requête, avec leur poids"""
+        root = stem(word)
+        expansions = {}
+
+        if root in self.postings:
+            expansions[root] = 1.0
+
+        # Recherche à la frappe : le dernier mot est souvent incomplet
+        if is_last and len(word) >= MIN_PREFIX_LENGTH:
+            for term in self._prefix_terms(word) + self._prefix_terms(root):
+                expansions.setdefault(term, 0.9)
+
+        if not expansions and len(root) >= MIN_STEM_LENGTH:
+            for term, similarity in self._fuzzy_terms(root):
+                expansions[term] = similarity * 0.8
+
+        if len(expansions) > MAX_EXPANSIONS:
+            best = heapq.nlargest(
+                MAX_EXPANSIONS,
+                expansions.items(),
+                key=lambda item: (item[1], len(self.postings[item[0]]))
+            )
+            expansions = dict(best)
+        return expansions
+
+    def search(self, query, limit=None):
+        """Retourne les identifiants des cours classés par pertinence BM25"""
+        words = split_words(query)
+        if not words:
+            return []
+
+        with self.lock:
+            total_docs = len(self.documents)
+            if not total_docs:
+                return []
+            average_length = self.total_length / total_docs
+
+            scores = defaultdict(float)
+            matched = defaultdict(int)
+
+            for position, word in enumerate(words):
+                expansions = self.expand(word, is_last=position == len(words) - 1)
+                word_scores = {}
+                for term, boost in expansions.items():
+                    posting = self.postings[term]
+                    idf = math.log(1 + (total_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for course_id, frequency in posting.items():
+                        length = self.documents[course_id][0]
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                        score = boost * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                        if score > word_scores.get(course_id, 0.0):
+                            word_scores[course_id] = score
+                for course_id, score in word_scores.items():
+                    scores[course_id] += score
+                    matched[course_id] += 1
+
+        # Tous les mots doivent correspondre ; sinon on se rabat sur le « OU »
+        required = len(words)
+        candidates = {cid: s for cid, s in scores.items() if matched[cid] == required} or scores
+
+        if limit:
+            ranked = heapq.nlargest(limit, candidates.items(), key=lambda item: (item[1], -item[0]))
+        else:
+            ranked = sorted(candidates.items(), key=lambda item: (-item[1], item[0]))
+        return [course_id for course_id, _ in ranked]
+
+
+index = CourseSearchIndex()
+
+
+def _course_rows(course_ids=None):
+    from .models import Course
+
+    queryset = Course.objects.filter(is_published=True)
+    if course_ids is not None:
+        queryset = queryset.filter(id__in=course_ids)
+    return queryset.values_list('id', 'title', 'description', 'category__name').iterator(chunk_size=2000)
+
+
+def _remote_version():
+    """Dernière version publiée : identifiant de la dernière ligne du journal"""
+    from .models import SearchIndexChange
+
+    return SearchIndexChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _publish_change(course_id):
+    """Enregistre une modification pour que les autres workers la rejouent"""
+    from .models import SearchIndexChange
+
+    version = SearchIndexChange.objects.create(course_id=course_id).id
+    # Élagage : un worker en retard de plus de MAX_REPLAY lignes reconstruit de toute façon
+    if version % MAX_REPLAY == 0:
+        SearchIndexChange.objects.filter(id__lte=version - MAX_REPLAY).delete()
+    return version
+
+
+def rebuild_index():
+    """Reconstruit entièrement l'index du processus courant"""
+    started = time.monotonic()
+    with index.lock:
+        version = _remote_version()
+        index.load(_course_rows())
+        index.version = version
+        index.checked_at = time.monotonic()
+    logger.info(
+        "Index de recherche reconstruit: %s cours, %s termes en %.2fs",
+        len(index.documents), len(index.postings), time.monotonic() - started
+    )
+    return index
+
+
+def _reindex(course_ids):
+    rows = {row[0]: row for row in _course_rows(course_ids)}
+    with index.lock:
+        for course_id in course_ids:
+            if course_id in rows:
+                index.add(*rows[course_id])
+            else:
+                index.remove(course_id)
+
+
+def ensure_fresh():
+    """Rattrape les modifications faites par les autres workers"""
+    now = time.monotonic()
+    if index.is_built and now - index.checked_at < FRESHNESS_INTERVAL:
+        return index
+
+    with index.lock:
+        if not index.is_built:
+            return rebuild_index()
+
+        remote = _remote_version()
+        index.checked_at = now
+        if remote == index.version:
+            return index
+
+        if remote < index.version or remote - index.version > MAX_REPLAY:
+            return rebuild_index()
+
+        from .models import SearchIndexChange
+
+        changes = list(SearchIndexChange.objects.filter(
+            id__gt=index.version, id__lte=remote
+        ).values_list('course_id', flat=True))
+        # Ligne manquante (élaguée, ou transaction pas encore visible) : on ne devine pas
+        if len(changes) != remote - index.version or FULL_REBUILD in changes:
+            return rebuild_index()
+
+        _reindex(set(changes))
+        index.version = remote
+    return index
+
+
+def search_course_ids(query, limit=None):
+    """Identifiants des cours publiés correspondant à la requête, par pertinence"""
+    return ensure_fresh().search(query, limit=limit)
+
+
+def refresh_course(course_id):
+    """Met à jour l'index après l'enregistrement ou la suppression d'un cours"""
+    refresh_courses([course_id])
+
+
+def refresh_courses(course_ids):
+    """Publie une modification par cours, puis les réindexe en une requête"""
+    course_ids = list(course_ids)
+    if not course_ids:
+        return
+    versions = [_publish_change(course_id) for course_id in course_ids]
+    with index.lock:
+        if not index.is_built:
+            return
+        _reindex(course_ids)
+        # Versions consécutives à la nôtre : aucune modification d'un autre worker à rejouer
+        if index.version == versions[0] - 1 and versions[-1] - versions[0] == len(versions) - 1:
+            index.version = versions[-1]
+
+
+def request_full_rebuild():
+    """Demande à tous les workers de reconstruire leur index"""
+    _publish_change(FULL_REBUILD)
+    return rebuild_index()
@@ -0,0 +1,113 @@
+# apps/courses/signals.py
+"""
+Signaux Courses - WIM Platform
+Maintient les structures dérivées (index de recherche, facettes, instantané,
+cartes en cache) à jour
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+from django.dispatch import receiver
+
+from . import catalog, facets, search
+from .models import Category, Course, Lesson, Module
+from .outline import bump_structure_version, schedule_positions
+
+
+@receiver(pre_save, sender=Course)
+def course_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Mémorise la combinaison de facettes avant enregistrement"""
+    if instance.pk is None:
+        instance._facet_key_before = None
+    elif update_fields is not None and not facets.FACET_FIELDS & set(update_fields):
+        instance._facet_key_before = False
+    else:
+        instance._facet_key_before = facets.stored_facet_key(instance.pk)
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, update_fields=None, **kwargs):
+    """Réindexe le cours (il sort de l'index s'il est dépublié)"""
+    before = getattr(instance, '_facet_key_before', False)
+    if before is not False:
+        facets.move(before, facets.facet_key(instance))
+
+    # Compteurs et notes (update_fields ciblés) ne changent pas le document indexé
+    if update_fields is None or search.INDEXED_FIELDS & set(update_fields):
+        transaction.on_commit(lambda: search.refresh_course(instance.pk))
+
+    if update_fields is None or (catalog.SNAPSHOT_FIELDS - catalog.POPULARITY_FIELDS) & set(update_fields):
+        transaction.on_commit(catalog.schedule_rebuild)
+    elif catalog.POPULARITY_FIELDS & set(update_fields):
+        transaction.on_commit(catalog.schedule_popularity_rebuild)
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    facets.adjust(facets.facet_key(instance), -1)
+    transaction.on_commit(lambda: search.refresh_course(instance.pk))
+    transaction.on_commit(catalog.schedule_rebuild)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    """Le nom de la catégorie fait partie des documents indexés et des cartes"""
+    if created:
+        return
+    instance.courses.update(updated_at=timezone.now())
+    course_ids = list(instance.courses.filter(is_published=True).values_list('id', flat=True))
+    transaction.on_commit(lambda: search.refresh_courses(course_ids))
+
+
+@receiver(pre_delete, sender=Category)
+def category_pre_delete(sender, instance, **kwargs):
+    """Invalide les cartes des cours avant qu'ils ne perdent leur catégorie"""
+    instance.courses.update(updated_at=timezone.now())
+    # Après la suppression la relation est vide : on garde les cours à réindexer
+    instance._published_course_ids = list(instance.courses.filter(is_published=True).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    """Les cours de la catégorie passent sans catégorie (SET_NULL)"""
+    course_ids = getattr(instance, '_published_course_ids', [])
+    transaction.on_commit(lambda: search.refresh_courses(course_ids))
+    transaction.on_commit(facets.rebuild)
+    transaction.on_commit(catalog.schedule_rebuild)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_changed(sender, instance, **kwargs):
+    """Le plan du cours et le rang des leçons doivent être recalculés"""
+    bump_structure_version(instance.course_id)
+    schedule_positions(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    course_id = Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True).first()
+    if course_id:
+        bump_structure_version(course_id)
+        schedule_positions(course_id)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def instructor_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Mémorise le nom enregistré avant la modification"""
+    if instance._state.adding or (update_fields is not None and 'name' not in update_fields):
+        instance._name_before = None
+    else:
+        instance._name_before = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def instructor_saved(sender, instance, created, **kwargs):
+    """Le nom du formateur figure sur les cartes de ses cours"""
+    before = getattr(instance, '_name_before', None)
+    if created or before is None or before == instance.name:
+        return
+    Course.objects.filter(instructor=instance).update(updated_at=timezone.now())
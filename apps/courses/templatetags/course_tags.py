@@ -0,0 +1,11 @@
+from django import template
+
+from apps.courses.fragments import render_course_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def course_cards(courses, template_name):
+    """Cartes de cours rendues depuis le cache de fragments"""
+    return render_course_cards(courses, template_name)
@@ -1,3 +1,376 @@
-from django.test import TestCase
+# apps/courses/tests.py
+"""
+Tests Courses - WIM Platform
+Recherche plein texte, pagination par curseur, reconstruction de l'instantané,
+compteurs de facettes, histogramme des notes et lecture des recommandations
+"""
 
-# Create your tests here.
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.enrollments.models import Enrollment, Review
+from apps.users.models import User
+from apps.text import fold
+from . import catalog, facets, recommendations, search
+from .models import Category, Course, CourseFacetCount, UserRecommendation
+from .pagination import keyset_paginate
+
+
+def create_course(instructor, title, **fields):
+    fields.setdefault('is_published', True)
+    fields.setdefault('description', title)
+    fields.setdefault('full_description', fields['description'])
+    return Course.objects.create(title=title, instructor=instructor, **fields)
+
+
+class SearchTests(TestCase):
+    """Index de recherche : pliage, racinisation, préfixe, fautes, BM25 et synchronisation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.cooking = Category.objects.create(name='Gastronomie')
+        cls.python = create_course(instructor, 'Programmation Python', slug='python')
+        cls.web = create_course(instructor, 'Développement web', slug='web', description='Django et Python pour le web')
+        cls.cuisine = create_course(instructor, 'Cuisine française', slug='cuisine', description='Recettes',
+                                    category=cls.cooking)
+        create_course(instructor, 'Python avancé', slug='brouillon', is_published=False)
+
+    def setUp(self):
+        self.reset_index()
+        self.addCleanup(self.reset_index)
+
+    def reset_index(self):
+        with search.index.lock:
+            search.index.reset()
+            search.index.version = None
+            search.index.checked_at = 0.0
+
+    def ids(self, query):
+        return search.search_course_ids(query)
+
+    def test_fold_and_stem(self):
+        self.assertEqual(fold('Élève Œuvre'), 'eleve oeuvre')
+        self.assertEqual(search.tokenize('Les programmations'), ['programm'])
+
+    def test_accents_and_inflections_match(self):
+        self.assertEqual(self.ids('developpement'), [self.web.pk])
+        self.assertEqual(self.ids('PROGRAMMATIONS'), [self.python.pk])
+        self.assertEqual(self.ids('cuisine francaise'), [self.cuisine.pk])
+
+    def test_prefix_and_typo_tolerance(self):
+        # Le dernier mot est complété, les autres tolèrent une faute
+        self.assertEqual(set(self.ids('pyth')), {self.python.pk, self.web.pk})
+        self.assertEqual(self.ids('recetes cuisine'), [self.cuisine.pk])
+        self.assertEqual(self.ids('quantique'), [])
+
+    def test_bm25_ranks_title_matches_first(self):
+        self.assertEqual(self.ids('python'), [self.python.pk, self.web.pk])
+
+    def test_course_save_refreshes_the_index(self):
+        self.ids('python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cuisine.title = 'Cuisine italienne'
+            self.cuisine.save()
+        self.assertEqual(self.ids('italienne'), [self.cuisine.pk])
+        self.assertEqual(search.index.version, search._remote_version())
+
+    def test_changes_from_another_worker_are_replayed(self):
+        self.ids('python')
+        # Autre worker : la base et le journal changent, pas l'index de ce processus
+        Course.objects.filter(pk=self.cuisine.pk).update(title='Pâtisserie')
+        search._publish_change(self.cuisine.pk)
+        search.index.checked_at = 0.0
+
+        with mock.patch.object(search, 'rebuild_index') as rebuild:
+            self.assertEqual(self.ids('patisserie'), [self.cuisine.pk])
+        rebuild.assert_not_called()
+
+    def test_deleted_category_is_removed_from_documents(self):
+        self.assertEqual(self.ids('gastronomie'), [self.cuisine.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cooking.delete()
+        self.assertEqual(self.ids('gastronomie'), [])
+
+
+class KeysetPaginationTests(TestCase):
+    """Parcours page par page : ni doublon ni cours sauté à la frontière des pages"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        titles = ['Alpha', 'Beta', 'Beta', 'Beta', 'Gamma', 'Delta', 'Epsilon']
+        cls.courses = [create_course(cls.instructor, title, slug=f'cours-{i}') for i, title in enumerate(titles)]
+        create_course(cls.instructor, 'Brouillon', slug='brouillon', is_published=False)
+
+        # Dates identiques de part et d'autre d'une frontière : l'id départage
+        now = timezone.now()
+        for i, course in enumerate(cls.courses):
+            Course.objects.filter(pk=course.pk).update(created_at=now - timedelta(days=i // 3))
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(CATALOG_SNAPSHOT_PATH=str(Path(directory) / 'catalog.npy'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        catalog.rebuild()
+        catalog._state.update(snapshot=None, signature=None, checked_at=0.0)
+        self.addCleanup(catalog._state.update, snapshot=None, signature=None, checked_at=0.0)
+
+    def walk(self, paginate, sort, per_page=2):
+        ids, cursor = [], None
+        while True:
+            page = paginate(sort, cursor, per_page)
+            ids += [course.pk for course in page]
+            self.assertLessEqual(len(page), per_page)
+            if not page.has_next():
+                return ids
+            cursor = page.next_cursor
+
+    def expected(self, sort):
+        descending = sort.startswith('-')
+        queryset = Course.objects.filter(is_published=True).order_by(sort, '-id' if descending else 'id')
+        return list(queryset.values_list('id', flat=True))
+
+    def test_database_pages_cover_every_course_once(self):
+        queryset = Course.objects.filter(is_published=True)
+        for sort in ('-created_at', 'title'):
+            with self.subTest(sort=sort):
+                ids = self.walk(lambda *args: keyset_paginate(queryset, *args), sort)
+                self.assertEqual(ids, self.expected(sort))
+
+    def test_snapshot_pages_match_database_order(self):
+        for sort in ('-created_at', 'title', 'price', '-total_students'):
+            with self.subTest(sort=sort):
+                self.assertEqual(self.walk(catalog.keyset_page, sort), self.expected(sort))
+
+    def test_snapshot_cursor_continues_on_database(self):
+        queryset = Course.objects.filter(is_published=True)
+        first = catalog.keyset_page('title', None, 3)
+        second = keyset_paginate(queryset, 'title', first.next_cursor, 3)
+
+        ids = [course.pk for course in first] + [course.pk for course in second]
+        self.assertEqual(ids, self.expected('title')[:6])
+
+
+class SnapshotRebuildTests(TestCase):
+    """Les compteurs sont regroupés ; un worker ne refait pas une reconstruction déjà faite"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.course = create_course(cls.instructor, 'Django')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(CATALOG_SNAPSHOT_PATH=str(Path(directory) / 'catalog.npy'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def scheduled(self, **changes):
+        with mock.patch.object(catalog, 'schedule_rebuild') as structure, \
+                mock.patch.object(catalog, 'schedule_popularity_rebuild') as popularity, \
+                self.captureOnCommitCallbacks(execute=True):
+            for field, value in changes.items():
+                setattr(self.course, field, value)
+            self.course.save(update_fields=[*changes, 'updated_at'])
+        return structure.call_count, popularity.call_count
+
+    def test_popularity_counters_use_the_periodic_rebuild(self):
+        self.assertEqual(self.scheduled(total_students=3), (0, 1))
+        self.assertEqual(self.scheduled(rating=4.5), (0, 1))
+        self.assertEqual(self.scheduled(title='Django avancé'), (1, 0))
+
+    def test_rebuild_is_skipped_when_already_covered(self):
+        changed_at = time.time()
+        self.assertEqual(catalog.rebuild_since(changed_at), 1)
+        # Un autre worker a relu la base après la modification : rien à refaire
+        self.assertIsNone(catalog.rebuild_since(changed_at))
+        self.assertEqual(catalog.rebuild_since(time.time()), 1)
+
+
+class FacetCountTests(TestCase):
+    """Compteurs de facettes maintenus par delta à chaque enregistrement de cours"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.python = Category.objects.create(name='Python')
+        cls.web = Category.objects.create(name='Web')
+
+    def counts(self, **filters):
+        facets.invalidate()
+        return facets.facet_counts(**filters)
+
+    def assert_matches_rebuild(self):
+        stored = set(CourseFacetCount.objects.filter(count__gt=0).values_list(
+            'category_id', 'difficulty', 'price_bucket', 'count'
+        ))
+        rebuilt = {(c.category_id, c.difficulty, c.price_bucket, c.count) for c in facets.rebuild()}
+        self.assertEqual(stored, rebuilt)
+
+    def test_create_counts_published_courses_only(self):
+        create_course(self.instructor, 'Django', category=self.python, price=0)
+        create_course(self.instructor, 'Flask', category=self.python, price=20, difficulty='advanced')
+        create_course(self.instructor, 'Brouillon', category=self.web, is_published=False)
+
+        counts = self.counts()
+        self.assertEqual(counts['total'], 2)
+        self.assertEqual(counts['categories'], {self.python.id: 2})
+        self.assertEqual(counts['prices'], {'free': 1, 'paid': 1})
+        self.assert_matches_rebuild()
+
+    def test_changes_move_the_course_between_combinations(self):
+        course = create_course(self.instructor, 'Django', category=self.python)
+
+        course.category = self.web
+        course.difficulty = 'intermediate'
+        course.price = 49
+        course.save()
+        counts = self.counts()
+        self.assertEqual(counts['categories'], {self.web.id: 1})
+        self.assertEqual(counts['difficulties'], {'intermediate': 1})
+        self.assertEqual(counts['prices'], {'paid': 1})
+
+        course.is_published = False
+        course.save(update_fields=['is_published'])
+        self.assertEqual(self.counts()['total'], 0)
+
+        course.is_published = True
+        course.save(update_fields=['is_published'])
+        self.assertEqual(self.counts(category_id=self.web.id)['total'], 1)
+        self.assert_matches_rebuild()
+
+    def test_delete_and_unrelated_updates(self):
+        course = create_course(self.instructor, 'Django', category=self.python)
+        create_course(self.instructor, 'Flask', category=self.python)
+
+        # Un compteur mis à jour seul ne relit pas la combinaison
+        course.total_students = 12
+        with self.assertNumQueries(1):
+            course.save(update_fields=['total_students'])
+
+        course.delete()
+        counts = self.counts()
+        self.assertEqual(counts['total'], 1)
+        self.assertEqual(counts['difficulties'], {'beginner': 1})
+        self.assert_matches_rebuild()
+
+    def test_each_facet_ignores_its_own_filter(self):
+        create_course(self.instructor, 'Django', category=self.python, difficulty='beginner')
+        create_course(self.instructor, 'React', category=self.web, difficulty='advanced')
+
+        counts = self.counts(category_id=self.python.id)
+        self.assertEqual(counts['total'], 1)
+        self.assertEqual(counts['categories'], {self.python.id: 1, self.web.id: 1})
+        self.assertEqual(counts['difficulties'], {'beginner': 1})
+
+
+class RatingHistogramTests(TestCase):
+    """Histogramme et moyenne des notes maintenus par delta à chaque avis"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.students = [
+            User.objects.create_user(f'etudiant{i}@example.com', 'secret', name=f'Étudiant {i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        self.course = create_course(self.instructor, 'Django')
+
+    def assert_histogram(self, expected, rating):
+        self.course.refresh_from_db()
+        self.assertEqual([self.course.rating_1, self.course.rating_2, self.course.rating_3,
+                          self.course.rating_4, self.course.rating_5], expected)
+        self.assertEqual(self.course.total_reviews, sum(expected))
+        self.assertEqual(self.course.rating_sum, sum(star * count for star, count in zip(range(1, 6), expected)))
+        self.assertEqual(float(self.course.rating), rating)
+
+        # Le recalcul complet donne le même état que les deltas
+        delta_state = (self.course.total_reviews, self.course.rating_sum, self.course.rating)
+        self.course.update_rating()
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.total_reviews, self.course.rating_sum, self.course.rating), delta_state)
+
+    def test_add_change_and_delete_reviews(self):
+        first = Review.objects.create(user=self.students[0], course=self.course, rating=5)
+        Review.objects.create(user=self.students[1], course=self.course, rating=4)
+        Review.objects.create(user=self.students[2], course=self.course, rating=4)
+        self.assert_histogram([0, 0, 0, 2, 1], 4.33)
+
+        first.rating = 1
+        first.save()
+        self.assert_histogram([1, 0, 0, 2, 0], 3.0)
+
+        first.delete()
+        self.assert_histogram([0, 0, 0, 2, 0], 4.0)
+
+        Review.objects.filter(course=self.course).delete()
+        self.assert_histogram([0, 0, 0, 0, 0], 0.0)
+
+    def test_saving_other_fields_keeps_histogram(self):
+        review = Review.objects.create(user=self.students[0], course=self.course, rating=3)
+        review.helpful_count = 4
+        review.save(update_fields=['helpful_count'])
+        review.comment = 'Très clair'
+        review.save()
+        self.assert_histogram([0, 0, 1, 0, 0], 3.0)
+
+    def test_review_moved_to_another_course(self):
+        other = create_course(self.instructor, 'Flask')
+        review = Review.objects.create(user=self.students[0], course=self.course, rating=2)
+
+        review.course = other
+        review.save()
+        self.assert_histogram([0, 0, 0, 0, 0], 0.0)
+        other.refresh_from_db()
+        self.assertEqual((other.rating_2, other.total_reviews, float(other.rating)), (1, 1, 2.0))
+
+
+class RecommendedCoursesTests(TestCase):
+    """Recommandations lues en une requête, sans les cours suivis depuis le dernier calcul"""
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.student = User.objects.create_user('etudiant@example.com', 'secret', name='Étudiant')
+        cls.courses = [create_course(instructor, f'Cours {i}', slug=f'cours-{i}') for i in range(6)]
+        for rank, course in enumerate(cls.courses[:4], start=1):
+            UserRecommendation.objects.create(user=cls.student, course=course, rank=rank, score=1.0 / rank)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(CATALOG_SNAPSHOT_PATH=str(Path(directory) / 'catalog.npy'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        catalog._state.update(snapshot=None, signature=None, checked_at=0.0)
+        self.addCleanup(catalog._state.update, snapshot=None, signature=None, checked_at=0.0)
+
+    def test_reads_recommendations_by_rank_in_one_query(self):
+        with self.assertNumQueries(1):
+            courses = recommendations.recommended_courses(self.student, limit=3)
+        self.assertEqual(courses, self.courses[:3])
+
+    def test_skips_enrolled_courses(self):
+        Enrollment.objects.create(user=self.student, course=self.courses[0])
+        enrolled = [self.courses[0].pk]
+        with self.assertNumQueries(1):
+            courses = recommendations.recommended_courses(self.student, limit=3, enrolled=enrolled)
+        self.assertEqual(courses, self.courses[1:4])
+
+    def test_completes_with_popular_courses(self):
+        Course.objects.filter(pk=self.courses[5].pk).update(total_students=10)
+        courses = recommendations.recommended_courses(self.student, limit=4, enrolled=[self.courses[0].pk])
+        self.assertEqual(courses, self.courses[1:4] + [self.courses[5]])
@@ -7,35 +7,92 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Avg, Count
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.contrib import messages
-
-from .models import Course, Module, Lesson, Category
-from apps.enrollments.models import Enrollment, Review
+from django.utils.functional import cached_property
+
+from .models import Course, Module, Lesson, Category, CourseFacetCount
+from .search import search_course_ids, preserve_order
+from .pagination import KEYSET_SORTS, keyset_paginate, approximate_count
+from .facets import facet_counts
+from .outline import get_outline
+from .lesson_page import load_lesson_page
+from . import catalog, related
+from apps.enrollments.models import Enrollment, Review, PROGRESS_FIELDS
 from apps.progress.models import LessonProgress
+from apps.progress.events import record_event
+from apps.progress.summary import get_summary
+
+
+def get_catalog_filters(request):
+    """Options des filtres du catalogue avec leurs effectifs (compteurs de facettes)"""
+    categories = list(Category.objects.filter(is_active=True))
+    selected = {
+        'category': request.GET.get('category', ''),
+        'difficulty': request.GET.get('difficulty', ''),
+        'price': request.GET.get('price', ''),
+    }
+
+    category_id = None
+    if selected['category']:
+        category_id = next((c.id for c in categories if c.slug == selected['category']), -1)
+
+    counts = facet_counts(
+        category_id=category_id,
+        difficulty=selected['difficulty'],
+        price=selected['price'],
+    )
+
+    return {
+        'categories': categories,
+        'difficulty_choices': Course.DIFFICULTY_CHOICES,
+        'category_options': [(c, counts['categories'].get(c.id, 0)) for c in categories],
+        'difficulty_options': [
+            (code, label, counts['difficulties'].get(code, 0)) for code, label in Course.DIFFICULTY_CHOICES
+        ],
+        'price_options': [
+            (code, label, counts['prices'].get(code, 0)) for code, label in CourseFacetCount.PRICE_BUCKET_CHOICES
+        ],
+        'selected_filters': selected,
+        'selected_category_id': category_id,
+        'facet_total': counts['total'],
+    }
 
 
 class CourseListView(ListView):
-    """Liste paginée des cours"""
+    """Liste paginée des cours (pagination par curseur, défilement infini HTMX)"""
     model = Course
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
     paginate_by = 12
+    search_limit = 500
+
+    def get_sort(self):
+        """Tri demandé ; None signifie un classement par pertinence"""
+        sort = self.request.GET.get('sort')
+        if sort in KEYSET_SORTS:
+            return sort
+        if self.request.GET.get('q', '').strip():
+            return None
+        return '-created_at'
+
+    def use_keyset(self):
+        """Curseur par défaut ; ?page= conserve la pagination classique"""
+        return self.sort is not None and 'page' not in self.request.GET
 
     def get_queryset(self):
         queryset = Course.objects.filter(is_published=True).select_related(
             'category', 'instructor'
         )
+        self.sort = self.get_sort()
 
-        # Recherche
-        query = self.request.GET.get('q')
+        # Recherche (index inversé, classement par pertinence)
+        query = self.request.GET.get('q', '').strip()
+        ranked_ids = None
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query)
-            ).distinct()
+            ranked_ids = search_course_ids(query, limit=self.search_limit)
+            queryset = queryset.filter(id__in=ranked_ids)
 
         # Filtrage par catégorie
         category = self.request.GET.get('category')
@@ -47,24 +104,75 @@ class CourseListView(ListView):
         if difficulty:
             queryset = queryset.filter(difficulty=difficulty)
 
-        # Tri
-        sort = self.request.GET.get('sort', '-created_at')
-        allowed_sorts = ['-created_at', 'title', '-rating', 'price', '-total_students']
-        if sort in allowed_sorts:
-            queryset = queryset.order_by(sort)
+        # Filtrage par prix
+        price_range = self.request.GET.get('price')
+        if price_range == 'free':
+            queryset = queryset.filter(price=0)
+        elif price_range == 'paid':
+            queryset = queryset.filter(price__gt=0)
+
+        # Tri (id en départage pour un ordre total)
+        if self.sort:
+            queryset = queryset.order_by(self.sort, '-id' if self.sort.startswith('-') else 'id')
+        else:
+            queryset = queryset.order_by(preserve_order(ranked_ids))
 
         return queryset
 
+    @cached_property
+    def catalog_filters(self):
+        return get_catalog_filters(self.request)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset():
+            return super().paginate_queryset(queryset, page_size)
+
+        cursor = self.request.GET.get('cursor')
+        if self.request.GET.get('q', '').strip():
+            page = keyset_paginate(queryset, self.sort, cursor, page_size)
+            page.approximate_total = approximate_count(queryset)
+        else:
+            # Sans recherche : tri en mémoire sur l'instantané, total donné par les facettes
+            filters = self.catalog_filters
+            page = catalog.keyset_page(
+                self.sort, cursor, page_size,
+                category_id=filters['selected_category_id'],
+                difficulty=filters['selected_filters']['difficulty'],
+                price=filters['selected_filters']['price'],
+            )
+            page.approximate_total = filters['facet_total']
+        return None, page, page.object_list, page.has_next()
+
+    def get_template_names(self):
+        if self.request.htmx:
+            if self.request.GET.get('cursor'):
+                return ['courses/partials/course_page.html']
+            return ['courses/partials/course_results.html']
+        return super().get_template_names()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True)
-        context['difficulty_choices'] = Course.DIFFICULTY_CHOICES
+        page = context['page_obj']
+
+        context['is_keyset'] = self.use_keyset()
+        if context['is_keyset']:
+            context['approximate_total'] = page.approximate_total
+            if page.has_next():
+                params = self.request.GET.copy()
+                params['cursor'] = page.next_cursor
+                context['next_page_url'] = f"{self.request.path}?{params.urlencode()}"
+        elif page is not None:
+            context['approximate_total'] = page.paginator.count
+
+        if not self.request.GET.get('cursor'):
+            context.update(self.catalog_filters)
         return context
 
 
 class CourseDetailView(DetailView):
     """Détails d'un cours"""
     model = Course
+    queryset = Course.objects.select_related('category', 'instructor')
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
     slug_field = 'slug'
@@ -75,10 +183,9 @@ class CourseDetailView(DetailView):
         course = self.object
         user = self.request.user
 
-        # Modules et leçons
-        context['modules'] = course.modules.filter(
-            is_published=True
-        ).prefetch_related('lessons').order_by('order')
+        # Modules et leçons (plan mis en cache)
+        context['outline'] = get_outline(course)
+        context['modules'] = context['outline']['modules']
 
         # Vérifier si l'utilisateur est inscrit
         is_enrolled = False
@@ -93,6 +200,7 @@ class CourseDetailView(DetailView):
                 )
                 is_enrolled = True
                 context['enrollment'] = enrollment
+                context['completed_lesson_ids'] = get_summary(enrollment, context['outline']['version'])['completed_ids']
             except Enrollment.DoesNotExist:
                 pass
 
@@ -106,23 +214,19 @@ class CourseDetailView(DetailView):
         context['reviews'] = reviews
         context['reviews_count'] = course.total_reviews
 
-        # Statistiques des avis
-        review_stats = reviews.aggregate(
-            avg_rating=Avg('rating'),
-            five_stars=Count('id', filter=Q(rating=5)),
-            four_stars=Count('id', filter=Q(rating=4)),
-            three_stars=Count('id', filter=Q(rating=3)),
-            two_stars=Count('id', filter=Q(rating=2)),
-            one_star=Count('id', filter=Q(rating=1)),
-        )
-
-        context['review_stats'] = review_stats
+        # Statistiques des avis : histogramme dénormalisé sur le cours
+        context['review_stats'] = {
+            'avg_rating': course.rating,
+            'five_stars': course.rating_5,
+            'four_stars': course.rating_4,
+            'three_stars': course.rating_3,
+            'two_stars': course.rating_2,
+            'one_star': course.rating_1,
+        }
+        context['rating_histogram'] = course.rating_histogram
 
         # Cours similaires
-        context['similar_courses'] = Course.objects.filter(
-            category=course.category,
-            is_published=True
-        ).exclude(id=course.id)[:3]
+        context['similar_courses'] = related.related_courses(course, limit=3)
 
         return context
 
@@ -136,63 +240,36 @@ class LessonView(LoginRequiredMixin, DetailView):
     slug_url_kwarg = 'lesson_slug'
 
     def get_object(self):
-        course_slug = self.kwargs.get('course_slug')
-        lesson_slug = self.kwargs.get('lesson_slug')
-
-        lesson = get_object_or_404(
-            Lesson,
-            module__course__slug=course_slug,
-            slug=lesson_slug
-        )
-
-        # Vérifier que l'utilisateur est inscrit au cours
-        enrollment = get_object_or_404(
-            Enrollment,
-            user=self.request.user,
-            course=lesson.module.course,
-            is_active=True
-        )
-
-        # Créer ou récupérer la progression de la leçon
-        progress, created = LessonProgress.objects.get_or_create(
-            enrollment=enrollment,
-            lesson=lesson
+        self.page = load_lesson_page(
+            self.request.user,
+            self.kwargs.get('course_slug'),
+            self.kwargs.get('lesson_slug')
         )
-
-        return lesson
+        # Suivi d'étude mis en tampon : aucune écriture pendant la requête
+        record_event(self.request.user.id, self.page.enrollment.course_id, self.page.lesson.id)
+        return self.page.lesson
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        lesson = self.object
-        user = self.request.user
-
-        # Récupérer l'inscription
-        enrollment = Enrollment.objects.get(
-            user=user,
-            course=lesson.module.course,
-            is_active=True
-        )
-
-        # Progression de cette leçon
-        try:
-            progress = LessonProgress.objects.get(
-                enrollment=enrollment,
-                lesson=lesson
-            )
-            context['progress'] = progress
-        except LessonProgress.DoesNotExist:
-            context['progress'] = None
-
-        # Leçons précédente et suivante
-        context['previous_lesson'] = lesson.get_previous_lesson()
-        context['next_lesson'] = lesson.get_next_lesson()
-
-        # Tous les modules du cours
-        context['modules'] = lesson.module.course.modules.filter(
-            is_published=True
-        ).prefetch_related('lessons').order_by('order')
-
-        context['enrollment'] = enrollment
+        page = self.page
+
+        context['enrollment'] = page.enrollment
+        context['progress'] = page.progress
+        context['completed_lesson_ids'] = page.completed_lesson_ids
+
+        # Tous les modules du cours (plan mis en cache)
+        context['outline'] = page.outline
+        context['modules'] = page.outline['modules']
+
+        # Leçons précédente et suivante, rang « k sur N », lus dans le plan
+        if page.navigation:
+            context['previous_lesson'] = page.navigation['previous']
+            context['next_lesson'] = page.navigation['next']
+            context['lesson_position'] = page.navigation['position']
+            context['lesson_total'] = page.navigation['total']
+        else:
+            context['previous_lesson'] = page.lesson.get_previous_lesson()
+            context['next_lesson'] = page.lesson.get_next_lesson()
 
         return context
 
@@ -220,8 +297,8 @@ def complete_lesson(request, lesson_id):
 
     progress.mark_completed()
 
-    # Recalculer la progression globale
-    enrollment.calculate_progress()
+    # La progression globale a été mise à jour par delta
+    enrollment.refresh_from_db(fields=PROGRESS_FIELDS)
 
     if request.htmx:
         return render(request, 'courses/partials/lesson_completed.html', {
@@ -273,12 +350,10 @@ def htmx_search_courses(request):
     courses = Course.objects.filter(is_published=True).select_related('category', 'instructor')
 
     if query:
-        courses = courses.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query)
-        ).distinct()
-
-    courses = courses[:12]
+        course_ids = search_course_ids(query, limit=12)
+        courses = courses.filter(id__in=course_ids).order_by(preserve_order(course_ids))
+    else:
+        courses = courses[:12]
 
     return render(request, 'courses/partials/course_cards.html', {
         'courses': courses
@@ -287,28 +362,20 @@ def htmx_search_courses(request):
 
 def htmx_filter_courses(request):
     """Filtrage dynamique avec HTMX"""
-    category = request.GET.get('category')
-    difficulty = request.GET.get('difficulty')
-    price_range = request.GET.get('price')
-
-    courses = Course.objects.filter(is_published=True).select_related('category', 'instructor')
-
-    if category:
-        courses = courses.filter(category__slug=category)
-
-    if difficulty:
-        courses = courses.filter(difficulty=difficulty)
-
-    if price_range == 'free':
-        courses = courses.filter(price=0)
-    elif price_range == 'paid':
-        courses = courses.filter(price__gt=0)
-
-    courses = courses.order_by('-rating')[:12]
+    context = get_catalog_filters(request)
+
+    # Filtrage et tri en mémoire sur l'instantané du catalogue
+    courses = catalog.select_courses(
+        sort='-rating',
+        limit=12,
+        category_id=context['selected_category_id'],
+        difficulty=context['selected_filters']['difficulty'],
+        price=context['selected_filters']['price'],
+    )
 
-    return render(request, 'courses/partials/course_cards.html', {
-        'courses': courses
-    })
+    context['courses'] = courses
+    context['filters_oob'] = True
+    return render(request, 'courses/partials/course_cards.html', context)
 
 
 @login_required
@@ -0,0 +1,37 @@
+# apps/dashboard/signals.py
+"""
+Signaux Dashboard - WIM Platform
+Marque l'instantané du tableau de bord comme périmé lors des événements qui
+en modifient le contenu : inscription, complétion de leçon, certificat, avis
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.certificates.models import Certificate
+from apps.enrollments.models import Enrollment, Review
+from apps.progress.models import LessonProgress
+from .snapshot import invalidate
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def user_content_changed(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=LessonProgress)
+def lesson_progress_saved(sender, instance, **kwargs):
+    before = getattr(instance, '_completed_before', None)
+    if before is not None and before != instance.is_completed:
+        invalidate(instance.enrollment.user_id)
+
+
+@receiver(post_delete, sender=LessonProgress)
+def lesson_progress_deleted(sender, instance, **kwargs):
+    if instance.is_completed:
+        invalidate(Enrollment.objects.filter(pk=instance.enrollment_id).values_list('user_id', flat=True).first())
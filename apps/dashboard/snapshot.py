@@ -0,0 +1,90 @@
+# apps/dashboard/snapshot.py
+"""
+Instantané du tableau de bord - WIM Platform
+Chaque panneau du tableau de bord (requête HTMX séparée) a sa propre entrée
+de cache par utilisateur et sa propre durée de fraîcheur : un panneau est
+servi en une lecture du cache (get_many de l'instantané et de son marqueur).
+Les événements qui les concernent (inscription, complétion, certificat, avis)
+retirent les marqueurs de fraîcheur : la visite suivante reçoit le panneau
+périmé pendant qu'un thread le recalcule (stale-while-revalidate)
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'dashboard:{}:{}'
+FRESH_KEY = 'dashboard:{}:{}:fresh'
+REFRESH_LOCK_KEY = 'dashboard:{}:{}:refreshing'
+
+# Panneaux du tableau de bord mis en cache séparément
+SECTIONS = ('recent_courses', 'recommendations', 'recent_activity', 'weekly_progress')
+
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+REFRESH_LOCK_TIMEOUT = 60
+
+
+def fresh_timeout(section):
+    """Durée pendant laquelle un panneau est servi sans être recalculé"""
+    default = getattr(settings, 'DASHBOARD_SNAPSHOT_TTL', 300)
+    return getattr(settings, 'DASHBOARD_PANEL_TTL', {}).get(section, default)
+
+
+def store(user_id, section, payload):
+    cache.set(SNAPSHOT_KEY.format(user_id, section), {'payload': payload, 'built_at': timezone.now()},
+              SNAPSHOT_TIMEOUT)
+    # Le marqueur de fraîcheur expire plus tôt que l'instantané
+    cache.set(FRESH_KEY.format(user_id, section), True, fresh_timeout(section))
+
+
+def _refresh(user_id, section, build):
+    try:
+        from apps.users.models import User
+
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            store(user_id, section, build(user))
+    except Exception as e:
+        logger.error(f"Erreur recalcul du tableau de bord ({user_id}, {section}): {e}")
+    finally:
+        cache.delete(REFRESH_LOCK_KEY.format(user_id, section))
+        connection.close()
+
+
+def schedule_refresh(user_id, section, build):
+    """Recalcule un panneau en arrière-plan (un seul recalcul à la fois par utilisateur)"""
+    if not cache.add(REFRESH_LOCK_KEY.format(user_id, section), True, REFRESH_LOCK_TIMEOUT):
+        return
+    threading.Thread(target=_refresh, args=(user_id, section, build), name='dashboard-refresh',
+                     daemon=True).start()
+
+
+def get_payload(user, section, build):
+    """
+    Contenu d'un panneau du tableau de bord : instantané en cache (une lecture),
+    recalculé en arrière-plan s'il est périmé, ou calculé sur place s'il n'existe pas
+    """
+    snapshot_key, fresh_key = SNAPSHOT_KEY.format(user.pk, section), FRESH_KEY.format(user.pk, section)
+    cached = cache.get_many([snapshot_key, fresh_key])
+    snapshot = cached.get(snapshot_key)
+
+    if snapshot is None:
+        payload = build(user)
+        store(user.pk, section, payload)
+        return payload
+
+    if not cached.get(fresh_key):
+        schedule_refresh(user.pk, section, build)
+    return snapshot['payload']
+
+
+def invalidate(user_id):
+    """Marque tous les panneaux comme périmés, après validation de la transaction"""
+    if user_id is not None:
+        transaction.on_commit(lambda: cache.delete_many([FRESH_KEY.format(user_id, section) for section in SECTIONS]))
@@ -12,4 +12,5 @@ urlpatterns = [
     path('search/', views.search_courses, name='search'),
     path('filter/', views.filter_courses, name='filter'),
     path('stats/', views.user_stats, name='stats'),
+    path('panels/<slug:panel>/', views.dashboard_panel, name='panel'),
 ]
\ No newline at end of file
@@ -5,18 +5,22 @@ Views Dashboard - WIM Platform
 Tableau de bord principal avec statistiques
 """
 
+from django.http import Http404
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Avg, Sum, Q
 from django.utils import timezone
 from datetime import timedelta
 
+from apps.enrollments import learning_summary
 from apps.enrollments.models import Enrollment
 from apps.courses.models import Course, Category
+from apps.courses import catalog, recommendations
+from apps.courses.search import search_course_ids, preserve_order
+from apps.progress.activity import ActivityCalendar, local_date
+from .snapshot import get_payload
 from apps.progress.models import LessonProgress, UserStatistics
-from apps.certificates.models import Certificate
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -26,48 +30,17 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-
-        # Statistiques principales
-        enrollments = Enrollment.objects.filter(user=user, is_active=True)
-
-        # Calculer le temps d'étude total (en heures)
-        total_seconds = sum([e.total_time_spent for e in enrollments]) if enrollments.exists() else 0
-        total_hours = round(total_seconds / 3600, 1) if total_seconds > 0 else 0
-
-        # Calculer la progression moyenne
-        if enrollments.exists():
-            avg_progress = enrollments.aggregate(Avg('progress_percentage'))['progress_percentage__avg'] or 0
-            avg_progress = round(avg_progress, 1)
-        else:
-            avg_progress = 0
-
-        # Compter les certificats
-        certificates_count = Certificate.objects.filter(user=user, is_valid=True).count()
-
-        # Compter les cours complétés
-        completed_count = enrollments.filter(is_completed=True).count()
+        # Page légère : compteurs du résumé d'apprentissage, les panneaux sont chargés ensuite via HTMX
+        summary = learning_summary.for_request(self.request)
+        total_seconds = summary['total_study_time']
 
         context.update({
-            'active_courses_count': enrollments.count(),
-            'completed_courses_count': completed_count,
-            'certificates_count': certificates_count,
-            'total_study_hours': total_hours,
-            'average_progress': avg_progress,
-
-            # Cours récents (CORRECTION: récupérer les cours actifs pour l'affichage)
-            'recent_courses': self.get_recent_courses(user),
-
-            # Cours recommandés
-            'recommended_courses': self.get_recommended_courses(user),
-
-            # Activité récente
-            'recent_activity': self.get_recent_activity(user),
-
-            # Progression hebdomadaire
-            'weekly_progress': self.get_weekly_progress(user),
+            'active_courses_count': summary['enrolled_count'],
+            'completed_courses_count': summary['completed_count'],
+            'certificates_count': summary['certificates_count'],
+            'total_study_hours': round(total_seconds / 3600, 1) if total_seconds > 0 else 0,
+            'average_progress': summary['average_progress'],
         })
-
         return context
 
     def get_recent_courses(self, user, limit=6):
@@ -79,37 +52,19 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 is_active=True
             ).select_related('course', 'course__category', 'course__instructor').order_by('-last_accessed')[:limit]
 
-            print(f"Debug: Found {enrollments.count()} enrollments for user {user.email}")  # Debug
-
-            return enrollments
+            return list(enrollments)
         except Exception as e:
             print(f"Erreur get_recent_courses: {e}")
             return []
 
     def get_recommended_courses(self, user, limit=4):
-        """Cours recommandés basés sur les catégories des cours suivis"""
+        """Cours recommandés précalculés (similarité de co-inscription)"""
         try:
-            # Catégories des cours actuels
-            enrolled_categories = Enrollment.objects.filter(
-                user=user
-            ).values_list('course__category', flat=True).distinct()
-
-            if not enrolled_categories:
-                # Si pas de cours, recommander les cours populaires
-                return Course.objects.filter(
-                    is_published=True
-                ).select_related('category', 'instructor').order_by('-total_students')[:limit]
-
-            # Cours recommandés dans les mêmes catégories
-            return Course.objects.filter(
-                category__in=enrolled_categories,
-                is_published=True
-            ).exclude(
-                enrollments__user=user
-            ).select_related('category', 'instructor').order_by('-rating', '-total_students')[:limit]
+            enrolled = learning_summary.get_summary(user)['enrolled_course_ids']
+            return recommendations.recommended_courses(user, limit=limit, enrolled=enrolled)
         except Exception as e:
             print(f"Erreur get_recommended_courses: {e}")
-            return Course.objects.filter(is_published=True).select_related('category', 'instructor')[:limit]
+            return list(Course.objects.filter(is_published=True).select_related('category', 'instructor')[:limit])
 
     def get_recent_activity(self, user, days=7):
         """Activité récente (leçons complétées)"""
@@ -120,33 +75,46 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 is_completed=True,
                 completed_at__gte=since_date
             ).select_related('lesson', 'lesson__module', 'lesson__module__course').order_by('-completed_at')[:10]
-            return activities
+            return list(activities)
         except Exception as e:
             print(f"Erreur get_recent_activity: {e}")
             return []
 
     def get_weekly_progress(self, user):
-        """Progression sur 7 jours"""
+        """Progression sur 7 jours, lue dans l'activité quotidienne"""
         try:
-            progress_data = []
-            for i in range(7):
-                date = timezone.now().date() - timedelta(days=6 - i)
-                completed = LessonProgress.objects.filter(
-                    enrollment__user=user,
-                    is_completed=True,
-                    completed_at__date=date
-                ).count()
-                progress_data.append({
-                    'date': date,
-                    'count': completed
-                })
-            return progress_data
+            today = local_date(user.id)
+            calendar = ActivityCalendar(user.id, since=today - timedelta(days=6), today=today)
+            return calendar.last_days(7)
         except Exception as e:
             print(f"Erreur get_weekly_progress: {e}")
             # Retourner des données vides en cas d'erreur
             return [{'date': timezone.now().date(), 'count': 0} for _ in range(7)]
 
 
+# Panneaux chargés après l'affichage de la page : (variable du gabarit, méthode de DashboardView, gabarit)
+PANELS = {
+    'recent_courses': ('recent_courses', 'get_recent_courses', 'dashboard/partials/panel_recent_courses.html'),
+    'recommendations': ('recommended_courses', 'get_recommended_courses',
+                        'dashboard/partials/panel_recommendations.html'),
+    'recent_activity': ('recent_activity', 'get_recent_activity', 'dashboard/partials/panel_recent_activity.html'),
+    'weekly_progress': ('weekly_progress', 'get_weekly_progress', 'dashboard/partials/panel_weekly_progress.html'),
+}
+
+
+@login_required
+def dashboard_panel(request, panel):
+    """Fragment HTMX d'un panneau du tableau de bord, mis en cache avec sa propre durée"""
+    if panel not in PANELS:
+        raise Http404
+    if not request.htmx:
+        return redirect('dashboard:index')
+
+    name, method, template = PANELS[panel]
+    build = getattr(DashboardView(), method)
+    return render(request, template, {name: get_payload(request.user, panel, build)})
+
+
 @login_required
 def search_courses(request):
     """Recherche de cours en temps réel avec HTMX"""
@@ -154,11 +122,11 @@ def search_courses(request):
 
     try:
         if query:
+            course_ids = search_course_ids(query, limit=12)
             courses = Course.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query),
+                id__in=course_ids,
                 is_published=True
-            ).select_related('category', 'instructor').distinct()[:12]
+            ).select_related('category', 'instructor').order_by(preserve_order(course_ids))
         else:
             courses = Course.objects.filter(is_published=True).select_related('category', 'instructor').order_by(
                 '-created_at')[:12]
@@ -182,15 +150,12 @@ def filter_courses(request):
     difficulty = request.GET.get('difficulty')
 
     try:
-        courses = Course.objects.filter(is_published=True).select_related('category', 'instructor')
-
+        category_id = None
         if category:
-            courses = courses.filter(category__slug=category)
+            category_id = Category.objects.filter(slug=category).values_list('id', flat=True).first() or -1
 
-        if difficulty:
-            courses = courses.filter(difficulty=difficulty)
-
-        courses = courses.order_by('-rating')[:12]
+        # Filtrage et tri en mémoire sur l'instantané du catalogue
+        courses = catalog.select_courses(sort='-rating', limit=12, category_id=category_id, difficulty=difficulty)
 
         # Vérifier si c'est une requête HTMX
         if hasattr(request, 'htmx') and request.htmx:
@@ -221,9 +186,14 @@ def user_stats(request):
             }
         )
 
+        today = local_date(user.id)
+        calendar = ActivityCalendar(user.id, since=today - timedelta(days=6), today=today)
+
         context = {
             'stats': stats,
+            'summary': learning_summary.for_request(request),
             'enrollments': Enrollment.objects.filter(user=user, is_active=True).select_related('course'),
+            'last_7_days': calendar.last_days(7),
         }
 
         return render(request, 'dashboard/stats.html', context)
@@ -231,6 +201,7 @@ def user_stats(request):
         print(f"Erreur user_stats: {e}")
         context = {
             'stats': None,
+            'summary': learning_summary.EMPTY_SUMMARY,
             'enrollments': [],
         }
         return render(request, 'dashboard/stats.html', context)
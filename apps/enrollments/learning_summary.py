@@ -0,0 +1,84 @@
+# apps/enrollments/learning_summary.py
+"""
+Résumé d'apprentissage - WIM Platform
+Compteurs d'un utilisateur (cours suivis, terminés, en cours, favoris,
+certificats, progression moyenne, leçons complétées, temps d'étude) calculés
+en une requête d'agrégation conditionnelle sur ses inscriptions, avec les ids
+des cours suivis, mis en cache par utilisateur et mémorisés pour la durée
+d'une requête
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+
+SUMMARY_KEY = 'learning_summary:{}'
+# Filet de sécurité pour les mises à jour groupées qui ne passent pas par les signaux
+SUMMARY_TIMEOUT = 60 * 10
+
+EMPTY_SUMMARY = {
+    'enrolled_count': 0,
+    'completed_count': 0,
+    'in_progress_count': 0,
+    'favorites_count': 0,
+    'certificates_count': 0,
+    'average_progress': 0,
+    'lessons_completed': 0,
+    'total_study_time': 0,
+    'enrolled_course_ids': [],
+}
+
+
+def build_summary(user_id):
+    """Agrégats conditionnels sur les inscriptions de l'utilisateur, puis ids des cours suivis"""
+    from .models import Enrollment
+
+    active = Q(is_active=True)
+    totals = Enrollment.objects.filter(user_id=user_id).aggregate(
+        enrolled_count=Count('id', filter=active),
+        completed_count=Count('id', filter=active & Q(is_completed=True)),
+        in_progress_count=Count('id', filter=active & Q(is_completed=False)),
+        favorites_count=Count('id', filter=active & Q(is_favorite=True)),
+        # Certificat : relation un-à-un, la jointure ne multiplie pas les lignes
+        certificates_count=Count('certificate', filter=Q(certificate__is_valid=True)),
+        average_progress=Avg('progress_percentage', filter=active),
+        lessons_completed=Sum('completed_lessons'),
+        total_study_time=Sum('total_time_spent', filter=active),
+    )
+
+    summary = dict(EMPTY_SUMMARY)
+    summary.update({key: value for key, value in totals.items() if value is not None})
+    summary['average_progress'] = round(float(summary['average_progress']), 1)
+    # Toutes les inscriptions, actives ou non : exclues des recommandations
+    summary['enrolled_course_ids'] = list(
+        Enrollment.objects.filter(user_id=user_id).values_list('course_id', flat=True)
+    )
+    return summary
+
+
+def get_summary(user):
+    """Résumé de l'utilisateur depuis le cache, recalculé s'il manque"""
+    if not user.is_authenticated:
+        return dict(EMPTY_SUMMARY)
+    key = SUMMARY_KEY.format(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_summary(user.pk)
+        cache.set(key, summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def for_request(request, user=None):
+    """Résumé mémorisé sur la requête (une lecture du cache au plus par utilisateur)"""
+    user = user or request.user
+    memo = request.__dict__.setdefault('_learning_summaries', {})
+    if user.pk not in memo:
+        memo[user.pk] = get_summary(user)
+    return memo[user.pk]
+
+
+def invalidate(*user_ids):
+    """Invalide le résumé après validation de la transaction en cours"""
+    keys = [SUMMARY_KEY.format(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,32 @@
+# apps/enrollments/management/commands/recompute_course_progress.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses.models import Course
+from apps.courses.outline import recompute_positions
+from apps.enrollments.models import Enrollment
+
+
+class Command(BaseCommand):
+    help = 'Recalcule la progression de tous les inscrits des cours, par requêtes ensemblistes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses', help='ID du cours (répétable)')
+        parser.add_argument('--batch-size', type=int, default=5000, help="Inscriptions par requête UPDATE")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.order_by('id')
+        if options['courses']:
+            courses = courses.filter(id__in=options['courses'])
+
+        total = 0
+        for course_id, title in courses.values_list('id', 'title'):
+            started = time.monotonic()
+            # Rang des leçons et nombre de leçons publiées d'abord
+            recompute_positions(course_id)
+            updated = Enrollment.recompute_course_progress(course_id, batch_size=options['batch_size'])
+            total += updated
+            self.stdout.write(f'  - {title}: {updated} inscriptions en {time.monotonic() - started:.2f}s')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} inscriptions recalculées'))
@@ -0,0 +1,81 @@
+# apps/enrollments/management/commands/reconcile_enrollment_progress.py
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.courses.models import Course, Lesson
+from apps.enrollments.models import Enrollment, PROGRESS_FIELDS
+from apps.progress.models import LessonProgress
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de leçons (cours et inscriptions) et corrige les écarts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Affiche les écarts sans les corriger')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Inscriptions traitées par lot')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        # 1. Leçons publiées par cours
+        lesson_counts = dict(Lesson.objects.filter(is_published=True, module__is_published=True).values(
+            'module__course_id'
+        ).annotate(total=Count('id')).values_list('module__course_id', 'total'))
+
+        courses = []
+        totals = {}
+        for course in Course.objects.only('id', 'published_lesson_count').iterator(chunk_size=options['batch_size']):
+            expected = lesson_counts.get(course.pk, 0)
+            totals[course.pk] = expected
+            if course.published_lesson_count != expected:
+                course.published_lesson_count = expected
+                courses.append(course)
+
+        if courses and not dry_run:
+            Course.objects.bulk_update(courses, ['published_lesson_count'], batch_size=500)
+        self.stdout.write(f'  - {len(courses)} cours avec un nombre de leçons publiées erroné')
+
+        # 2. Leçons publiées complétées par inscription
+        completed_counts = dict(LessonProgress.objects.filter(
+            is_completed=True, lesson__is_published=True, lesson__module__is_published=True
+        ).values(
+            'enrollment_id'
+        ).annotate(total=Count('id')).values_list('enrollment_id', 'total'))
+
+        fixed = 0
+        batch = []
+        now = timezone.now()
+        enrollments = Enrollment.objects.only('id', 'course_id', *PROGRESS_FIELDS).order_by('id')
+        for enrollment in enrollments.iterator(chunk_size=options['batch_size']):
+            completed = completed_counts.get(enrollment.pk, 0)
+            total = totals.get(enrollment.course_id, 0)
+            percentage = round(min(completed / total * 100, 100), 2) if total else 0
+            # Sans leçon publiée, l'état terminé est conservé
+            is_completed = completed >= total if total else enrollment.is_completed
+
+            if (enrollment.completed_lessons, float(enrollment.progress_percentage), enrollment.is_completed) == (
+                completed, percentage, is_completed
+            ):
+                continue
+
+            enrollment.completed_lessons = completed
+            enrollment.progress_percentage = percentage
+            enrollment.is_completed = is_completed
+            enrollment.completed_at = (enrollment.completed_at or now) if is_completed else None
+            batch.append(enrollment)
+
+            if len(batch) >= options['batch_size']:
+                fixed += self._save(batch, dry_run)
+                batch = []
+
+        fixed += self._save(batch, dry_run)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {fixed} inscriptions {"à corriger" if dry_run else "corrigées"}')
+        )
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            Enrollment.objects.bulk_update(batch, PROGRESS_FIELDS, batch_size=500)
+        return len(batch)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:01
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_completed_lessons(apps, schema_editor):
+    Enrollment = apps.get_model("enrollments", "Enrollment")
+    LessonProgress = apps.get_model("progress", "LessonProgress")
+
+    counts = LessonProgress.objects.filter(is_completed=True).values("enrollment_id").annotate(total=Count("id"))
+    Enrollment.objects.bulk_update(
+        [Enrollment(id=row["enrollment_id"], completed_lessons=row["total"]) for row in counts],
+        ["completed_lessons"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollments", "0002_initial"),
+        ("progress", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="enrollment",
+            name="completed_lessons",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="leçons complétées"
+            ),
+        ),
+        migrations.RunPython(populate_completed_lessons, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,63 @@
 from django.db import models
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
 
+# Champs de l'inscription dérivés des leçons complétées
+PROGRESS_FIELDS = ['completed_lessons', 'progress_percentage', 'is_completed', 'completed_at']
+
+
+def published_completed_lessons():
+    """
+    Nombre de leçons complétées de l'inscription (expression SQL), limité aux
+    leçons publiées de modules publiés comme published_lesson_count
+    """
+    from apps.progress.models import LessonProgress
+
+    return Coalesce(Subquery(
+        LessonProgress.objects.filter(
+            enrollment=OuterRef('pk'), is_completed=True,
+            lesson__is_published=True, lesson__module__is_published=True,
+        ).order_by().values('enrollment').annotate(total=models.Count('id')).values('total')[:1]
+    ), 0)
+
+
+def progress_updates(completed):
+    """
+    Expressions UPDATE de la progression à partir d'un nombre de leçons
+    complétées (expression SQL) et du nombre de leçons publiées du cours.
+    Un cours qui n'est plus terminé (leçon dé-complétée ou ajoutée) perd son
+    état terminé ; un cours sans leçon publiée garde le sien.
+    """
+    from apps.courses.models import Course
+
+    total = Subquery(Course.objects.filter(pk=OuterRef('course_id')).values('published_lesson_count')[:1])
+    has_lessons = Q(GreaterThan(total, 0))
+    finished = has_lessons & Q(GreaterThanOrEqual(completed, total))
+    return {
+        'progress_percentage': Case(
+            When(finished, then=Value(100)),
+            When(has_lessons, then=Round(Cast(completed, models.FloatField()) * 100 / total, 2)),
+            default=Value(0),
+            output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        ),
+        'is_completed': Case(
+            When(finished, then=Value(True)),
+            When(has_lessons, then=Value(False)),
+            default=models.F('is_completed'),
+        ),
+        'completed_at': Case(
+            When(finished & Q(completed_at__isnull=True), then=Value(timezone.now())),
+            When(finished, then=models.F('completed_at')),
+            When(has_lessons, then=Value(None)),
+            default=models.F('completed_at'),
+        ),
+    }
+
+
 class Enrollment(models.Model):
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='enrollments',
                              verbose_name='utilisateur')
@@ -23,6 +78,9 @@ class Enrollment(models.Model):
 
     total_time_spent = models.IntegerField('temps total (secondes)', default=0)
 
+    # Nombre de leçons complétées, maintenu par delta
+    completed_lessons = models.PositiveIntegerField('leçons complétées', default=0)
+
     class Meta:
         verbose_name = 'inscription'
         verbose_name_plural = 'inscriptions'
@@ -33,32 +91,63 @@ class Enrollment(models.Model):
         return f"{self.user.email} - {self.course.title}"
 
     def calculate_progress(self):
-        """Calcule et met à jour la progression du cours"""
-        from apps.progress.models import LessonProgress
-
-        # Compter le total de leçons dans le cours
-        total_lessons = 0
-        for module in self.course.modules.filter(is_published=True):
-            total_lessons += module.lessons.filter(is_published=True).count()
+        """Recompte les leçons complétées et met à jour la progression du cours"""
+        self.completed_lessons = self.lesson_progress.filter(
+            is_completed=True, lesson__is_published=True, lesson__module__is_published=True
+        ).count()
+        total_lessons = self.course.published_lesson_count
 
         if total_lessons == 0:
             self.progress_percentage = 0
         else:
-            # Compter les leçons complétées
-            completed_lessons = LessonProgress.objects.filter(
-                enrollment=self,
-                is_completed=True
-            ).count()
-
-            self.progress_percentage = (completed_lessons / total_lessons) * 100
-
-            # Marquer comme complété si 100%
-            if self.progress_percentage >= 100:
-                self.is_completed = True
-                if not self.completed_at:
-                    self.completed_at = timezone.now()
-
-        self.save(update_fields=['progress_percentage', 'is_completed', 'completed_at'])
+            self.progress_percentage = round(min(self.completed_lessons / total_lessons * 100, 100), 2)
+
+            # Complété à 100%, sinon plus complété
+            self.is_completed = self.progress_percentage >= 100
+            if not self.is_completed:
+                self.completed_at = None
+            elif not self.completed_at:
+                self.completed_at = timezone.now()
+
+        self.save(update_fields=PROGRESS_FIELDS)
+
+    @classmethod
+    def recompute_course_progress(cls, course_id, batch_size=5000):
+        """
+        Recalcule la progression de toutes les inscriptions d'un cours par
+        requêtes UPDATE ensemblistes, par tranches d'identifiants
+        """
+        completed = published_completed_lessons()
+
+        enrollments = cls.objects.filter(course_id=course_id)
+        updated = 0
+        low = 0
+        while True:
+            # Borne haute de la tranche : le batch_size-ième identifiant suivant
+            high = enrollments.filter(id__gt=low).order_by('id').values_list('id', flat=True)[
+                batch_size - 1:batch_size
+            ].first()
+            chunk = enrollments.filter(id__gt=low)
+            if high is not None:
+                chunk = chunk.filter(id__lte=high)
+            updated += chunk.update(completed_lessons=completed, **progress_updates(completed))
+            if high is None:
+                return updated
+            low = high
+
+    @classmethod
+    def refresh_completion(cls, enrollment_id):
+        """
+        Recompte les leçons publiées complétées de l'inscription et met à jour
+        sa progression en une seule requête UPDATE (après une complétion ou
+        une dé-complétion). Le compte porte sur les seules progressions de
+        l'inscription : une leçon dépubliée n'est pas comptée.
+        """
+        completed = published_completed_lessons()
+        return cls.objects.filter(pk=enrollment_id).update(
+            completed_lessons=completed,
+            **progress_updates(completed)
+        )
 
     def get_time_spent_hours(self):
         """Retourne le temps passé en heures"""
@@ -70,6 +159,10 @@ class Enrollment(models.Model):
             self.started_at = timezone.now()
             self.save(update_fields=['started_at'])
 
+    def completed_lesson_ids(self):
+        """Ensemble des identifiants des leçons complétées (une requête)"""
+        return set(self.lesson_progress.filter(is_completed=True).order_by().values_list('lesson_id', flat=True))
+
 
 class Review(models.Model):
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='reviews', verbose_name='utilisateur')
@@ -0,0 +1,59 @@
+# apps/enrollments/signals.py
+"""
+Signaux Enrollments - WIM Platform
+Maintient la note et l'histogramme des cours à jour à chaque avis, et
+invalide le résumé d'apprentissage à chaque inscription ou certificat
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.certificates.models import Certificate
+from apps.courses import catalog
+from apps.courses.models import Course
+from . import learning_summary
+from .models import Enrollment, Review
+
+
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Mémorise (cours, note) tels qu'enregistrés avant la modification"""
+    if instance.pk is None:
+        instance._rating_before = None
+    elif update_fields is not None and not {'rating', 'course', 'course_id'} & set(update_fields):
+        instance._rating_before = False
+    else:
+        instance._rating_before = Review.objects.filter(pk=instance.pk).values_list('course_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    before = getattr(instance, '_rating_before', False)
+    if before is False or before == (instance.course_id, instance.rating):
+        return
+
+    if before is not None and before[0] != instance.course_id:
+        Course.apply_review_change(before[0], old_rating=before[1])
+        before = None
+
+    Course.apply_review_change(
+        instance.course_id,
+        old_rating=before[1] if before else None,
+        new_rating=instance.rating,
+    )
+    transaction.on_commit(catalog.schedule_popularity_rebuild)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    Course.apply_review_change(instance.course_id, old_rating=instance.rating)
+    transaction.on_commit(catalog.schedule_popularity_rebuild)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def learning_summary_changed(sender, instance, **kwargs):
+    learning_summary.invalidate(instance.user_id)
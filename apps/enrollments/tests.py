@@ -1,3 +1,263 @@
-from django.test import TestCase
+# apps/enrollments/tests.py
+"""
+Tests Enrollments - WIM Platform
+Résumé d'apprentissage (calcul, cache et invalidation) et progression des
+inscriptions quand les leçons publiées changent
+"""
 
-# Create your tests here.
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from apps.certificates.models import Certificate
+from apps.courses.models import Course, Lesson, Module
+from apps.progress.models import LessonProgress
+from apps.progress.sync import apply_entries, parse_entries
+from apps.users.models import User
+from . import learning_summary
+from .models import Enrollment
+
+
+class LearningSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.student = User.objects.create_user('etudiant@example.com', 'secret', name='Étudiant')
+        cls.courses = [
+            Course.objects.create(title=title, description=title, full_description=title,
+                                  instructor=instructor, is_published=True)
+            for title in ('Django', 'Flask')
+        ]
+        module = Module.objects.create(course=cls.courses[0], title='Bases')
+        cls.lesson = Lesson.objects.create(module=module, title='Modèles')
+
+    def setUp(self):
+        cache.delete(learning_summary.SUMMARY_KEY.format(self.student.pk))
+
+    def summary(self):
+        return learning_summary.get_summary(self.student)
+
+    def enroll(self, course, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Enrollment.objects.create(user=self.student, course=course, **fields)
+
+    def test_build_summary_counts(self):
+        self.enroll(self.courses[0], is_favorite=True, total_time_spent=600)
+        self.enroll(self.courses[1], is_completed=True, progress_percentage=100, total_time_spent=900)
+
+        summary = learning_summary.build_summary(self.student.pk)
+        self.assertEqual(summary['enrolled_count'], 2)
+        self.assertEqual(summary['completed_count'], 1)
+        self.assertEqual(summary['in_progress_count'], 1)
+        self.assertEqual(summary['favorites_count'], 1)
+        self.assertEqual(summary['average_progress'], 50.0)
+        self.assertEqual(summary['total_study_time'], 1500)
+        self.assertEqual(sorted(summary['enrolled_course_ids']), [course.pk for course in self.courses])
+
+    def test_summary_is_cached(self):
+        self.summary()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.summary()['enrolled_count'], 0)
+
+    def test_enrollment_changes_invalidate(self):
+        self.assertEqual(self.summary()['enrolled_count'], 0)
+
+        enrollment = self.enroll(self.courses[0])
+        self.assertEqual(self.summary()['enrolled_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.is_favorite = True
+            enrollment.save()
+        self.assertEqual(self.summary()['favorites_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.delete()
+        self.assertEqual(self.summary()['enrolled_count'], 0)
+
+    def test_certificate_invalidates(self):
+        enrollment = self.enroll(self.courses[0], is_completed=True)
+        self.assertEqual(self.summary()['certificates_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Certificate.objects.create(user=self.student, course=self.courses[0], enrollment=enrollment)
+        self.assertEqual(self.summary()['certificates_count'], 1)
+
+    def test_lesson_completion_invalidates(self):
+        enrollment = self.enroll(self.courses[0])
+        self.assertEqual(self.summary()['lessons_completed'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = LessonProgress.objects.create(enrollment=enrollment, lesson=self.lesson)
+            progress.mark_completed()
+        self.assertEqual(self.summary()['lessons_completed'], 1)
+
+    def test_sync_invalidates(self):
+        self.enroll(self.courses[0])
+        self.assertEqual(self.summary()['total_study_time'], 0)
+
+        entries = parse_entries([{
+            'lesson': self.lesson.pk, 'state': 'completed', 'time_spent': 120,
+            'client_timestamp': timezone.now().isoformat(),
+        }])
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_entries(self.student, entries)
+
+        summary = self.summary()
+        self.assertEqual((summary['lessons_completed'], summary['total_study_time']), (1, 120))
+
+    def test_invalidation_waits_for_commit(self):
+        enrollment = self.enroll(self.courses[0])
+        self.summary()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Enrollment.objects.filter(pk=enrollment.pk).update(is_favorite=True)
+            learning_summary.invalidate(self.student.pk)
+            self.assertEqual(self.summary()['favorites_count'], 0)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_for_request_reads_once(self):
+        request = RequestFactory().get('/')
+        request.user = self.student
+        learning_summary.for_request(request)
+        with self.assertNumQueries(0):
+            learning_summary.for_request(request)
+
+
+class CourseProgressTestCase(TestCase):
+    """Un cours de quatre leçons publiées et un étudiant inscrit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.student = User.objects.create_user('etudiant@example.com', 'secret', name='Étudiant')
+        cls.course = Course.objects.create(title='Django', description='Django', full_description='Django',
+                                           instructor=instructor, is_published=True)
+
+    def setUp(self):
+        self.module = Module.objects.create(course=self.course, title='Bases', order=1)
+        self.lessons = [self.add_lesson(order) for order in range(1, 5)]
+        self.enrollment = Enrollment.objects.create(user=self.student, course=self.course)
+
+    def add_lesson(self, order, module=None):
+        # Le rang des leçons et le nombre de leçons publiées sont recalculés au commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lesson.objects.create(module=module or self.module, title=f'Leçon {order}', order=order)
+
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def complete(self, lesson):
+        progress, _ = LessonProgress.objects.get_or_create(enrollment=self.enrollment, lesson=lesson)
+        progress.mark_completed()
+        return progress
+
+    def state(self):
+        self.course.refresh_from_db()
+        self.enrollment.refresh_from_db()
+        return (self.course.published_lesson_count, self.enrollment.completed_lessons,
+                float(self.enrollment.progress_percentage))
+
+
+class PublishedLessonProgressTests(CourseProgressTestCase):
+    """Seules les leçons publiées de modules publiés comptent dans la progression"""
+
+    def test_unpublish_and_republish_a_completed_lesson(self):
+        self.complete(self.lessons[0])
+        self.assertEqual(self.state(), (4, 1, 25.0))
+
+        self.lessons[0].is_published = False
+        self.save(self.lessons[0])
+        self.assertEqual(self.state(), (3, 0, 0.0))
+
+        self.lessons[0].is_published = True
+        self.save(self.lessons[0])
+        self.assertEqual(self.state(), (4, 1, 25.0))
+
+    def test_unpublish_a_module(self):
+        other = Module.objects.create(course=self.course, title='Avancé', order=2)
+        extra = self.add_lesson(5, module=other)
+        self.complete(self.lessons[0])
+        self.complete(extra)
+        self.assertEqual(self.state(), (5, 2, 40.0))
+
+        other.is_published = False
+        self.save(other)
+        self.assertEqual(self.state(), (4, 1, 25.0))
+
+    def test_swap_keeps_count_but_recomputes(self):
+        self.complete(self.lessons[0])
+        self.lessons[0].is_published = False
+        self.lessons[1].is_published = False
+        self.save(self.lessons[0])
+        self.save(self.lessons[1])
+        self.assertEqual(self.state(), (2, 0, 0.0))
+
+        # Une leçon dépubliée, une autre republiée : même nombre, autre ensemble
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[0].is_published = True
+            self.lessons[0].save()
+            self.lessons[2].is_published = False
+            self.lessons[2].save()
+        self.assertEqual(self.state(), (2, 1, 50.0))
+
+    def test_completing_an_unpublished_lesson_is_not_counted(self):
+        self.lessons[3].is_published = False
+        self.save(self.lessons[3])
+        self.complete(self.lessons[3])
+        self.assertEqual(self.state(), (3, 0, 0.0))
+
+    def test_reconcile_ignores_unpublished_lessons(self):
+        self.complete(self.lessons[0])
+        self.complete(self.lessons[1])
+        Lesson.objects.filter(pk=self.lessons[0].pk).update(is_published=False)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_lessons=7, progress_percentage=90)
+
+        call_command('reconcile_enrollment_progress', stdout=StringIO())
+        self.assertEqual(self.state(), (3, 1, 33.33))
+
+
+class CompletionStateTests(CourseProgressTestCase):
+    """L'état terminé suit la progression dans les deux sens"""
+
+    def assert_completed(self, completed):
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.is_completed, completed)
+        self.assertEqual(self.enrollment.completed_at is not None, completed)
+
+    def test_uncompleting_a_lesson_reopens_the_course(self):
+        progress = [self.complete(lesson) for lesson in self.lessons]
+        self.assert_completed(True)
+
+        progress[0].is_completed = False
+        progress[0].completed_at = None
+        progress[0].save()
+        self.assertEqual(self.state(), (4, 3, 75.0))
+        self.assert_completed(False)
+
+    def test_new_lesson_reopens_the_course(self):
+        for lesson in self.lessons:
+            self.complete(lesson)
+        self.add_lesson(5)
+        self.assertEqual(self.state(), (5, 4, 80.0))
+        self.assert_completed(False)
+        self.assertEqual(learning_summary.build_summary(self.student.pk)['completed_count'], 0)
+
+    def test_reconcile_reopens_a_course_marked_completed(self):
+        self.complete(self.lessons[0])
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(is_completed=True, completed_at=timezone.now())
+
+        call_command('reconcile_enrollment_progress', stdout=StringIO())
+        self.assert_completed(False)
+
+    def test_course_without_published_lessons_keeps_its_state(self):
+        for lesson in self.lessons:
+            self.complete(lesson)
+        self.module.is_published = False
+        self.save(self.module)
+        self.assertEqual(self.state(), (0, 0, 0.0))
+        self.assert_completed(True)
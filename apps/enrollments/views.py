@@ -29,33 +29,36 @@ class MyCoursesView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Tous les enrollments de l'utilisateur
-        all_enrollments = self.get_queryset()
+        # Tous les enrollments de l'utilisateur, lus une fois puis répartis par onglet
+        all_enrollments = list(self.object_list)
+        active_enrollments = [e for e in all_enrollments if not e.is_completed]
+        completed_enrollments = [e for e in all_enrollments if e.is_completed]
+        favorite_enrollments = [e for e in all_enrollments if e.is_favorite]
 
         # Filtrer par statut
         status = self.request.GET.get('status', 'all')
 
         if status == 'completed':
-            enrollments = all_enrollments.filter(is_completed=True)
+            enrollments = completed_enrollments
         elif status == 'in_progress':
-            enrollments = all_enrollments.filter(is_completed=False)
+            enrollments = active_enrollments
         elif status == 'favorites':
-            enrollments = all_enrollments.filter(is_favorite=True)
+            enrollments = favorite_enrollments
         else:
             enrollments = all_enrollments
 
         # CORRECTION: Séparer les différents types d'enrollments
         context.update({
             'enrollments': enrollments,
-            'active_enrollments': all_enrollments.filter(is_completed=False),
-            'completed_enrollments': all_enrollments.filter(is_completed=True),
-            'favorite_enrollments': all_enrollments.filter(is_favorite=True),
+            'active_enrollments': active_enrollments,
+            'completed_enrollments': completed_enrollments,
+            'favorite_enrollments': favorite_enrollments,
             'status_filter': status,
 
-            # Compteurs pour les onglets
-            'active_count': all_enrollments.filter(is_completed=False).count(),
-            'completed_count': all_enrollments.filter(is_completed=True).count(),
-            'favorites_count': all_enrollments.filter(is_favorite=True).count(),
+            # Compteurs pour les onglets, tirés des listes affichées
+            'active_count': len(active_enrollments),
+            'completed_count': len(completed_enrollments),
+            'favorites_count': len(favorite_enrollments),
         })
 
         return context
@@ -160,8 +163,7 @@ def submit_review(request, course_id):
         }
     )
 
-    # Recalculer la note moyenne du cours
-    course.update_rating()
+    # La note moyenne et l'histogramme sont mis à jour par delta (signaux)
 
     if created:
         messages.success(request, 'Merci pour votre avis!')
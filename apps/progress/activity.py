@@ -0,0 +1,211 @@
+# apps/progress/activity.py
+"""
+Activité quotidienne - WIM Platform
+Un agrégat par (utilisateur, jour local) des leçons complétées, du temps
+d'étude et des quiz réussis, tenu à jour par delta : séries, graphique
+hebdomadaire et calendrier annuel se calculent en un seul parcours de plage
+"""
+
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+ACTIVITY_FIELDS = ('lessons_completed', 'seconds_studied', 'quizzes_passed')
+
+# Temps d'étude minimum pour qu'une journée sans complétion compte dans la série
+MIN_STUDY_SECONDS = 60
+
+HEATMAP_DAYS = 365
+WEEKDAYS = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
+
+
+def get_timezone(name):
+    """Fuseau horaire nommé, ou celui du site s'il est vide ou inconnu"""
+    try:
+        return ZoneInfo(name or settings.TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def user_timezones(user_ids):
+    """Fuseau horaire de chaque utilisateur, en une requête"""
+    from apps.users.models import UserPreference
+
+    user_ids = set(user_ids)
+    names = dict(UserPreference.objects.filter(user_id__in=user_ids).values_list('user_id', 'timezone'))
+    return {user_id: get_timezone(names.get(user_id)) for user_id in user_ids}
+
+
+def local_date(user_id, moment=None, tz=None):
+    """Jour local de l'utilisateur pour un instant donné (maintenant par défaut)"""
+    if tz is None:
+        tz = user_timezones([user_id])[user_id]
+    return timezone.localtime(moment or timezone.now(), tz).date()
+
+
+# ----------------------------------------------------------------------
+# Écriture
+# ----------------------------------------------------------------------
+
+def record_activity(user_id, lessons=0, seconds=0, quizzes=0, moment=None, day=None):
+    """Applique un delta à l'activité du jour local de l'instant donné"""
+    from .models import DailyActivity
+
+    deltas = dict(zip(ACTIVITY_FIELDS, (lessons, seconds, quizzes)))
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+
+    if day is None:
+        day = local_date(user_id, moment)
+
+    updated = DailyActivity.objects.filter(user_id=user_id, date=day).update(**changes)
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        try:
+            with transaction.atomic():
+                DailyActivity.objects.create(
+                    user_id=user_id, date=day, **{field: max(delta, 0) for field, delta in deltas.items()}
+                )
+        except IntegrityError:
+            DailyActivity.objects.filter(user_id=user_id, date=day).update(**changes)
+
+
+def record_activity_batch(deltas):
+    """
+    Applique un lot {(utilisateur, jour): {champ: delta}} : création des
+    journées manquantes puis un bulk_update par incréments
+    """
+    from .models import DailyActivity
+
+    deltas = {key: values for key, values in deltas.items() if any(values.values())}
+    if not deltas:
+        return 0
+
+    # Un delta uniquement négatif ne crée pas de journée
+    DailyActivity.objects.bulk_create(
+        [DailyActivity(user_id=user_id, date=day) for (user_id, day), values in deltas.items()
+         if any(delta > 0 for delta in values.values())],
+        ignore_conflicts=True,
+    )
+
+    fields = sorted({field for values in deltas.values() for field in values})
+    rows = []
+    for row in DailyActivity.objects.filter(
+        user_id__in={user_id for user_id, _ in deltas},
+        date__in={day for _, day in deltas},
+    ).order_by().only('id', 'user_id', 'date'):
+        values = deltas.get((row.user_id, row.date))
+        if values is None:
+            continue
+        for field in fields:
+            setattr(row, field, F(field) + values.get(field, 0))
+        rows.append(row)
+
+    DailyActivity.objects.bulk_update(rows, fields, batch_size=500)
+    return len(rows)
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+class ActivityCalendar:
+    """
+    Activité d'un utilisateur, chargée en un seul parcours de (user, date) ;
+    `days` ({jour: (leçons, secondes, quiz)}) évite la lecture si elle a déjà été faite
+    """
+
+    def __init__(self, user_id, since=None, today=None, days=None):
+        from .models import DailyActivity
+
+        self.today = today or local_date(user_id)
+        if days is not None:
+            self.days = {day: values for day, values in sorted(days.items()) if day <= self.today}
+            return
+
+        rows = DailyActivity.objects.filter(user_id=user_id, date__lte=self.today)
+        if since is not None:
+            rows = rows.filter(date__gte=since)
+        self.days = {
+            row[0]: row[1:]
+            for row in rows.order_by('date').values_list('date', *ACTIVITY_FIELDS)
+        }
+
+    def get(self, day):
+        """(leçons, secondes, quiz) d'un jour"""
+        return self.days.get(day, (0, 0, 0))
+
+    def is_active(self, day):
+        lessons, seconds, quizzes = self.get(day)
+        return lessons > 0 or quizzes > 0 or seconds >= MIN_STUDY_SECONDS
+
+    def active_dates(self):
+        return [day for day in self.days if self.is_active(day)]
+
+    def last_active_date(self):
+        dates = self.active_dates()
+        return dates[-1] if dates else None
+
+    def current_streak(self):
+        """Jours consécutifs d'étude se terminant aujourd'hui"""
+        streak = 0
+        day = self.today
+        while self.is_active(day):
+            streak += 1
+            day -= timedelta(days=1)
+        return streak
+
+    def longest_streak(self):
+        longest = current = 0
+        previous = None
+        for day in self.active_dates():
+            current = current + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+            longest = max(longest, current)
+            previous = day
+        return longest
+
+    def day_data(self, day):
+        lessons, seconds, quizzes = self.get(day)
+        return {
+            'date': day,
+            'weekday': WEEKDAYS[day.weekday()],
+            'count': lessons,
+            'lessons_count': lessons,
+            'minutes': seconds // 60,
+            'quizzes': quizzes,
+            'has_activity': self.is_active(day),
+        }
+
+    def last_days(self, days=7):
+        """Activité des derniers jours, du plus ancien à aujourd'hui"""
+        return [self.day_data(self.today - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+
+    def weeks(self, days=HEATMAP_DAYS):
+        """
+        Calendrier des derniers jours découpé en semaines (lundi -> dimanche),
+        avec un niveau d'intensité de 0 à 4 ; les jours hors période valent None
+        """
+        start = self.today - timedelta(days=days - 1)
+        start -= timedelta(days=start.weekday())
+        first = self.today - timedelta(days=days - 1)
+
+        weeks = []
+        day = start
+        while day <= self.today:
+            week = []
+            for _ in range(7):
+                if first <= day <= self.today:
+                    data = self.day_data(day)
+                    data['level'] = min(4, data['lessons_count'] + data['quizzes'] + data['minutes'] // 30)
+                    if data['has_activity'] and not data['level']:
+                        data['level'] = 1
+                    week.append(data)
+                else:
+                    week.append(None)
+                day += timedelta(days=1)
+            weeks.append(week)
+        return weeks
@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import LessonProgress, QuizAttempt, StudySession, UserStatistics
+from .models import DailyActivity, LessonProgress, QuizAnswerKey, QuizAttempt, StudySession, UserStatistics
 
 @admin.register(LessonProgress)
 class LessonProgressAdmin(admin.ModelAdmin):
-    list_display = ['enrollment', 'lesson', 'is_completed', 'time_spent', 'completed_at']
+    list_display = ['enrollment', 'lesson', 'is_completed', 'time_spent', 'best_quiz_score', 'completed_at']
     list_filter = ['is_completed', 'completed_at']
     search_fields = ['enrollment__user__email', 'lesson__title']
     date_hierarchy = 'completed_at'
@@ -15,6 +15,12 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     search_fields = ['enrollment__user__email', 'lesson__title']
     date_hierarchy = 'started_at'
 
+@admin.register(QuizAnswerKey)
+class QuizAnswerKeyAdmin(admin.ModelAdmin):
+    list_display = ['lesson', 'pass_threshold', 'updated_at']
+    search_fields = ['lesson__title']
+    readonly_fields = ['updated_at']
+
 @admin.register(StudySession)
 class StudySessionAdmin(admin.ModelAdmin):
     list_display = ['user', 'course', 'started_at', 'ended_at', 'duration']
@@ -27,4 +33,11 @@ class UserStatisticsAdmin(admin.ModelAdmin):
     list_display = ['user', 'total_courses_enrolled', 'total_courses_completed', 'current_streak_days']
     list_filter = ['updated_at']
     search_fields = ['user__email']
-    readonly_fields = ['updated_at']
\ No newline at end of file
+    readonly_fields = ['updated_at']
+
+@admin.register(DailyActivity)
+class DailyActivityAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'lessons_completed', 'seconds_studied', 'quizzes_passed']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    date_hierarchy = 'date'
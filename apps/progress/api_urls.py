@@ -0,0 +1,13 @@
+# ============================================================================
+# apps/progress/api_urls.py
+# ============================================================================
+
+from django.urls import path
+from . import views
+
+app_name = 'progress_api'
+
+urlpatterns = [
+    path('lessons/<int:lesson_id>/progress/', views.lesson_heartbeat, name='lesson_heartbeat'),
+    path('progress/sync/', views.sync_progress, name='sync'),
+]
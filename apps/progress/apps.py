@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProgressConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.progress"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,195 @@
+# apps/progress/events.py
+"""
+Journal des événements d'étude - WIM Platform
+Les vues de leçons et les battements vidéo sont ajoutés en mémoire puis
+insérés par lots dans un journal en ajout seul ; une compaction périodique
+les regroupe en sessions d'étude, leçons vues et temps total par inscription
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK = 900
+
+
+def session_gap():
+    """Inactivité au-delà de laquelle une nouvelle session commence"""
+    return timedelta(seconds=getattr(settings, 'PROGRESS_STUDY_SESSION_GAP', 30 * 60))
+
+
+class StudyEventBuffer:
+    """Tampon des événements du processus, inséré par un thread d'écriture"""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending = []
+        self.thread = None
+
+    def record(self, user_id, course_id, lesson_id, kind):
+        with self.lock:
+            self.pending.append((user_id, course_id, lesson_id, kind, timezone.now()))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='study-event-writer', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Insère les événements en attente ; retourne leur nombre"""
+        with self.lock:
+            pending, self.pending = self.pending, []
+        if not pending:
+            return 0
+        try:
+            return write_events(pending)
+        except Exception as e:
+            logger.error(f"Erreur écriture des événements d'étude: {e}")
+            with self.lock:
+                self.pending = pending + self.pending
+            return 0
+        finally:
+            if threading.current_thread() is self.thread:
+                connection.close()
+
+
+def write_events(rows):
+    """Insère un lot de tuples (utilisateur, cours, leçon, type, instant)"""
+    from .models import StudyEvent
+
+    StudyEvent.objects.bulk_create([
+        StudyEvent(user_id=user_id, course_id=course_id, lesson_id=lesson_id, kind=kind, occurred_at=occurred_at)
+        for user_id, course_id, lesson_id, kind, occurred_at in rows
+    ], batch_size=1000)
+    return len(rows)
+
+
+buffer = StudyEventBuffer(flush_interval=getattr(settings, 'PROGRESS_HEARTBEAT_FLUSH_INTERVAL', 10))
+
+
+def record_event(user_id, course_id, lesson_id=None, kind='view'):
+    buffer.record(user_id, course_id, lesson_id, kind)
+
+
+def flush():
+    return buffer.flush()
+
+
+atexit.register(flush)
+
+
+# ----------------------------------------------------------------------
+# Compaction
+# ----------------------------------------------------------------------
+
+def compact(batch_size=10000):
+    """
+    Regroupe le prochain lot d'événements (par ordre d'identifiant) en
+    sessions d'étude, puis les supprime. Retourne (événements, sessions).
+    """
+    from apps.enrollments import learning_summary
+    from apps.enrollments.models import Enrollment
+    from .models import StudyEvent, StudySession
+
+    events = list(StudyEvent.objects.order_by('id').values_list(
+        'id', 'user_id', 'course_id', 'lesson_id', 'occurred_at'
+    )[:batch_size])
+    if not events:
+        return 0, 0
+
+    gap = session_gap()
+    by_key = defaultdict(list)
+    for _, user_id, course_id, lesson_id, occurred_at in events:
+        by_key[(user_id, course_id)].append((occurred_at, lesson_id))
+
+    # Sessions existantes que les événements du lot peuvent prolonger
+    earliest = min(event[4] for event in events)
+    latest = max(event[4] for event in events)
+    candidates = defaultdict(list)
+    for session in StudySession.objects.filter(
+        user_id__in={user_id for user_id, _ in by_key},
+        course_id__in={course_id for _, course_id in by_key},
+        ended_at__gte=earliest - gap,
+        started_at__lte=latest + gap,
+    ).order_by('started_at'):
+        if (session.user_id, session.course_id) in by_key:
+            candidates[(session.user_id, session.course_id)].append(session)
+
+    created, extended = [], {}
+    lessons = defaultdict(set)
+    previous_duration = {}
+    for key, items in by_key.items():
+        items.sort(key=lambda item: item[0])
+        sessions = candidates[key]
+        for occurred_at, lesson_id in items:
+            session = next((
+                candidate for candidate in reversed(sessions)
+                if candidate.started_at - gap <= occurred_at <= candidate.ended_at + gap
+            ), None)
+            if session is None:
+                session = StudySession(
+                    user_id=key[0], course_id=key[1], started_at=occurred_at, ended_at=occurred_at, duration=0
+                )
+                created.append(session)
+                sessions.append(session)
+            elif session.pk is not None and session.pk not in extended:
+                previous_duration[session.pk] = session.duration
+                extended[session.pk] = session
+
+            session.started_at = min(session.started_at, occurred_at)
+            session.ended_at = max(session.ended_at, occurred_at)
+            session.duration = int((session.ended_at - session.started_at).total_seconds())
+            if lesson_id is not None:
+                lessons[id(session)].add(lesson_id)
+
+    # Temps ajouté par inscription : sessions nouvelles et prolongements
+    time_added = defaultdict(int)
+    for session in created:
+        time_added[(session.user_id, session.course_id)] += session.duration
+    for pk, session in extended.items():
+        time_added[(session.user_id, session.course_id)] += session.duration - previous_duration[pk]
+
+    with transaction.atomic():
+        StudySession.objects.bulk_create(created, batch_size=500)
+        StudySession.objects.bulk_update(list(extended.values()), ['started_at', 'ended_at', 'duration'], batch_size=500)
+
+        Through = StudySession.lessons_viewed.through
+        Through.objects.bulk_create([
+            Through(studysession_id=session.pk, lesson_id=lesson_id)
+            for session in created + list(extended.values())
+            for lesson_id in lessons.get(id(session), ())
+        ], batch_size=1000, ignore_conflicts=True)
+
+        enrollment_rows = []
+        enrollments = Enrollment.objects.filter(
+            user_id__in={user_id for user_id, _ in time_added},
+            course_id__in={course_id for _, course_id in time_added},
+        ).values_list('id', 'user_id', 'course_id')
+        for enrollment_id, user_id, course_id in enrollments:
+            seconds = time_added.get((user_id, course_id))
+            if seconds:
+                enrollment = Enrollment(id=enrollment_id)
+                enrollment.total_time_spent = F('total_time_spent') + seconds
+                enrollment_rows.append(enrollment)
+        Enrollment.objects.bulk_update(enrollment_rows, ['total_time_spent'], batch_size=500)
+        learning_summary.invalidate(*{user_id for user_id, _ in time_added})
+
+        event_ids = [event[0] for event in events]
+        for start in range(0, len(event_ids), DELETE_CHUNK):
+            StudyEvent.objects.filter(id__in=event_ids[start:start + DELETE_CHUNK]).delete()
+
+    return len(events), len(created)
@@ -0,0 +1,229 @@
+# apps/progress/grading.py
+"""
+Correction des quiz - WIM Platform
+Les barèmes (QuizAnswerKey) sont compilés une fois en réponses normalisées
+et mis en cache ; une tentative se corrige en un passage, et la recorrection
+d'un quiz entier compare toutes les tentatives en bloc avec NumPy
+"""
+
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.text import fold
+
+logger = logging.getLogger(__name__)
+
+KEY_CACHE = 'quiz_key:{}'
+KEY_TIMEOUT = 60 * 60 * 24
+
+QUESTION_TYPES = ('single', 'multiple', 'text')
+
+# Identifiants par requête UPDATE lors d'une recorrection
+UPDATE_CHUNK = 900
+
+
+class AnswerKeyError(ValueError):
+    """Barème de quiz invalide"""
+
+
+def normalize(question_type, value):
+    """Réponse -> jeton comparable (choix multiples triés, texte plié)"""
+    if value is None:
+        return ''
+    if question_type == 'multiple':
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        return '|'.join(sorted({str(item).strip() for item in values}))
+    if question_type == 'text':
+        return ' '.join(fold(str(value)).split())
+    return str(value).strip()
+
+
+class CompiledKey:
+    """Barème compilé : ordre des questions, réponses acceptées et points"""
+
+    def __init__(self, lesson_id, questions, pass_threshold):
+        self.lesson_id = lesson_id
+        self.pass_threshold = Decimal(pass_threshold)
+        self.ids = []
+        self.types = []
+        self.accepted = []
+        self.points = []
+
+        for question in questions:
+            question_type = question.get('type', 'single')
+            if question_type not in QUESTION_TYPES or 'id' not in question or 'answer' not in question:
+                raise AnswerKeyError(f"Question invalide : {question}")
+            answers = question['answer']
+            # Texte : plusieurs formulations acceptées possibles
+            if question_type == 'text' and isinstance(answers, (list, tuple)):
+                accepted = frozenset(normalize('text', answer) for answer in answers)
+            else:
+                accepted = frozenset([normalize(question_type, answers)])
+
+            self.ids.append(str(question['id']))
+            self.types.append(question_type)
+            self.accepted.append(accepted)
+            self.points.append(float(question.get('points', 1)))
+
+        self.total_points = sum(self.points)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def tokens(self, answers):
+        """Réponses d'une tentative ({question: réponse}) -> jetons dans l'ordre du barème"""
+        answers = answers if isinstance(answers, dict) else {}
+        return [normalize(question_type, answers.get(question_id))
+                for question_id, question_type in zip(self.ids, self.types)]
+
+    def result(self, correct, earned):
+        """(bonnes réponses, score en %, réussi) à partir des points obtenus"""
+        score = Decimal(str(round(earned / self.total_points * 100, 2))) if self.total_points else Decimal('0')
+        return correct, score, score >= self.pass_threshold
+
+    def grade(self, answers):
+        """Corrige une tentative en un passage"""
+        correct = 0
+        earned = 0.0
+        for token, accepted, points in zip(self.tokens(answers), self.accepted, self.points):
+            if token in accepted:
+                correct += 1
+                earned += points
+        return self.result(correct, earned)
+
+    def grade_many(self, answer_sets):
+        """
+        Corrige un lot de tentatives : matrice (tentatives x questions) de jetons
+        comparée colonne par colonne aux réponses acceptées
+        """
+        if not answer_sets or not len(self):
+            return [self.result(0, 0.0) for _ in answer_sets]
+
+        tokens = np.array([self.tokens(answers) for answers in answer_sets], dtype=object)
+        matches = np.zeros(tokens.shape, dtype=bool)
+        for column, accepted in enumerate(self.accepted):
+            matches[:, column] = np.isin(tokens[:, column], list(accepted))
+
+        correct = matches.sum(axis=1)
+        earned = matches.astype(np.float64) @ np.array(self.points)
+        return [self.result(int(c), float(e)) for c, e in zip(correct, earned)]
+
+
+def compile_key(lesson_id):
+    from .models import QuizAnswerKey
+
+    key = QuizAnswerKey.objects.filter(lesson_id=lesson_id).values('questions', 'pass_threshold').first()
+    if key is None:
+        return None
+    return CompiledKey(lesson_id, key['questions'], key['pass_threshold'])
+
+
+def get_compiled_key(lesson_id):
+    """Barème compilé depuis le cache ; None si la leçon n'en a pas"""
+    cache_key = KEY_CACHE.format(lesson_id)
+    compiled = cache.get(cache_key)
+    if compiled is None:
+        compiled = compile_key(lesson_id) or False
+        cache.set(cache_key, compiled, KEY_TIMEOUT)
+    return compiled or None
+
+
+def invalidate(lesson_id):
+    transaction.on_commit(lambda: cache.delete(KEY_CACHE.format(lesson_id)))
+
+
+# ----------------------------------------------------------------------
+# Meilleur score et recorrection
+# ----------------------------------------------------------------------
+
+def record_best_score(enrollment_id, lesson_id, score):
+    """Conserve le meilleur score de l'inscription sur le quiz"""
+    from .models import LessonProgress
+
+    progress, _ = LessonProgress.objects.get_or_create(enrollment_id=enrollment_id, lesson_id=lesson_id)
+    LessonProgress.objects.filter(pk=progress.pk).update(
+        best_quiz_score=Greatest(Coalesce(F('best_quiz_score'), Value(Decimal('0'))), Value(score))
+    )
+    return progress
+
+
+def regrade_lesson(lesson_id, batch_size=5000, dry_run=False):
+    """
+    Recorrige toutes les tentatives d'un quiz avec le barème actuel.
+    Retourne (tentatives, modifiées, leçons nouvellement réussies).
+    """
+    from .models import LessonProgress, QuizAttempt
+
+    compiled = compile_key(lesson_id)
+    if compiled is None:
+        raise AnswerKeyError(f"Aucun barème pour la leçon {lesson_id}")
+
+    attempts = QuizAttempt.objects.filter(lesson_id=lesson_id, completed_at__isnull=False).order_by('id').only(
+        'id', 'enrollment_id', 'answers', 'score', 'correct_answers', 'total_questions', 'is_passed'
+    )
+
+    total = 0
+    changed = []
+    newly_passed = set()
+    batch = []
+
+    def flush(batch):
+        for attempt, (correct, score, passed) in zip(batch, compiled.grade_many([a.answers for a in batch])):
+            if (attempt.correct_answers, attempt.total_questions, attempt.score, attempt.is_passed) == (
+                correct, len(compiled), score, passed
+            ):
+                continue
+            if passed and not attempt.is_passed:
+                newly_passed.add(attempt.enrollment_id)
+            attempt.correct_answers, attempt.total_questions = correct, len(compiled)
+            attempt.score, attempt.is_passed = score, passed
+            changed.append(attempt)
+
+    for attempt in attempts.iterator(chunk_size=batch_size):
+        batch.append(attempt)
+        total += 1
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    if dry_run:
+        return total, len(changed), len(newly_passed)
+
+    # Peu de résultats distincts : une requête UPDATE par résultat et par bloc d'identifiants
+    outcomes = defaultdict(list)
+    for attempt in changed:
+        outcomes[(attempt.correct_answers, attempt.score, attempt.is_passed)].append(attempt.id)
+
+    with transaction.atomic():
+        for (correct, score, passed), ids in outcomes.items():
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                QuizAttempt.objects.filter(id__in=ids[start:start + UPDATE_CHUNK]).update(
+                    correct_answers=correct, total_questions=len(compiled), score=score, is_passed=passed
+                )
+
+        # Meilleurs scores recalculés depuis les tentatives corrigées
+        best = dict(QuizAttempt.objects.filter(lesson_id=lesson_id, completed_at__isnull=False).values(
+            'enrollment_id'
+        ).annotate(best=Max('score')).values_list('enrollment_id', 'best'))
+        progress_rows = list(LessonProgress.objects.filter(
+            lesson_id=lesson_id, enrollment_id__in=list(best)
+        ).only('id', 'enrollment_id', 'is_completed', 'completed_at', 'started_at', 'best_quiz_score'))
+        for row in progress_rows:
+            row.best_quiz_score = best[row.enrollment_id]
+        LessonProgress.objects.bulk_update(progress_rows, ['best_quiz_score'], batch_size=500)
+
+        # Une correction du barème valide la leçon, sans jamais la retirer
+        for row in progress_rows:
+            if row.enrollment_id in newly_passed:
+                row.mark_completed()
+
+    logger.info("Quiz %s recorrigé : %s tentatives, %s modifiées", lesson_id, total, len(changed))
+    return total, len(changed), len(newly_passed)
@@ -0,0 +1,218 @@
+# apps/progress/heartbeats.py
+"""
+Battements de lecture vidéo - WIM Platform
+Chaque battement porte la position du lecteur et le temps de lecture écoulé
+depuis le battement précédent, mesuré par le client : le calcul ne dépend
+donc pas du worker qui reçoit le battement. Sans ce temps, il est estimé à
+l'écriture par l'avance de la position sur celle enregistrée, bornée.
+Les battements sont regroupés en mémoire par (utilisateur, leçon) : seule la
+dernière position et le temps de visionnage cumulé sont gardés, puis un
+thread les écrit périodiquement en quelques requêtes groupées
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    """Tampon des battements du processus, vidé par un thread d'écriture"""
+
+    def __init__(self, flush_interval, max_gap, max_pending_lessons):
+        self.flush_interval = flush_interval
+        self.max_gap = max_gap
+        self.max_pending_lessons = max_pending_lessons
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.user_lessons = {}
+        self.thread = None
+
+    def clamp(self, watched):
+        """Temps de lecture déclaré par le client, borné à l'écart maximal entre deux battements"""
+        if watched is None or not math.isfinite(watched):
+            return 0.0
+        return min(max(0.0, watched), self.max_gap)
+
+    def record(self, user_id, lesson_id, position, watched=None):
+        """
+        Enregistre un battement et le temps de lecture écoulé depuis le précédent
+        (None : à estimer à l'écriture). Retourne False si l'utilisateur a déjà
+        trop de leçons en attente : l'inscription n'est vérifiée qu'à l'écriture.
+        """
+        declared = watched is not None
+        watched = self.clamp(watched)
+        key = (user_id, lesson_id)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                if self.user_lessons.get(user_id, 0) >= self.max_pending_lessons:
+                    return False
+                self.user_lessons[user_id] = self.user_lessons.get(user_id, 0) + 1
+                self.pending[key] = {'position': position, 'watched': watched, 'declared': declared}
+            else:
+                entry['position'] = position
+                entry['watched'] += watched
+                entry['declared'] = entry['declared'] or declared
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='heartbeat-flusher', daemon=True)
+                self.thread.start()
+        return True
+
+    def _take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.user_lessons = {}
+        return pending
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Écrit les battements en attente ; retourne le nombre de progressions mises à jour"""
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            return write_heartbeats(pending, self.max_gap)
+        except Exception as e:
+            logger.error(f"Erreur écriture des battements vidéo: {e}")
+            self._restore(pending)
+            return 0
+        finally:
+            if threading.current_thread() is self.thread:
+                connection.close()
+
+    def _restore(self, pending):
+        """Remet les battements non écrits dans le tampon pour le prochain passage"""
+        with self.lock:
+            for key, entry in pending.items():
+                current = self.pending.get(key)
+                if current is None:
+                    self.pending[key] = entry
+                    self.user_lessons[key[0]] = self.user_lessons.get(key[0], 0) + 1
+                else:
+                    current['watched'] += entry['watched']
+                    current['declared'] = current['declared'] or entry['declared']
+
+
+def write_heartbeats(pending, max_gap):
+    """
+    Persiste un lot {(utilisateur, leçon): {'position', 'watched', 'declared'}} :
+    résolution des inscriptions, création des progressions manquantes,
+    puis un bulk_update des progressions, les événements d'étude du lot et
+    le temps d'étude du jour de chaque utilisateur
+    """
+    from apps.courses.models import Lesson
+    from apps.enrollments.models import Enrollment
+    from .activity import local_date, record_activity_batch, user_timezones
+    from .events import write_events
+    from .models import LessonProgress
+
+    lesson_courses = dict(Lesson.objects.filter(
+        id__in={lesson_id for _, lesson_id in pending}
+    ).values_list('id', 'module__course_id'))
+
+    enrollments = {
+        (user_id, course_id): enrollment_id
+        for enrollment_id, user_id, course_id in Enrollment.objects.filter(
+            user_id__in={user_id for user_id, _ in pending},
+            course_id__in=set(lesson_courses.values()),
+            is_active=True,
+        ).values_list('id', 'user_id', 'course_id')
+    }
+
+    # Battements des leçons auxquelles l'utilisateur n'est pas inscrit : ignorés
+    batch = {}
+    enrollment_users = {}
+    for (user_id, lesson_id), entry in pending.items():
+        enrollment_id = enrollments.get((user_id, lesson_courses.get(lesson_id)))
+        if enrollment_id is not None:
+            batch[(enrollment_id, lesson_id)] = entry
+            enrollment_users[enrollment_id] = user_id
+    if not batch:
+        return 0
+
+    now = timezone.now()
+    LessonProgress.objects.bulk_create(
+        [LessonProgress(enrollment_id=e, lesson_id=l, started_at=now) for e, l in batch],
+        ignore_conflicts=True,
+    )
+
+    rows = LessonProgress.objects.filter(
+        enrollment_id__in={e for e, _ in batch},
+        lesson_id__in={l for _, l in batch},
+    ).order_by().only('id', 'enrollment_id', 'lesson_id', 'video_position')
+
+    progress_rows = []
+    enrollment_time = {}
+    for row in rows:
+        entry = batch.get((row.enrollment_id, row.lesson_id))
+        if entry is None:
+            continue
+        watched = entry['watched']
+        if not entry['declared']:
+            # Client sans temps de lecture : avance de la position, bornée à un écart maximal
+            watched = min(max(0, entry['position'] - row.video_position), max_gap)
+        seconds = int(round(watched))
+        row.video_position = entry['position']
+        row.time_spent = F('time_spent') + seconds
+        row.started_at = Coalesce(F('started_at'), Value(now))
+        row.last_accessed = now
+        progress_rows.append(row)
+        enrollment_time[row.enrollment_id] = enrollment_time.get(row.enrollment_id, 0) + seconds
+
+    LessonProgress.objects.bulk_update(
+        progress_rows, ['video_position', 'time_spent', 'started_at', 'last_accessed'], batch_size=500
+    )
+
+    # Le temps total des inscriptions est tenu par la compaction des événements d'étude
+    Enrollment.objects.filter(id__in=list(enrollment_time)).update(last_accessed=now)
+    write_events([
+        (enrollment_users[enrollment_id], lesson_courses[lesson_id], lesson_id, 'heartbeat', now)
+        for enrollment_id, lesson_id in batch
+    ])
+
+    user_time = {}
+    for enrollment_id, seconds in enrollment_time.items():
+        user_id = enrollment_users[enrollment_id]
+        user_time[user_id] = user_time.get(user_id, 0) + seconds
+    user_time = {user_id: seconds for user_id, seconds in user_time.items() if seconds}
+    if user_time:
+        timezones = user_timezones(user_time)
+        record_activity_batch({
+            (user_id, local_date(user_id, now, tz=timezones[user_id])): {'seconds_studied': seconds}
+            for user_id, seconds in user_time.items()
+        })
+
+    return len(progress_rows)
+
+
+buffer = HeartbeatBuffer(
+    flush_interval=getattr(settings, 'PROGRESS_HEARTBEAT_FLUSH_INTERVAL', 10),
+    max_gap=getattr(settings, 'PROGRESS_HEARTBEAT_MAX_GAP', 60),
+    max_pending_lessons=getattr(settings, 'PROGRESS_HEARTBEAT_MAX_PENDING_LESSONS', 10),
+)
+
+
+def record_heartbeat(user_id, lesson_id, position, watched=None):
+    return buffer.record(user_id, lesson_id, position, watched)
+
+
+def flush():
+    return buffer.flush()
+
+
+atexit.register(flush)
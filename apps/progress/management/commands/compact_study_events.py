@@ -0,0 +1,29 @@
+# apps/progress/management/commands/compact_study_events.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.progress.events import compact
+
+
+class Command(BaseCommand):
+    help = "Regroupe le journal des événements d'étude en sessions et temps total par inscription"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Événements traités par lot')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        events_total = sessions_total = 0
+        while True:
+            events, sessions = compact(batch_size=options['batch_size'])
+            if not events:
+                break
+            events_total += events
+            sessions_total += sessions
+            self.stdout.write(f'  - {events} événements, {sessions} nouvelles sessions')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {events_total} événements compactés, {sessions_total} sessions créées '
+            f'en {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,66 @@
+# apps/progress/management/commands/rebuild_daily_activity.py
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncDate
+
+from apps.progress.activity import get_timezone
+from apps.progress.models import DailyActivity, LessonProgress, QuizAttempt
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recalcule les leçons complétées et quiz réussis de l'activité quotidienne (le temps d'étude est conservé)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Affiche les écarts sans les corriger')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        # Utilisateurs regroupés par fuseau horaire : une agrégation par fuseau
+        zones = defaultdict(list)
+        for user_id, name in User.objects.values_list('id', 'preferences__timezone'):
+            zones[get_timezone(name).key].append(user_id)
+
+        expected = defaultdict(lambda: {'lessons_completed': 0, 'quizzes_passed': 0})
+        for zone, user_ids in zones.items():
+            tzinfo = get_timezone(zone)
+
+            lessons = LessonProgress.objects.filter(
+                enrollment__user_id__in=user_ids, is_completed=True, completed_at__isnull=False
+            ).annotate(day=TruncDate('completed_at', tzinfo=tzinfo)).values(
+                'enrollment__user_id', 'day'
+            ).annotate(total=Count('id')).order_by()
+            for row in lessons:
+                expected[(row['enrollment__user_id'], row['day'])]['lessons_completed'] = row['total']
+
+            quizzes = QuizAttempt.objects.filter(
+                enrollment__user_id__in=user_ids, is_passed=True
+            ).annotate(day=TruncDate(Coalesce('completed_at', 'started_at'), tzinfo=tzinfo)).values(
+                'enrollment__user_id', 'day'
+            ).annotate(total=Count('id')).order_by()
+            for row in quizzes:
+                expected[(row['enrollment__user_id'], row['day'])]['quizzes_passed'] = row['total']
+
+        updates = []
+        for row in DailyActivity.objects.only('id', 'user_id', 'date', 'lessons_completed', 'quizzes_passed'):
+            values = expected.pop((row.user_id, row.date), {'lessons_completed': 0, 'quizzes_passed': 0})
+            if row.lessons_completed != values['lessons_completed'] or row.quizzes_passed != values['quizzes_passed']:
+                row.lessons_completed = values['lessons_completed']
+                row.quizzes_passed = values['quizzes_passed']
+                updates.append(row)
+
+        created = [DailyActivity(user_id=user_id, date=day, **values) for (user_id, day), values in expected.items()]
+
+        if not dry_run:
+            DailyActivity.objects.bulk_update(updates, ['lessons_completed', 'quizzes_passed'], batch_size=500)
+            DailyActivity.objects.bulk_create(created, batch_size=500)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {len(updates)} journées {"à corriger" if dry_run else "corrigées"}, '
+                f'{len(created)} {"à créer" if dry_run else "créées"}'
+            )
+        )
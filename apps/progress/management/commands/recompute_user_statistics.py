@@ -0,0 +1,108 @@
+# apps/progress/management/commands/recompute_user_statistics.py
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.progress.statistics import id_ranges, init_worker, recompute_range
+
+
+def checkpoint_path():
+    # Fichier plutôt que cache : une entrée de cache peut être évincée avant la reprise
+    return str(getattr(settings, 'USER_STATISTICS_CHECKPOINT_PATH',
+                       settings.BASE_DIR / 'var' / 'user_statistics.checkpoint'))
+
+
+def read_checkpoint():
+    """Dernier identifiant dont toutes les tranches précédentes sont enregistrées"""
+    try:
+        with open(checkpoint_path()) as handle:
+            return int(handle.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def write_checkpoint(value):
+    """Remplace atomiquement le point de reprise sur disque"""
+    path = checkpoint_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as handle:
+            handle.write(str(value))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def clear_checkpoint():
+    try:
+        os.unlink(checkpoint_path())
+    except FileNotFoundError:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les statistiques de tous les utilisateurs par agrégations groupées, en parallèle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Utilisateurs par tranche')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Processus du pool (1 : dans le processus courant)')
+        parser.add_argument('--resume', action='store_true', help="Reprend après la dernière tranche enregistrée")
+
+    def handle(self, *args, **options):
+        start = read_checkpoint() if options['resume'] else 0
+        if start:
+            self.stdout.write(f'Reprise après l\'utilisateur {start}')
+        else:
+            clear_checkpoint()
+
+        ranges = id_ranges(options['chunk_size'], start=start)
+        self.pending = list(ranges)
+        self.done = set()
+        self.total = 0
+        started = time.monotonic()
+
+        if options['workers'] <= 1:
+            for bounds in ranges:
+                self._report(*recompute_range(bounds), len(ranges), started)
+        else:
+            # Les processus fils ne doivent pas hériter des connexions ouvertes
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+                futures = [pool.submit(recompute_range, bounds) for bounds in ranges]
+                for future in as_completed(futures):
+                    self._report(*future.result(), len(ranges), started)
+
+        clear_checkpoint()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {self.total} statistiques recalculées en {time.monotonic() - started:.2f}s'
+        ))
+
+    def _report(self, bounds, count, elapsed, total_ranges, started):
+        self.done.add(bounds)
+        self.total += count
+
+        # Point de reprise : fin de la plus longue suite de tranches terminées
+        checkpoint = None
+        while self.pending and self.pending[0] in self.done:
+            checkpoint = self.pending.pop(0)[1]
+        if checkpoint is not None:
+            write_checkpoint(checkpoint)
+
+        low, high = bounds
+        rate = self.total / max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'  - [{len(self.done)}/{total_ranges}] utilisateurs {low + 1}-{high or "…"}: '
+            f'{count} en {elapsed:.2f}s ({rate:.0f}/s)'
+        )
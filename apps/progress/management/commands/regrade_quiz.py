@@ -0,0 +1,44 @@
+# apps/progress/management/commands/regrade_quiz.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.progress.grading import AnswerKeyError, regrade_lesson
+from apps.progress.models import QuizAnswerKey
+
+
+class Command(BaseCommand):
+    help = 'Recorrige toutes les tentatives des quiz avec leur barème actuel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lesson', type=int, action='append', dest='lessons', help='ID de la leçon quiz (répétable)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tentatives corrigées par bloc')
+        parser.add_argument('--dry-run', action='store_true', help='Affiche les changements sans les enregistrer')
+
+    def handle(self, *args, **options):
+        keys = QuizAnswerKey.objects.select_related('lesson').order_by('lesson_id')
+        if options['lessons']:
+            keys = keys.filter(lesson_id__in=options['lessons'])
+            missing = set(options['lessons']) - set(keys.values_list('lesson_id', flat=True))
+            if missing:
+                raise CommandError(f"Aucun barème pour les leçons : {sorted(missing)}")
+
+        changed_total = 0
+        for key in keys:
+            started = time.monotonic()
+            try:
+                total, changed, passed = regrade_lesson(
+                    key.lesson_id, batch_size=options['batch_size'], dry_run=options['dry_run']
+                )
+            except AnswerKeyError as e:
+                self.stdout.write(self.style.ERROR(f'  - {key.lesson.title}: {e}'))
+                continue
+            changed_total += changed
+            self.stdout.write(
+                f'  - {key.lesson.title}: {changed}/{total} tentatives modifiées, '
+                f'{passed} nouvellement réussies en {time.monotonic() - started:.2f}s'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {changed_total} tentatives {"à modifier" if options["dry_run"] else "recorrigées"}'
+        ))
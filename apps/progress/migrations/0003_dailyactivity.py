@@ -0,0 +1,92 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:07
+
+from zoneinfo import ZoneInfo
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def populate_daily_activity(apps, schema_editor):
+    DailyActivity = apps.get_model("progress", "DailyActivity")
+    LessonProgress = apps.get_model("progress", "LessonProgress")
+    QuizAttempt = apps.get_model("progress", "QuizAttempt")
+
+    # Aucun fuseau horaire n'est encore renseigné : jour local du site
+    tzinfo = ZoneInfo(settings.TIME_ZONE)
+    days = {}
+
+    lessons = LessonProgress.objects.filter(is_completed=True, completed_at__isnull=False).annotate(
+        day=TruncDate("completed_at", tzinfo=tzinfo)
+    ).values("enrollment__user_id", "day").annotate(total=Count("id")).order_by()
+    for row in lessons:
+        days.setdefault((row["enrollment__user_id"], row["day"]), {})["lessons_completed"] = row["total"]
+
+    quizzes = QuizAttempt.objects.filter(is_passed=True).annotate(
+        day=TruncDate(Coalesce("completed_at", "started_at"), tzinfo=tzinfo)
+    ).values("enrollment__user_id", "day").annotate(total=Count("id")).order_by()
+    for row in quizzes:
+        days.setdefault((row["enrollment__user_id"], row["day"]), {})["quizzes_passed"] = row["total"]
+
+    DailyActivity.objects.bulk_create(
+        [DailyActivity(user_id=user_id, date=day, **values) for (user_id, day), values in days.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollments", "0003_enrollment_completed_lessons"),
+        ("progress", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="jour")),
+                (
+                    "lessons_completed",
+                    models.IntegerField(default=0, verbose_name="leçons complétées"),
+                ),
+                (
+                    "seconds_studied",
+                    models.IntegerField(
+                        default=0, verbose_name="temps d'étude (secondes)"
+                    ),
+                ),
+                (
+                    "quizzes_passed",
+                    models.IntegerField(default=0, verbose_name="quiz réussis"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_activity",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "activité quotidienne",
+                "verbose_name_plural": "activités quotidiennes",
+                "ordering": ["user", "-date"],
+                "unique_together": {("user", "date")},
+            },
+        ),
+        migrations.RunPython(populate_daily_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0003_dailyactivity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lessonprogress",
+            name="state_updated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="état modifié le"
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def populate_best_quiz_score(apps, schema_editor):
+    LessonProgress = apps.get_model("progress", "LessonProgress")
+    QuizAttempt = apps.get_model("progress", "QuizAttempt")
+
+    best = QuizAttempt.objects.values("enrollment_id", "lesson_id").annotate(best=Max("score")).order_by()
+    scores = {(row["enrollment_id"], row["lesson_id"]): row["best"] for row in best}
+    if not scores:
+        return
+
+    rows = []
+    for row in LessonProgress.objects.filter(lesson_id__in={lesson_id for _, lesson_id in scores}).only(
+        "id", "enrollment_id", "lesson_id"
+    ):
+        score = scores.get((row.enrollment_id, row.lesson_id))
+        if score is not None:
+            row.best_quiz_score = score
+            rows.append(row)
+    LessonProgress.objects.bulk_update(rows, ["best_quiz_score"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_course_published_lesson_count"),
+        ("progress", "0004_lessonprogress_state_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lessonprogress",
+            name="best_quiz_score",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=5,
+                null=True,
+                verbose_name="meilleur score quiz",
+            ),
+        ),
+        migrations.CreateModel(
+            name="QuizAnswerKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("questions", models.JSONField(default=list, verbose_name="questions")),
+                (
+                    "pass_threshold",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=70,
+                        max_digits=5,
+                        verbose_name="seuil de réussite (%)",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "lesson",
+                    models.OneToOneField(
+                        limit_choices_to={"lesson_type": "quiz"},
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="answer_key",
+                        to="courses.lesson",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "barème de quiz",
+                "verbose_name_plural": "barèmes de quiz",
+            },
+        ),
+        migrations.RunPython(populate_best_quiz_score, migrations.RunPython.noop),
+    ]
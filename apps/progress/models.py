@@ -13,6 +13,10 @@ class LessonProgress(models.Model):
     started_at = models.DateTimeField('commencé le', null=True, blank=True)
     completed_at = models.DateTimeField('complété le', null=True, blank=True)
     last_accessed = models.DateTimeField('dernier accès', auto_now=True)
+    # Horodatage du dernier changement d'état retenu (la dernière écriture gagne)
+    state_updated_at = models.DateTimeField('état modifié le', null=True, blank=True)
+    best_quiz_score = models.DecimalField('meilleur score quiz', max_digits=5, decimal_places=2,
+                                          null=True, blank=True)
 
     notes = models.TextField('notes', blank=True)
 
@@ -26,19 +30,27 @@ class LessonProgress(models.Model):
         status = "✓" if self.is_completed else "○"
         return f"{status} {self.enrollment.user.email} - {self.lesson.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # État chargé, pour calculer le delta de complétion sans relire la ligne
+        if 'is_completed' in field_names:
+            instance._loaded_completed = instance.is_completed
+        if 'completed_at' in field_names:
+            instance._loaded_completed_at = instance.completed_at
+        return instance
+
     def mark_completed(self):
-        """Marque la leçon comme complétée"""
+        """Marque la leçon comme complétée (la progression du cours suit par delta)"""
         if not self.is_completed:
             self.is_completed = True
             self.completed_at = timezone.now()
+            self.state_updated_at = self.completed_at
 
             if not self.started_at:
                 self.started_at = timezone.now()
 
-            self.save(update_fields=['is_completed', 'completed_at', 'started_at'])
-
-            # Recalculer la progression du cours
-            self.enrollment.calculate_progress()
+            self.save(update_fields=['is_completed', 'completed_at', 'started_at', 'state_updated_at'])
 
     def mark_started(self):
         """Marque la leçon comme commencée"""
@@ -47,10 +59,13 @@ class LessonProgress(models.Model):
             self.save(update_fields=['started_at'])
 
     def update_video_position(self, position):
-        """Met à jour la position de la vidéo"""
+        """Met à jour la position de la vidéo (et le début de la leçon) en une écriture"""
         self.video_position = position
-        self.mark_started()
-        self.save(update_fields=['video_position'])
+        update_fields = ['video_position', 'last_accessed']
+        if not self.started_at:
+            self.started_at = timezone.now()
+            update_fields.append('started_at')
+        self.save(update_fields=update_fields)
 
 
 class QuizAttempt(models.Model):
@@ -89,26 +104,71 @@ class QuizAttempt(models.Model):
 
         self.save(update_fields=['score', 'is_passed'])
 
+    def grade(self):
+        """Corrige les réponses avec le barème compilé du quiz (sans enregistrer)"""
+        from .grading import get_compiled_key
+
+        compiled = get_compiled_key(self.lesson_id)
+        if compiled is None:
+            return False
+        self.correct_answers, self.score, self.is_passed = compiled.grade(self.answers)
+        self.total_questions = len(compiled)
+        return True
+
     def complete_quiz(self):
         """Marque le quiz comme terminé"""
         if not self.completed_at:
             self.completed_at = timezone.now()
-            self.calculate_score()
+            if self.grade():
+                self.save(update_fields=['completed_at', 'correct_answers', 'total_questions', 'score', 'is_passed'])
+            else:
+                self.save(update_fields=['completed_at'])
+                self.calculate_score()
+
+            # Meilleur score conservé sur la progression de la leçon
+            from .grading import record_best_score
+            lesson_progress = record_best_score(self.enrollment_id, self.lesson_id, self.score)
 
             # Si le quiz est réussi, marquer la leçon comme complétée
             if self.is_passed:
-                lesson_progress, created = LessonProgress.objects.get_or_create(
-                    enrollment=self.enrollment,
-                    lesson=self.lesson
-                )
+                from .activity import record_activity
+                record_activity(self.enrollment.user_id, quizzes=1, moment=self.completed_at)
                 lesson_progress.mark_completed()
 
 
+class QuizAnswerKey(models.Model):
+    """Barème d'un quiz : questions, réponses attendues et points"""
+    lesson = models.OneToOneField('courses.Lesson', on_delete=models.CASCADE, related_name='answer_key',
+                                  limit_choices_to={'lesson_type': 'quiz'})
+
+    # [{"id": "q1", "type": "single|multiple|text", "answer": ..., "points": 1}]
+    questions = models.JSONField('questions', default=list)
+    pass_threshold = models.DecimalField('seuil de réussite (%)', max_digits=5, decimal_places=2, default=70)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'barème de quiz'
+        verbose_name_plural = 'barèmes de quiz'
+
+    def __str__(self):
+        return f"Barème - {self.lesson.title}"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .grading import AnswerKeyError, CompiledKey
+
+        try:
+            CompiledKey(self.lesson_id, self.questions, self.pass_threshold)
+        except (AnswerKeyError, TypeError, AttributeError, ValueError) as e:
+            raise ValidationError({'questions': str(e)})
+
+
 class StudySession(models.Model):
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='study_sessions')
     course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='study_sessions')
 
-    started_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(default=timezone.now)
     ended_at = models.DateTimeField('fin', null=True, blank=True)
     duration = models.IntegerField('durée (secondes)', default=0)
 
@@ -134,6 +194,29 @@ class StudySession(models.Model):
         self.lessons_viewed.add(lesson)
 
 
+class StudyEvent(models.Model):
+    """Événement d'étude en ajout seul, regroupé en sessions par la compaction"""
+    KIND_CHOICES = [
+        ('view', 'Vue de leçon'),
+        ('heartbeat', 'Lecture vidéo'),
+    ]
+
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='study_events')
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='study_events')
+    lesson = models.ForeignKey('courses.Lesson', on_delete=models.CASCADE, related_name='study_events',
+                               null=True, blank=True)
+    kind = models.CharField('type', max_length=20, choices=KIND_CHOICES, default='view')
+    occurred_at = models.DateTimeField('survenu le', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'événement d\'étude'
+        verbose_name_plural = 'événements d\'étude'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} ({self.occurred_at})"
+
+
 class UserStatistics(models.Model):
     user = models.OneToOneField('users.User', on_delete=models.CASCADE, related_name='statistics')
 
@@ -160,72 +243,38 @@ class UserStatistics(models.Model):
         return f"Stats de {self.user.email}"
 
     def update_statistics(self):
-        """Met à jour toutes les statistiques"""
-        from apps.enrollments.models import Enrollment
-        from django.db.models import Avg
-
-        enrollments = Enrollment.objects.filter(user=self.user, is_active=True)
-
-        # Mettre à jour les compteurs
-        self.total_courses_enrolled = enrollments.count()
-        self.total_courses_completed = enrollments.filter(is_completed=True).count()
+        """Met à jour toutes les statistiques (mêmes agrégations que le recalcul de masse)"""
+        from apps.users.models import User
+        from .statistics import aggregate_statistics, apply_statistics
 
-        # Compter les leçons complétées
-        self.total_lessons_completed = LessonProgress.objects.filter(
-            enrollment__user=self.user,
-            is_completed=True
-        ).count()
+        values = aggregate_statistics(User.objects.filter(pk=self.user_id))
+        apply_statistics(self, values[self.user_id])
+        self.save()
 
-        # Temps total d'étude
-        self.total_study_time = sum(e.total_time_spent for e in enrollments)
+    def calculate_streak(self):
+        """Calcule la série de jours consécutifs d'étude depuis l'activité quotidienne"""
+        from .activity import ActivityCalendar
 
-        # Quiz réussis
-        self.total_quizzes_passed = QuizAttempt.objects.filter(
-            enrollment__user=self.user,
-            is_passed=True
-        ).count()
+        calendar = ActivityCalendar(self.user_id)
+        self.current_streak_days = calendar.current_streak()
+        self.longest_streak_days = max(self.longest_streak_days, calendar.longest_streak())
+        self.last_study_date = calendar.last_active_date() or self.last_study_date
 
-        # Score moyen des quiz
-        avg_score = QuizAttempt.objects.filter(
-            enrollment__user=self.user
-        ).aggregate(avg=Avg('score'))['avg']
-        self.average_quiz_score = avg_score or 0
 
-        # Progression moyenne
-        if self.total_courses_enrolled > 0:
-            avg_progress = enrollments.aggregate(avg=Avg('progress_percentage'))['avg']
-            self.average_progress = avg_progress or 0
+class DailyActivity(models.Model):
+    """Activité d'un utilisateur pour un jour de son fuseau horaire"""
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField('jour')
 
-        # Calculer la série de jours
-        self.calculate_streak()
+    lessons_completed = models.IntegerField('leçons complétées', default=0)
+    seconds_studied = models.IntegerField('temps d\'étude (secondes)', default=0)
+    quizzes_passed = models.IntegerField('quiz réussis', default=0)
 
-        self.save()
-
-    def calculate_streak(self):
-        """Calcule la série de jours consécutifs d'étude"""
-        from datetime import date, timedelta
-
-        today = date.today()
-        current_date = today
-        streak = 0
-
-        # Vérifier les jours consécutifs
-        while True:
-            has_activity = LessonProgress.objects.filter(
-                enrollment__user=self.user,
-                completed_at__date=current_date
-            ).exists()
-
-            if has_activity:
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-
-        self.current_streak_days = streak
-        if streak > self.longest_streak_days:
-            self.longest_streak_days = streak
+    class Meta:
+        verbose_name = 'activité quotidienne'
+        verbose_name_plural = 'activités quotidiennes'
+        unique_together = [['user', 'date']]
+        ordering = ['user', '-date']
 
-        # Dernière date d'étude
-        if streak > 0:
-            self.last_study_date = today
\ No newline at end of file
+    def __str__(self):
+        return f"{self.user.email} - {self.date}"
@@ -0,0 +1,69 @@
+# apps/progress/signals.py
+"""
+Signaux Progress - WIM Platform
+Répercute les leçons complétées ou dé-complétées sur l'inscription (recompte
+des leçons publiées) et par delta sur l'activité quotidienne de l'utilisateur,
+et invalide le résumé par module
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.enrollments import learning_summary
+from apps.enrollments.models import Enrollment
+from .activity import record_activity
+from .grading import invalidate as invalidate_answer_key
+from .models import LessonProgress, QuizAnswerKey
+from .summary import invalidate as invalidate_summary
+
+
+@receiver(pre_save, sender=LessonProgress)
+def lesson_progress_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Mémorise l'état de complétion tel qu'enregistré avant la modification"""
+    if instance._state.adding:
+        instance._completed_before = False
+    elif update_fields is not None and 'is_completed' not in update_fields:
+        instance._completed_before = None
+    elif hasattr(instance, '_loaded_completed') and hasattr(instance, '_loaded_completed_at'):
+        instance._completed_before = instance._loaded_completed
+        instance._completed_at_before = instance._loaded_completed_at
+    else:
+        instance._completed_before, instance._completed_at_before = LessonProgress.objects.filter(
+            pk=instance.pk
+        ).values_list('is_completed', 'completed_at').first() or (False, None)
+
+
+@receiver(post_save, sender=LessonProgress)
+def lesson_progress_saved(sender, instance, **kwargs):
+    before = getattr(instance, '_completed_before', None)
+    if before is None:
+        return
+    instance._loaded_completed = instance.is_completed
+    instance._loaded_completed_at = instance.completed_at
+
+    delta = int(instance.is_completed) - int(before)
+    if delta:
+        Enrollment.refresh_completion(instance.enrollment_id)
+        invalidate_summary(instance.enrollment_id)
+        # Une leçon dé-complétée est retirée du jour où elle avait été complétée
+        moment = instance.completed_at if delta > 0 else getattr(instance, '_completed_at_before', None)
+        record_activity(instance.enrollment.user_id, lessons=delta, moment=moment)
+        learning_summary.invalidate(instance.enrollment.user_id)
+
+
+@receiver(post_delete, sender=LessonProgress)
+def lesson_progress_deleted(sender, instance, **kwargs):
+    if instance.is_completed:
+        Enrollment.refresh_completion(instance.enrollment_id)
+        invalidate_summary(instance.enrollment_id)
+        user_id = Enrollment.objects.filter(pk=instance.enrollment_id).values_list('user_id', flat=True).first()
+        if user_id is not None:
+            record_activity(user_id, lessons=-1, moment=instance.completed_at)
+            learning_summary.invalidate(user_id)
+
+
+@receiver(post_save, sender=QuizAnswerKey)
+@receiver(post_delete, sender=QuizAnswerKey)
+def answer_key_changed(sender, instance, **kwargs):
+    """Le barème compilé en cache est recompilé à la prochaine correction"""
+    invalidate_answer_key(instance.lesson_id)
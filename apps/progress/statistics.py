@@ -0,0 +1,159 @@
+# apps/progress/statistics.py
+"""
+Recalcul des statistiques utilisateur - WIM Platform
+Agrégations groupées par utilisateur sur les inscriptions, les quiz et
+l'activité quotidienne : un lot d'utilisateurs coûte un nombre fixe de
+requêtes, quelle que soit sa taille
+"""
+
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .activity import ACTIVITY_FIELDS, ActivityCalendar, local_date, user_timezones
+
+STATISTICS_FIELDS = [
+    'total_courses_enrolled', 'total_courses_completed', 'total_lessons_completed',
+    'total_study_time', 'total_quizzes_passed', 'average_quiz_score', 'average_progress',
+    'current_streak_days', 'longest_streak_days', 'last_study_date',
+]
+
+
+def _decimal(value):
+    return Decimal(str(round(value or 0, 2)))
+
+
+def aggregate_statistics(users):
+    """Statistiques {user_id: valeurs} d'un queryset d'utilisateurs, en cinq requêtes"""
+    from apps.enrollments.models import Enrollment
+    from .models import DailyActivity, QuizAttempt
+
+    user_ids = list(users.order_by().values_list('id', flat=True))
+    if not user_ids:
+        return {}
+    selection = users.order_by().values('id')
+
+    values = {
+        user_id: {
+            'total_courses_enrolled': 0, 'total_courses_completed': 0, 'total_lessons_completed': 0,
+            'total_study_time': 0, 'total_quizzes_passed': 0,
+            'average_quiz_score': _decimal(0), 'average_progress': _decimal(0),
+        }
+        for user_id in user_ids
+    }
+
+    active = Q(is_active=True)
+    enrollments = Enrollment.objects.filter(user_id__in=selection).values('user_id').annotate(
+        enrolled=Count('id', filter=active),
+        completed=Count('id', filter=active & Q(is_completed=True)),
+        lessons=Sum('completed_lessons'),
+        study_time=Sum('total_time_spent', filter=active),
+        progress=Avg('progress_percentage', filter=active),
+    ).order_by()
+    for row in enrollments:
+        values[row['user_id']].update(
+            total_courses_enrolled=row['enrolled'],
+            total_courses_completed=row['completed'],
+            total_lessons_completed=row['lessons'] or 0,
+            total_study_time=row['study_time'] or 0,
+            average_progress=_decimal(row['progress']),
+        )
+
+    quizzes = QuizAttempt.objects.filter(enrollment__user_id__in=selection).values(
+        'enrollment__user_id'
+    ).annotate(passed=Count('id', filter=Q(is_passed=True)), score=Avg('score')).order_by()
+    for row in quizzes:
+        values[row['enrollment__user_id']].update(
+            total_quizzes_passed=row['passed'],
+            average_quiz_score=_decimal(row['score']),
+        )
+
+    # Séries : un parcours de l'activité quotidienne de tout le lot
+    activity = defaultdict(dict)
+    for user_id, day, *counters in DailyActivity.objects.filter(user_id__in=selection).order_by(
+        'user_id', 'date'
+    ).values_list('user_id', 'date', *ACTIVITY_FIELDS):
+        activity[user_id][day] = tuple(counters)
+
+    timezones = user_timezones(user_ids)
+    for user_id in user_ids:
+        today = local_date(user_id, tz=timezones[user_id])
+        calendar = ActivityCalendar(user_id, today=today, days=activity.get(user_id, {}))
+        values[user_id].update(
+            current_streak_days=calendar.current_streak(),
+            longest_streak_days=calendar.longest_streak(),
+            last_study_date=calendar.last_active_date(),
+        )
+
+    return values
+
+
+def apply_statistics(stats, values):
+    """Reporte les valeurs calculées sur une ligne UserStatistics (sans l'enregistrer)"""
+    for field, value in values.items():
+        setattr(stats, field, value)
+    # La plus longue série et la dernière étude ne reculent pas
+    stats.longest_streak_days = max(stats.longest_streak_days or 0, values['longest_streak_days'])
+    stats.last_study_date = values['last_study_date'] or stats.last_study_date
+
+
+def recompute_statistics(users):
+    """Recalcule et enregistre les statistiques d'un queryset d'utilisateurs"""
+    from .models import UserStatistics
+
+    values = aggregate_statistics(users)
+    if not values:
+        return 0
+
+    UserStatistics.objects.bulk_create([UserStatistics(user_id=user_id) for user_id in values], ignore_conflicts=True)
+
+    now = timezone.now()
+    rows = list(UserStatistics.objects.filter(user_id__in=list(values)).only(
+        'id', 'user_id', 'longest_streak_days', 'last_study_date'
+    ))
+    for row in rows:
+        apply_statistics(row, values[row.user_id])
+        row.updated_at = now
+
+    UserStatistics.objects.bulk_update(rows, STATISTICS_FIELDS + ['updated_at'], batch_size=500)
+    return len(rows)
+
+
+# ----------------------------------------------------------------------
+# Recalcul par tranches d'identifiants (pool de processus)
+# ----------------------------------------------------------------------
+
+def id_ranges(chunk_size, start=0):
+    """Tranches (low, high] des identifiants utilisateurs ; la dernière est ouverte"""
+    from apps.users.models import User
+
+    bounds = []
+    ids = User.objects.filter(id__gt=start).order_by('id').values_list('id', flat=True)
+    for position, user_id in enumerate(ids.iterator(chunk_size=10000), start=1):
+        if position % chunk_size == 0:
+            bounds.append(user_id)
+    return list(zip([start] + bounds, bounds + [None]))
+
+
+def recompute_range(bounds):
+    """Recalcule une tranche ; retourne (bornes, utilisateurs, durée)"""
+    from apps.users.models import User
+
+    started = time.monotonic()
+    low, high = bounds
+    users = User.objects.filter(id__gt=low)
+    if high is not None:
+        users = users.filter(id__lte=high)
+    return bounds, recompute_statistics(users), time.monotonic() - started
+
+
+def init_worker():
+    """Initialisation d'un processus du pool : Django prêt, sans connexion héritée"""
+    import django
+
+    django.setup()
+    connections.close_all()
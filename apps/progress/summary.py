@@ -0,0 +1,74 @@
+# apps/progress/summary.py
+"""
+Résumé de progression par module - WIM Platform
+Leçons complétées d'une inscription et leur nombre par module, lus en une
+requête et mis en cache par inscription ; le cache est invalidé à chaque
+complétion ou dé-complétion de leçon, et ignoré si la structure du cours a changé
+"""
+
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+SUMMARY_KEY = 'module_progress:{}'
+SUMMARY_TIMEOUT = 60 * 60 * 24
+
+
+def summary_key(enrollment_id):
+    return SUMMARY_KEY.format(enrollment_id)
+
+
+def build_summary(enrollment_id, version):
+    """Leçons publiées complétées et leur nombre par module, en une requête"""
+    from .models import LessonProgress
+
+    rows = LessonProgress.objects.filter(
+        enrollment_id=enrollment_id,
+        is_completed=True,
+        lesson__is_published=True,
+        lesson__module__is_published=True,
+    ).order_by().values_list('lesson_id', 'lesson__module_id')
+
+    completed_ids = set()
+    modules = Counter()
+    for lesson_id, module_id in rows:
+        completed_ids.add(lesson_id)
+        modules[module_id] += 1
+
+    return {'version': version, 'completed_ids': completed_ids, 'modules': dict(modules)}
+
+
+def get_summary(enrollment, version):
+    """Résumé en cache de l'inscription pour la version de structure donnée"""
+    key = summary_key(enrollment.pk)
+    summary = cache.get(key)
+    if summary is None or summary['version'] != version:
+        summary = build_summary(enrollment.pk, version)
+        cache.set(key, summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate(enrollment_id):
+    """Invalide le résumé après validation de la transaction en cours"""
+    transaction.on_commit(lambda: cache.delete(summary_key(enrollment_id)))
+
+
+def module_progress(enrollment, outline):
+    """
+    Modules du plan enrichis de la progression de l'inscription :
+    (modules, identifiants des leçons complétées)
+    """
+    summary = get_summary(enrollment, outline['version'])
+
+    modules = []
+    for module in outline['modules']:
+        completed_lessons = summary['modules'].get(module['id'], 0)
+        total_lessons = module['lesson_count']
+        modules.append(dict(
+            module,
+            completed_lessons=completed_lessons,
+            total_lessons=total_lessons,
+            progress_percentage=(completed_lessons / total_lessons * 100) if total_lessons > 0 else 0,
+        ))
+    return modules, summary['completed_ids']
@@ -0,0 +1,188 @@
+# apps/progress/sync.py
+"""
+Synchronisation de progression par lots - WIM Platform
+Applique en une transaction les changements d'état envoyés par un client
+(hors ligne, mobile, « terminer le module ») : la dernière écriture gagne
+selon l'horodatage client, les progressions sont écrites par upserts groupés
+et chaque inscription touchée n'est mise à jour qu'une fois
+"""
+
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .activity import local_date, record_activity_batch, user_timezones
+
+STATES = ('started', 'completed', 'incomplete')
+
+SyncEntry = namedtuple('SyncEntry', ['lesson_id', 'state', 'position', 'time_spent', 'timestamp'])
+
+
+class SyncError(ValueError):
+    """Lot de synchronisation invalide"""
+
+
+def max_entries():
+    return getattr(settings, 'PROGRESS_SYNC_MAX_ENTRIES', 500)
+
+
+def parse_timestamp(value, now):
+    """Horodatage client (ISO 8601 ou secondes epoch), borné à l'heure du serveur"""
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            moment = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        elif isinstance(value, str):
+            moment = parse_datetime(value)
+        else:
+            raise SyncError("Horodatage client manquant")
+    except (OverflowError, OSError, ValueError):
+        # Hors de la plage des dates, NaN ou date ISO mal formée (mois 13...)
+        raise SyncError(f"Horodatage invalide : {value}")
+    if moment is None:
+        raise SyncError(f"Horodatage invalide : {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    # Une horloge client en avance ne doit pas verrouiller la leçon
+    return min(moment, now)
+
+
+def parse_entries(data, now=None):
+    """Valide le lot ; une seule entrée (la plus récente) est gardée par leçon"""
+    now = now or timezone.now()
+    if not isinstance(data, list) or not data:
+        raise SyncError("Liste d'entrées manquante")
+    if len(data) > max_entries():
+        raise SyncError(f"Trop d'entrées (maximum {max_entries()})")
+
+    entries = {}
+    for item in data:
+        if not isinstance(item, dict):
+            raise SyncError("Entrée invalide")
+        try:
+            lesson_id = int(item['lesson'])
+            position = max(0, int(float(item.get('position') or 0)))
+            time_spent = max(0, int(float(item.get('time_spent') or 0)))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise SyncError("Entrée invalide")
+        state = item.get('state', 'started')
+        if state not in STATES:
+            raise SyncError(f"État inconnu : {state}")
+
+        entry = SyncEntry(lesson_id, state, position, time_spent,
+                          parse_timestamp(item.get('client_timestamp'), now))
+        current = entries.get(lesson_id)
+        if current is None or entry.timestamp >= current.timestamp:
+            entries[lesson_id] = entry
+    return list(entries.values())
+
+
+def apply_entries(user, entries):
+    """
+    Applique les entrées d'un utilisateur. Les entrées plus anciennes que le
+    dernier état enregistré sont ignorées ; le temps passé ne fait que croître.
+    """
+    from apps.courses.models import Lesson
+    from apps.dashboard.snapshot import invalidate as invalidate_dashboard
+    from apps.enrollments import learning_summary
+    from apps.enrollments.models import Enrollment
+    from .models import LessonProgress
+    from .summary import invalidate as invalidate_summary
+
+    result = {'applied': [], 'stale': [], 'rejected': []}
+
+    lesson_courses = dict(Lesson.objects.filter(
+        id__in=[entry.lesson_id for entry in entries], is_published=True
+    ).values_list('id', 'module__course_id'))
+    enrollments = dict(Enrollment.objects.filter(
+        user=user, course_id__in=set(lesson_courses.values()), is_active=True
+    ).values_list('course_id', 'id'))
+
+    batch = {}
+    for entry in entries:
+        enrollment_id = enrollments.get(lesson_courses.get(entry.lesson_id))
+        if enrollment_id is None:
+            result['rejected'].append(entry.lesson_id)
+        else:
+            batch[(enrollment_id, entry.lesson_id)] = entry
+    if not batch:
+        return result
+
+    now = timezone.now()
+    with transaction.atomic():
+        LessonProgress.objects.bulk_create(
+            [LessonProgress(enrollment_id=e, lesson_id=l) for e, l in batch],
+            ignore_conflicts=True,
+        )
+        rows = LessonProgress.objects.select_for_update().filter(
+            enrollment_id__in={e for e, _ in batch},
+            lesson_id__in={l for _, l in batch},
+        ).order_by('id').only(
+            'id', 'enrollment_id', 'lesson_id', 'is_completed', 'completed_at', 'started_at',
+            'video_position', 'time_spent', 'state_updated_at',
+        )
+
+        changed = []
+        completion = {}
+        time_added = {}
+        activity = {}
+        timezones = user_timezones([user.pk])
+        for row in rows:
+            entry = batch.get((row.enrollment_id, row.lesson_id))
+            if entry is None:
+                continue
+            if row.state_updated_at is not None and entry.timestamp <= row.state_updated_at:
+                result['stale'].append(entry.lesson_id)
+                continue
+
+            delta = 0
+            if entry.state == 'completed' and not row.is_completed:
+                row.is_completed, row.completed_at, delta = True, entry.timestamp, 1
+            elif entry.state == 'incomplete' and row.is_completed:
+                day = local_date(user.pk, row.completed_at or now, tz=timezones[user.pk])
+                row.is_completed, row.completed_at, delta = False, None, -1
+            if delta:
+                completion[row.enrollment_id] = completion.get(row.enrollment_id, 0) + delta
+                if delta > 0:
+                    day = local_date(user.pk, entry.timestamp, tz=timezones[user.pk])
+                counters = activity.setdefault((user.pk, day), {})
+                counters['lessons_completed'] = counters.get('lessons_completed', 0) + delta
+
+            added = max(0, entry.time_spent - row.time_spent)
+            if added:
+                row.time_spent = entry.time_spent
+                time_added[row.enrollment_id] = time_added.get(row.enrollment_id, 0) + added
+
+            row.video_position = entry.position
+            row.started_at = row.started_at or entry.timestamp
+            row.state_updated_at = entry.timestamp
+            row.last_accessed = now
+            changed.append(row)
+            result['applied'].append(entry.lesson_id)
+
+        LessonProgress.objects.bulk_update(changed, [
+            'is_completed', 'completed_at', 'started_at', 'video_position', 'time_spent',
+            'state_updated_at', 'last_accessed',
+        ], batch_size=500)
+
+        # Une mise à jour par inscription touchée
+        for enrollment_id in {row.enrollment_id for row in changed}:
+            if enrollment_id in completion:
+                Enrollment.refresh_completion(enrollment_id)
+                invalidate_summary(enrollment_id)
+            Enrollment.objects.filter(pk=enrollment_id).update(
+                total_time_spent=F('total_time_spent') + time_added.get(enrollment_id, 0),
+                last_accessed=now,
+            )
+        record_activity_batch(activity)
+        # Les mises à jour groupées ne déclenchent pas les signaux
+        if completion:
+            invalidate_dashboard(user.pk)
+        if completion or time_added:
+            learning_summary.invalidate(user.pk)
+
+    return result
@@ -1,3 +1,430 @@
-from django.test import TestCase
+# apps/progress/tests.py
+"""
+Tests Progress - WIM Platform
+Synchronisation par lots (la dernière écriture gagne), correction des quiz,
+battements de lecture vidéo, activité quotidienne et compaction du journal
+des événements d'étude
+"""
 
-# Create your tests here.
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.courses.models import Course, Lesson, Module
+from apps.enrollments.models import Enrollment
+from apps.users.models import User, UserPreference
+from . import events, heartbeats
+from .activity import ActivityCalendar, record_activity
+from .grading import AnswerKeyError, CompiledKey
+from .models import (
+    DailyActivity, LessonProgress, QuizAnswerKey, QuizAttempt, StudyEvent, StudySession, UserStatistics,
+)
+from .sync import SyncError, apply_entries, parse_entries, parse_timestamp
+
+
+class ProgressTestData:
+    """Un cours publié de deux leçons et un étudiant inscrit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user('formateur@example.com', 'secret', name='Formateur')
+        cls.student = User.objects.create_user('etudiant@example.com', 'secret', name='Étudiant')
+        cls.course = Course.objects.create(
+            title='Django', description='Django', full_description='Django', instructor=instructor, is_published=True
+        )
+        module = Module.objects.create(course=cls.course, title='Bases', order=1)
+        cls.lesson = Lesson.objects.create(module=module, title='Modèles', order=1)
+        cls.quiz = Lesson.objects.create(module=module, title='Quiz', order=2, lesson_type='quiz')
+        cls.enrollment = Enrollment.objects.create(user=cls.student, course=cls.course)
+
+
+class SyncTests(ProgressTestData, TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def entry(self, state='started', minutes_ago=0, lesson=None, **fields):
+        return dict({
+            'lesson': (lesson or self.lesson).pk,
+            'state': state,
+            'client_timestamp': (self.now - timedelta(minutes=minutes_ago)).isoformat(),
+        }, **fields)
+
+    def sync(self, *items):
+        return apply_entries(self.student, parse_entries(list(items), now=self.now))
+
+    def progress(self, lesson=None):
+        return LessonProgress.objects.get(enrollment=self.enrollment, lesson=lesson or self.lesson)
+
+    def test_newer_state_wins_and_older_is_stale(self):
+        result = self.sync(self.entry('completed', minutes_ago=5))
+        self.assertEqual(result['applied'], [self.lesson.pk])
+        self.assertTrue(self.progress().is_completed)
+
+        # Un client resté hors ligne renvoie un état plus ancien
+        result = self.sync(self.entry('incomplete', minutes_ago=10))
+        self.assertEqual(result['stale'], [self.lesson.pk])
+        self.assertTrue(self.progress().is_completed)
+
+        result = self.sync(self.entry('incomplete', minutes_ago=1))
+        self.assertEqual(result['applied'], [self.lesson.pk])
+        self.assertFalse(self.progress().is_completed)
+
+    def test_completion_counter_follows_state(self):
+        self.sync(self.entry('completed', minutes_ago=3), self.entry('completed', minutes_ago=3, lesson=self.quiz))
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 2)
+
+        self.sync(self.entry('incomplete', minutes_ago=1))
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 1)
+
+    def test_latest_entry_per_lesson_is_kept(self):
+        entries = parse_entries([
+            self.entry('completed', minutes_ago=1),
+            self.entry('incomplete', minutes_ago=4),
+        ], now=self.now)
+        self.assertEqual([entry.state for entry in entries], ['completed'])
+
+    def test_time_spent_only_grows(self):
+        self.sync(self.entry(minutes_ago=5, time_spent=300, position=40))
+        self.sync(self.entry(minutes_ago=2, time_spent=120, position=10))
+
+        progress = self.progress()
+        self.assertEqual((progress.time_spent, progress.video_position), (300, 10))
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.total_time_spent, 300)
+
+    def test_future_timestamp_is_capped(self):
+        future = (self.now + timedelta(days=365)).timestamp()
+        self.assertEqual(parse_timestamp(future, self.now), self.now)
+
+    def test_lessons_outside_enrollments_are_rejected(self):
+        other = Course.objects.create(
+            title='Flask', description='Flask', full_description='Flask', instructor=self.course.instructor,
+            is_published=True,
+        )
+        lesson = Lesson.objects.create(module=Module.objects.create(course=other, title='Bases'), title='Routes')
+
+        result = self.sync(self.entry(lesson=lesson))
+        self.assertEqual(result['rejected'], [lesson.pk])
+        self.assertFalse(LessonProgress.objects.filter(lesson=lesson).exists())
+
+    def test_invalid_batches_raise_sync_error(self):
+        invalid = {
+            'pas une liste': {'lesson': self.lesson.pk},
+            'liste vide': [],
+            'entrée non objet': ['leçon'],
+            'leçon manquante': [{'state': 'started', 'client_timestamp': 0}],
+            'état inconnu': [self.entry('paused')],
+            'position non numérique': [self.entry(position='loin')],
+            'position infinie': [self.entry(position='1e400')],
+            'horodatage manquant': [{'lesson': self.lesson.pk}],
+            'horodatage illisible': [self.entry(client_timestamp='hier')],
+            'mois inexistant': [self.entry(client_timestamp='2024-13-01T00:00:00')],
+            'epoch hors plage': [self.entry(client_timestamp=1e20)],
+            'epoch NaN': [self.entry(client_timestamp=float('nan'))],
+            'booléen': [self.entry(client_timestamp=True)],
+        }
+        for label, data in invalid.items():
+            with self.subTest(label):
+                with self.assertRaises(SyncError):
+                    parse_entries(data, now=self.now)
+
+    @override_settings(PROGRESS_SYNC_MAX_ENTRIES=2)
+    def test_batch_size_is_capped(self):
+        with self.assertRaises(SyncError):
+            parse_entries([self.entry(lesson=self.lesson), self.entry(lesson=self.quiz), self.entry()], now=self.now)
+
+    def test_view_reports_bad_input_as_400(self):
+        self.client.force_login(self.student)
+        url = reverse('progress_api:sync')
+
+        response = self.client.post(url, json.dumps({'entries': [self.entry(client_timestamp=1e20)]}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+        response = self.client.post(url, json.dumps({'entries': [self.entry('completed')]}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.progress().is_completed)
+
+
+class CompiledKeyTests(TestCase):
+    """Correction d'une tentative et d'un lot de tentatives avec le barème compilé"""
+
+    QUESTIONS = [
+        {'id': 'q1', 'type': 'single', 'answer': 'b'},
+        {'id': 'q2', 'type': 'multiple', 'answer': ['a', 'c'], 'points': 2},
+        {'id': 'q3', 'type': 'text', 'answer': ['Modèle Vue Gabarit', 'MVT']},
+    ]
+
+    def setUp(self):
+        self.key = CompiledKey(1, self.QUESTIONS, 70)
+
+    def test_grade(self):
+        cases = [
+            ({'q1': 'b', 'q2': ['c', 'a'], 'q3': 'mvt'}, (3, Decimal('100.00'), True)),
+            # Texte : casse, accents et espaces ne comptent pas
+            ({'q1': ' b ', 'q2': ['a', 'c', 'a'], 'q3': '  modele   VUE gabarit'}, (3, Decimal('100.00'), True)),
+            ({'q1': 'b', 'q2': ['a'], 'q3': 'MVT'}, (2, Decimal('50.00'), False)),
+            ({'q2': ['a', 'c'], 'q3': 'mvc'}, (1, Decimal('50.00'), False)),
+            ({'q1': 'b', 'q2': ['a', 'c']}, (2, Decimal('75.00'), True)),
+            ({}, (0, Decimal('0.00'), False)),
+            ('pas un objet', (0, Decimal('0.00'), False)),
+        ]
+        for answers, expected in cases:
+            with self.subTest(answers=answers):
+                self.assertEqual(self.key.grade(answers), expected)
+
+    def test_grade_many_matches_grade(self):
+        answer_sets = [
+            {'q1': 'b', 'q2': ['c', 'a'], 'q3': 'mvt'},
+            {'q1': 'a', 'q2': 'a', 'q3': None},
+            {'q3': 'Modele vue gabarit'},
+            {},
+        ]
+        self.assertEqual(self.key.grade_many(answer_sets), [self.key.grade(a) for a in answer_sets])
+        self.assertEqual(self.key.grade_many([]), [])
+
+    def test_invalid_questions_are_rejected(self):
+        for question in ({'id': 'q1', 'type': 'essay', 'answer': 'x'}, {'type': 'single', 'answer': 'x'},
+                         {'id': 'q1', 'type': 'single'}):
+            with self.subTest(question=question):
+                with self.assertRaises(AnswerKeyError):
+                    CompiledKey(1, [question], 70)
+
+
+class QuizCompletionTests(ProgressTestData, TestCase):
+    """Tentative terminée : score du barème, meilleur score et complétion de la leçon"""
+
+    def setUp(self):
+        QuizAnswerKey.objects.create(lesson=self.quiz, questions=CompiledKeyTests.QUESTIONS, pass_threshold=70)
+
+    def attempt(self, answers):
+        attempt = QuizAttempt.objects.create(enrollment=self.enrollment, lesson=self.quiz, answers=answers)
+        attempt.complete_quiz()
+        attempt.refresh_from_db()
+        return attempt
+
+    def test_best_score_is_kept_and_lesson_completed_once_passed(self):
+        failed = self.attempt({'q1': 'b'})
+        self.assertEqual((failed.correct_answers, failed.total_questions, failed.is_passed), (1, 3, False))
+        progress = LessonProgress.objects.get(enrollment=self.enrollment, lesson=self.quiz)
+        self.assertEqual(progress.best_quiz_score, Decimal('25.00'))
+        self.assertFalse(progress.is_completed)
+
+        passed = self.attempt({'q1': 'b', 'q2': ['a', 'c'], 'q3': 'MVT'})
+        self.assertTrue(passed.is_passed)
+        self.attempt({})
+
+        progress.refresh_from_db()
+        self.assertEqual(progress.best_quiz_score, Decimal('100.00'))
+        self.assertTrue(progress.is_completed)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons, 1)
+
+
+class HeartbeatTests(ProgressTestData, TestCase):
+    """Battements envoyés par le lecteur, mis en tampon puis écrits par lots"""
+
+    def setUp(self):
+        # Tampon propre au test : son thread d'écriture ne se déclenche jamais
+        self.buffer = heartbeats.HeartbeatBuffer(flush_interval=3600, max_gap=60, max_pending_lessons=2)
+        patcher = mock.patch.object(heartbeats, 'buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.student)
+
+    def beat(self, lesson=None, **payload):
+        url = reverse('progress_api:lesson_heartbeat', args=[(lesson or self.lesson).pk])
+        return self.client.post(url, json.dumps(payload), content_type='application/json')
+
+    def progress(self):
+        return LessonProgress.objects.get(enrollment=self.enrollment, lesson=self.lesson)
+
+    def seconds_studied(self):
+        return sum(DailyActivity.objects.filter(user=self.student).values_list('seconds_studied', flat=True))
+
+    def test_client_payload_without_watched_time_is_estimated(self):
+        # Charge utile envoyée par static/js/main.js avant l'ajout de watched
+        for current_time in (10, 20, 30):
+            self.assertEqual(self.beat(progress=current_time / 3, current_time=current_time).status_code, 202)
+        self.buffer.flush()
+
+        progress = self.progress()
+        self.assertEqual((progress.video_position, progress.time_spent), (30, 30))
+        self.assertEqual(self.seconds_studied(), 30)
+
+        # L'estimation part de la position enregistrée et reste bornée
+        self.beat(progress=50, current_time=500)
+        self.buffer.flush()
+        self.assertEqual(self.progress().time_spent, 90)
+
+    def test_declared_watched_time_is_summed_and_clamped(self):
+        for current_time, watched in ((10, 10), (20, 10), (400, 1000), (410, -5)):
+            self.beat(progress=0, current_time=current_time, watched=watched)
+        self.buffer.flush()
+
+        progress = self.progress()
+        self.assertEqual((progress.video_position, progress.time_spent), (410, 80))
+        self.assertEqual(self.seconds_studied(), 80)
+
+    def test_a_minute_of_playback_counts_toward_the_streak(self):
+        for current_time in range(15, 75, 15):
+            self.beat(current_time=current_time, watched=15)
+        self.buffer.flush()
+
+        calendar = ActivityCalendar(self.student.pk)
+        self.assertEqual(calendar.current_streak(), 1)
+
+    def test_lessons_outside_enrollments_are_not_written(self):
+        other = Course.objects.create(
+            title='Flask', description='Flask', full_description='Flask', instructor=self.course.instructor,
+            is_published=True,
+        )
+        lesson = Lesson.objects.create(module=Module.objects.create(course=other, title='Bases'), title='Routes')
+
+        self.beat(lesson, current_time=30, watched=30)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(LessonProgress.objects.filter(lesson=lesson).exists())
+
+    def test_pending_lessons_per_user_are_capped(self):
+        self.assertEqual(self.beat(self.lesson, current_time=1).status_code, 202)
+        self.assertEqual(self.beat(self.quiz, current_time=1).status_code, 202)
+        self.assertEqual(self.beat(lesson=Lesson(pk=999999), current_time=1).status_code, 429)
+        # Une leçon déjà en attente reste acceptée
+        self.assertEqual(self.beat(self.lesson, current_time=2).status_code, 202)
+
+        self.buffer.flush()
+        self.assertEqual(self.beat(lesson=Lesson(pk=999999), current_time=1).status_code, 202)
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.beat(current_time='loin').status_code, 400)
+        self.assertEqual(self.beat(current_time=10, watched='longtemps').status_code, 400)
+
+
+class DailyActivityTests(ProgressTestData, TestCase):
+    """Agrégat quotidien tenu par delta sur le jour local, séries lues en un parcours"""
+
+    # 20 h UTC le 1er janvier : encore le 1er à Paris, déjà le 2 à Auckland
+    MOMENT = datetime(2024, 1, 1, 20, 0, tzinfo=dt_timezone.utc)
+
+    def complete(self, lesson, moment):
+        progress, _ = LessonProgress.objects.get_or_create(enrollment=self.enrollment, lesson=lesson)
+        progress.is_completed, progress.completed_at = True, moment
+        progress.save()
+        return progress
+
+    def lessons_by_day(self):
+        return dict(DailyActivity.objects.filter(user=self.student).values_list('date', 'lessons_completed'))
+
+    def add_days(self, today, *offsets, **values):
+        for offset in offsets:
+            DailyActivity.objects.create(user=self.student, date=today - timedelta(days=offset), **values)
+
+    def test_completions_follow_the_users_local_day(self):
+        self.complete(self.lesson, self.MOMENT)
+        self.assertEqual(self.lessons_by_day(), {date(2024, 1, 1): 1})
+
+        UserPreference.objects.create(user=self.student, timezone='Pacific/Auckland')
+        self.complete(self.quiz, self.MOMENT)
+        self.assertEqual(self.lessons_by_day(), {date(2024, 1, 1): 1, date(2024, 1, 2): 1})
+
+    def test_uncompleting_removes_the_lesson_from_its_day(self):
+        progress = self.complete(self.lesson, self.MOMENT - timedelta(days=3))
+        progress.is_completed, progress.completed_at = False, None
+        progress.save()
+        self.assertEqual(self.lessons_by_day(), {date(2023, 12, 29): 0})
+
+    def test_streaks_and_charts_from_one_range_scan(self):
+        today = date(2024, 3, 10)
+        self.add_days(today, 0, 1, 2, 5, 6, 7, 8, lessons_completed=1)
+        # Moins d'une minute d'étude sans complétion : la journée ne compte pas
+        self.add_days(today, 3, seconds_studied=30)
+        self.add_days(today, 4, seconds_studied=60)
+
+        with self.assertNumQueries(1):
+            calendar = ActivityCalendar(self.student.pk, today=today)
+        self.assertEqual((calendar.current_streak(), calendar.longest_streak()), (3, 5))
+        self.assertEqual([day['has_activity'] for day in calendar.last_days(7)],
+                         [True, True, True, False, True, True, True])
+
+        weeks = calendar.weeks()
+        self.assertTrue(all(len(week) == 7 for week in weeks))
+        self.assertEqual(sum(day is not None for week in weeks for day in week), 365)
+        self.assertEqual(weeks[-1][today.weekday()]['level'], 1)
+
+    def test_batched_deltas_and_user_statistics_streak(self):
+        today = timezone.localdate()
+        record_activity(self.student.pk, seconds=90)
+        record_activity(self.student.pk, quizzes=1, day=today - timedelta(days=1))
+
+        stats = UserStatistics.objects.create(user=self.student)
+        stats.calculate_streak()
+        self.assertEqual((stats.current_streak_days, stats.longest_streak_days, stats.last_study_date),
+                         (2, 2, today))
+
+
+@override_settings(PROGRESS_STUDY_SESSION_GAP=30 * 60)
+class StudyEventTests(ProgressTestData, TestCase):
+    """Événements d'étude insérés par lots puis regroupés en sessions par la compaction"""
+
+    def setUp(self):
+        self.start = timezone.now() - timedelta(days=1)
+
+    def event(self, minutes, lesson=None):
+        return StudyEvent.objects.create(user=self.student, course=self.course, lesson=lesson,
+                                         occurred_at=self.start + timedelta(minutes=minutes))
+
+    def sessions(self):
+        return [(session.duration, set(session.lessons_viewed.values_list('id', flat=True)))
+                for session in StudySession.objects.filter(user=self.student).order_by('started_at')]
+
+    def time_spent(self):
+        self.enrollment.refresh_from_db()
+        return self.enrollment.total_time_spent
+
+    def test_views_are_buffered_then_inserted_in_one_batch(self):
+        buffer = events.StudyEventBuffer(flush_interval=3600)
+        with mock.patch.object(events, 'buffer', buffer):
+            with self.assertNumQueries(0):
+                for lesson in (self.lesson, self.quiz, self.lesson):
+                    events.record_event(self.student.pk, self.course.pk, lesson.pk)
+            with self.assertNumQueries(1):
+                self.assertEqual(events.flush(), 3)
+        self.assertEqual(StudyEvent.objects.count(), 3)
+
+    def test_events_are_folded_into_sessions_and_enrollment_time(self):
+        self.event(0, self.lesson)
+        self.event(10, self.quiz)
+        self.event(20)
+        # Plus de 30 minutes d'inactivité : nouvelle session
+        self.event(120, self.lesson)
+
+        self.assertEqual(events.compact(), (4, 2))
+        self.assertEqual(self.sessions(), [(1200, {self.lesson.pk, self.quiz.pk}), (0, {self.lesson.pk})])
+        self.assertEqual(self.time_spent(), 1200)
+        self.assertFalse(StudyEvent.objects.exists())
+
+        # Un événement proche prolonge la session existante au lieu d'en créer une
+        self.event(125, self.quiz)
+        self.assertEqual(events.compact(), (1, 0))
+        self.assertEqual(self.sessions()[1], (300, {self.lesson.pk, self.quiz.pk}))
+        self.assertEqual(self.time_spent(), 1500)
+
+    def test_small_batches_give_the_same_result(self):
+        for minutes in (0, 10, 20, 120, 125):
+            self.event(minutes, self.lesson)
+
+        call_command('compact_study_events', batch_size=2, stdout=StringIO())
+        self.assertEqual([duration for duration, _ in self.sessions()], [1200, 300])
+        self.assertEqual(self.time_spent(), 1500)
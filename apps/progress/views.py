@@ -3,16 +3,26 @@ Views Progress - WIM Platform
 Gestion de la progression
 """
 
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, DetailView
 from django.http import JsonResponse
-from django.db.models import Avg, Count, Sum
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+from django.db.models import Count, Sum
 
+from apps.enrollments import learning_summary
+from apps.progress.activity import ActivityCalendar
 from apps.progress.models import LessonProgress, UserStatistics
-from apps.enrollments.models import Enrollment
-from apps.courses.models import Course
+from apps.enrollments.models import Enrollment, PROGRESS_FIELDS
+from apps.courses.models import Course, Lesson
+from apps.courses.outline import get_outline
+from apps.progress.heartbeats import record_heartbeat
+from apps.progress.summary import module_progress
+from apps.progress.sync import SyncError, apply_entries, parse_entries
 
 
 class ProgressOverviewView(LoginRequiredMixin, TemplateView):
@@ -24,20 +34,22 @@ class ProgressOverviewView(LoginRequiredMixin, TemplateView):
         user = self.request.user
 
         # Statistiques globales
-        enrollments = Enrollment.objects.filter(user=user, is_active=True)
-
-        context['total_courses'] = enrollments.count()
-        context['completed_courses'] = enrollments.filter(is_completed=True).count()
-        context['in_progress_courses'] = enrollments.filter(is_completed=False).count()
-
-        # Progression moyenne
-        avg_progress = enrollments.aggregate(
-            avg=Avg('progress_percentage')
-        )['avg'] or 0
-        context['average_progress'] = round(avg_progress, 1)
+        summary = learning_summary.for_request(self.request)
+        context['total_courses'] = summary['enrolled_count']
+        context['completed_courses'] = summary['completed_count']
+        context['in_progress_courses'] = summary['in_progress_count']
+        context['average_progress'] = summary['average_progress']
 
         # Cours actifs avec progression
-        context['active_enrollments'] = enrollments.select_related('course')
+        context['active_enrollments'] = Enrollment.objects.filter(user=user, is_active=True).select_related('course')
+
+        # Séries, mois en cours et calendrier annuel : une seule lecture de l'activité
+        calendar = ActivityCalendar(user.id)
+        last_days = calendar.last_days(28)
+        context['current_streak'] = calendar.current_streak()
+        context['longest_streak'] = calendar.longest_streak()
+        context['calendar_data'] = [last_days[i:i + 7] for i in range(0, len(last_days), 7)]
+        context['activity_heatmap'] = calendar.weeks()
 
         return context
 
@@ -63,26 +75,15 @@ class CourseProgressView(LoginRequiredMixin, DetailView):
             )
             context['enrollment'] = enrollment
 
-            # Progression par module
-            modules = course.modules.filter(is_published=True).prefetch_related('lessons')
-
-            module_progress = []
-            for module in modules:
-                total_lessons = module.lessons.count()
-                completed_lessons = LessonProgress.objects.filter(
-                    enrollment=enrollment,
-                    lesson__module=module,
-                    is_completed=True
-                ).count()
+            # Progression par module : plan et résumé de l'inscription mis en cache
+            outline = get_outline(course)
+            modules, completed_ids = module_progress(enrollment, outline)
 
-                module_progress.append({
-                    'module': module,
-                    'total': total_lessons,
-                    'completed': completed_lessons,
-                    'percentage': (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-                })
-
-            context['module_progress'] = module_progress
+            context['outline'] = outline
+            context['modules'] = modules
+            context['completed_lesson_ids'] = completed_ids
+            context['completed_lessons'] = sum(module['completed_lessons'] for module in modules)
+            context['total_lessons'] = outline['lesson_count']
 
         except Enrollment.DoesNotExist:
             context['enrollment'] = None
@@ -99,22 +100,18 @@ def user_statistics(request):
     stats, created = UserStatistics.objects.get_or_create(user=user)
 
     # Calculer les statistiques actuelles
-    enrollments = Enrollment.objects.filter(user=user, is_active=True)
+    summary = learning_summary.for_request(request)
 
     stats_data = {
-        'total_courses': enrollments.count(),
-        'completed_courses': enrollments.filter(is_completed=True).count(),
+        'total_courses': summary['enrolled_count'],
+        'completed_courses': summary['completed_count'],
         'total_lessons': LessonProgress.objects.filter(
             enrollment__user=user
         ).count(),
-        'completed_lessons': LessonProgress.objects.filter(
-            enrollment__user=user,
-            is_completed=True
-        ).count(),
+        'completed_lessons': summary['lessons_completed'],
         'total_study_time': stats.total_study_time,
-        'current_streak': stats.current_streak,
-        'longest_streak': stats.longest_streak,
-        'total_points': stats.total_points,
+        'current_streak': stats.current_streak_days,
+        'longest_streak': stats.longest_streak_days,
     }
 
     if request.htmx:
@@ -149,11 +146,12 @@ def update_progress(request):
         elif action == 'incomplete':
             progress.is_completed = False
             progress.completed_at = None
-            progress.save()
+            progress.state_updated_at = timezone.now()
+            progress.save(update_fields=['is_completed', 'completed_at', 'state_updated_at'])
 
-        # Recalculer la progression du cours
+        # La progression du cours a été mise à jour par delta
         enrollment = progress.enrollment
-        enrollment.calculate_progress()
+        enrollment.refresh_from_db(fields=PROGRESS_FIELDS)
 
         return JsonResponse({
             'success': True,
@@ -163,3 +161,48 @@ def update_progress(request):
     except LessonProgress.DoesNotExist:
         return JsonResponse({'error': 'Progression non trouvée'}, status=404)
 
+
+@login_required
+@require_POST
+def lesson_heartbeat(request, lesson_id):
+    """
+    Battement de lecture vidéo : {current_time, watched}, où watched est le
+    temps de lecture (en secondes) écoulé depuis le battement précédent ;
+    s'il manque, il est estimé par l'avance de la position. Mis en tampon,
+    écrit par lots.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+        position = max(0, int(float(data.get('current_time', 0))))
+        watched = float(data['watched']) if data.get('watched') is not None else None
+    except (ValueError, TypeError, AttributeError, OverflowError):
+        return JsonResponse({'error': 'Données invalides'}, status=400)
+
+    if not record_heartbeat(request.user.id, lesson_id, position, watched):
+        return JsonResponse({'error': 'Trop de leçons en cours de lecture'}, status=429)
+    return JsonResponse({'success': True}, status=202)
+
+
+@login_required
+@require_POST
+def sync_progress(request):
+    """Synchronisation par lots : [{lesson, state, position, time_spent, client_timestamp}]"""
+    try:
+        data = json.loads(request.body or b'{}')
+        entries = parse_entries(data.get('entries') if isinstance(data, dict) else data)
+    except (ValueError, AttributeError) as e:
+        message = str(e) if isinstance(e, SyncError) else 'Données invalides'
+        return JsonResponse({'error': message}, status=400)
+
+    result = apply_entries(request.user, entries)
+
+    # Progression de chaque cours touché, relue une seule fois
+    course_ids = Lesson.objects.filter(id__in=result['applied']).values('module__course_id')
+    progress = {
+        str(course_id): float(percentage)
+        for course_id, percentage in Enrollment.objects.filter(
+            user=request.user, course_id__in=course_ids, is_active=True
+        ).values_list('course_id', 'progress_percentage')
+    }
+
+    return JsonResponse({'success': True, **result, 'progress': progress})
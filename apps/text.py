@@ -0,0 +1,14 @@
+# apps/text.py
+"""
+Utilitaires texte partagés - WIM Platform
+Normalisation commune à la recherche des cours et à la correction des quiz
+"""
+
+import unicodedata
+
+
+def fold(text):
+    """Passe en minuscules et supprime les accents (é -> e, œ -> oe)"""
+    text = (text or '').lower().replace('œ', 'oe').replace('æ', 'ae')
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
@@ -29,6 +29,6 @@ class UserAdmin(BaseUserAdmin):
 
 @admin.register(UserPreference)
 class UserPreferenceAdmin(admin.ModelAdmin):
-    list_display = ['user', 'preferred_language', 'theme', 'reminder_enabled']
+    list_display = ['user', 'preferred_language', 'timezone', 'theme', 'reminder_enabled']
     list_filter = ['theme', 'reminder_enabled']
     search_fields = ['user__email']
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userpreference",
+            name="timezone",
+            field=models.CharField(
+                blank=True,
+                help_text="Vide : fuseau horaire du site",
+                max_length=64,
+                verbose_name="fuseau horaire",
+            ),
+        ),
+    ]
@@ -72,6 +72,8 @@ class UserPreference(models.Model):
     preferred_language = models.CharField('langue', max_length=10, default='fr')
     learning_goal = models.CharField('objectif', max_length=255, blank=True)
     daily_study_time = models.IntegerField('temps quotidien (min)', default=30)
+    timezone = models.CharField('fuseau horaire', max_length=64, blank=True,
+                                help_text='Vide : fuseau horaire du site')
 
     reminder_enabled = models.BooleanField('rappels', default=True)
     reminder_time = models.TimeField('heure rappel', null=True, blank=True)
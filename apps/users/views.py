@@ -11,8 +11,8 @@ from django.contrib import messages
 from django.urls import reverse_lazy
 
 from apps.users.models import User
+from apps.enrollments import learning_summary
 from apps.enrollments.models import Enrollment
-from apps.certificates.models import Certificate
 
 
 class ProfileView(LoginRequiredMixin, DetailView):
@@ -26,19 +26,10 @@ class ProfileView(LoginRequiredMixin, DetailView):
         user = self.object
 
         # Statistiques de l'utilisateur
-        context['enrollments_count'] = Enrollment.objects.filter(
-            user=user,
-            is_active=True
-        ).count()
-
-        context['completed_courses'] = Enrollment.objects.filter(
-            user=user,
-            is_completed=True
-        ).count()
-
-        context['certificates_count'] = Certificate.objects.filter(
-            user=user
-        ).count()
+        summary = learning_summary.for_request(self.request, user=user)
+        context['enrollments_count'] = summary['enrolled_count']
+        context['completed_courses'] = summary['completed_count']
+        context['certificates_count'] = summary['certificates_count']
 
         # Cours en cours
         context['active_enrollments'] = Enrollment.objects.filter(
@@ -1,5 +1,6 @@
 # apps/youtube/management/commands/sync_youtube_content.py
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
 from apps.courses.models import Course, Module, Lesson
 from apps.youtube.services import YouTubeService
@@ -120,38 +121,41 @@ class Command(BaseCommand):
                 )
                 return
 
-        for i, video in enumerate(videos):
-            lesson, created = Lesson.objects.get_or_create(
-                module=default_module,
-                youtube_video_id=video['id'],
-                defaults={
-                    'title': video['title'][:200],
-                    'lesson_type': 'video',
-                    'order': i + 1,
-                    'youtube_title': video['title'],
-                    'youtube_description': video['description'],
-                    'youtube_thumbnail_url': video['thumbnail_url'],
-                    'youtube_duration_seconds': video['duration_seconds'],
-                    'youtube_view_count': video['view_count'],
-                    'youtube_published_at': video['published_at'],
-                    'duration': max(1, video['duration_seconds'] // 60),
-                    'video_url': f"https://www.youtube.com/watch?v={video['id']}",
-                    'is_published': True
-                }
-            )
+        # Une seule transaction : le rang des leçons et la progression des inscrits
+        # sont recalculés une fois, au commit
+        with transaction.atomic():
+            for i, video in enumerate(videos):
+                lesson, created = Lesson.objects.get_or_create(
+                    module=default_module,
+                    youtube_video_id=video['id'],
+                    defaults={
+                        'title': video['title'][:200],
+                        'lesson_type': 'video',
+                        'order': i + 1,
+                        'youtube_title': video['title'],
+                        'youtube_description': video['description'],
+                        'youtube_thumbnail_url': video['thumbnail_url'],
+                        'youtube_duration_seconds': video['duration_seconds'],
+                        'youtube_view_count': video['view_count'],
+                        'youtube_published_at': video['published_at'],
+                        'duration': max(1, video['duration_seconds'] // 60),
+                        'video_url': f"https://www.youtube.com/watch?v={video['id']}",
+                        'is_published': True
+                    }
+                )
 
-            if created:
-                created_lessons += 1
-            else:
-                # Mettre à jour les métadonnées existantes
-                lesson.youtube_title = video['title']
-                lesson.youtube_description = video['description']
-                lesson.youtube_thumbnail_url = video['thumbnail_url']
-                lesson.youtube_duration_seconds = video['duration_seconds']
-                lesson.youtube_view_count = video['view_count']
-                lesson.duration = max(1, video['duration_seconds'] // 60)
-                lesson.save()
-                updated_lessons += 1
+                if created:
+                    created_lessons += 1
+                else:
+                    # Mettre à jour les métadonnées existantes
+                    lesson.youtube_title = video['title']
+                    lesson.youtube_description = video['description']
+                    lesson.youtube_thumbnail_url = video['thumbnail_url']
+                    lesson.youtube_duration_seconds = video['duration_seconds']
+                    lesson.youtube_view_count = video['view_count']
+                    lesson.duration = max(1, video['duration_seconds'] // 60)
+                    lesson.save()
+                    updated_lessons += 1
 
         # Mettre à jour la durée du cours
         course.calculate_duration()
@@ -0,0 +1,370 @@
+# config/metrics.py
+"""
+Métriques de performance - WIM Platform
+Histogrammes et compteurs par route (durée, requêtes SQL, temps SQL, rendu
+des gabarits, cache, taille de réponse), tenus en mémoire par processus et
+écrits périodiquement dans un fichier JSON par worker ; la vue /metrics
+fusionne les fichiers de tous les workers au format texte Prometheus
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Nom -> (description, bornes des classes)
+HISTOGRAMS = {
+    'wim_request_duration_seconds': ('Durée totale de la requête', TIME_BUCKETS),
+    'wim_db_queries': ('Nombre de requêtes SQL par requête', COUNT_BUCKETS),
+    'wim_db_duration_seconds': ('Temps passé en base par requête', TIME_BUCKETS),
+    'wim_template_render_seconds': ('Temps de rendu des gabarits par requête', TIME_BUCKETS),
+    'wim_response_size_bytes': ('Taille de la réponse', SIZE_BUCKETS),
+}
+
+COUNTERS = {
+    'wim_requests_total': 'Nombre de requêtes',
+    'wim_cache_hits_total': 'Lectures du cache trouvées',
+    'wim_cache_misses_total': 'Lectures du cache manquées',
+}
+
+LABELS = ('route', 'method', 'kind')
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / 'var' / 'metrics'))
+
+
+# ----------------------------------------------------------------------
+# Mesures de la requête en cours
+# ----------------------------------------------------------------------
+
+class RequestStats:
+    """Compteurs de la requête en cours du thread"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+
+_local = threading.local()
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def begin():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def end():
+    _local.stats = None
+
+
+def db_wrapper(execute, sql, params, many, context):
+    """execute_wrapper : nombre et durée des requêtes SQL"""
+    stats = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - started
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        stats = current()
+        # Seul le gabarit le plus externe est chronométré
+        if stats is None or stats.template_depth:
+            return render(self, *args, **kwargs)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats.template_depth -= 1
+            stats.template_time += time.perf_counter() - started
+    return wrapper
+
+
+def _counted_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, *args, **kwargs):
+        stats = current()
+        if stats is None or stats.cache_depth:
+            return get(self, key, default, *args, **kwargs)
+        stats.cache_depth += 1
+        try:
+            sentinel = object()
+            value = get(self, key, sentinel, *args, **kwargs)
+        finally:
+            stats.cache_depth -= 1
+        if value is sentinel:
+            stats.cache_misses += 1
+            return default
+        stats.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, *args, **kwargs):
+        stats = current()
+        if stats is None or stats.cache_depth:
+            return get_many(self, keys, *args, **kwargs)
+        keys = list(keys)
+        stats.cache_depth += 1
+        try:
+            found = get_many(self, keys, *args, **kwargs)
+        finally:
+            stats.cache_depth -= 1
+        stats.cache_hits += len(found)
+        stats.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    """Instrumente le rendu des gabarits et les lectures du cache (une fois par processus)"""
+    global _installed
+    from django.core.cache import caches
+    from django.template.backends.django import Template
+
+    with _install_lock:
+        if _installed:
+            return
+        Template.render = _timed_render(Template.render)
+        backend = type(caches['default'])
+        backend.get = _counted_get(backend.get)
+        backend.get_many = _counted_get_many(backend.get_many)
+        _installed = True
+
+
+# ----------------------------------------------------------------------
+# Registre du processus
+# ----------------------------------------------------------------------
+
+def label_key(labels):
+    return json.dumps(labels, sort_keys=True)
+
+
+class Registry:
+    """Histogrammes et compteurs du processus, écrits dans un fichier par worker"""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(dict)
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.thread_pid = None
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = label_key(labels)
+        with self.lock:
+            series = self.histograms[name].get(key)
+            if series is None:
+                series = self.histograms[name][key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+        self.ensure_writer()
+
+    def inc(self, name, labels, amount=1):
+        if amount:
+            with self.lock:
+                self.counters[name][label_key(labels)] += amount
+
+    def dump(self):
+        with self.lock:
+            return {
+                'histograms': {name: {key: dict(series, buckets=list(series['buckets']))
+                                      for key, series in values.items()}
+                               for name, values in self.histograms.items()},
+                'counters': {name: dict(values) for name, values in self.counters.items()},
+            }
+
+    def ensure_writer(self):
+        # Un thread d'écriture par processus (les workers sont créés par fork)
+        if self.thread_pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread_pid == os.getpid():
+                return
+            self.thread_pid = os.getpid()
+        threading.Thread(target=self._run, name='metrics-writer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush_at_exit(self):
+        """À l'arrêt, n'écrit que si ce processus a servi des requêtes (commandes, shell : rien)"""
+        if self.thread_pid == os.getpid():
+            self.flush()
+
+    def flush(self):
+        """Écrit l'état du processus dans son fichier (remplacement atomique)"""
+        directory = metrics_dir()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as handle:
+                json.dump(self.dump(), handle)
+            os.replace(tmp_path, directory / f'metrics-{os.getpid()}.json')
+        except OSError as e:
+            logger.error(f"Erreur écriture des métriques: {e}")
+
+
+registry = Registry(flush_interval=getattr(settings, 'METRICS_FLUSH_INTERVAL', 10))
+atexit.register(registry.flush_at_exit)
+
+
+def record(labels, status, duration, stats, size):
+    """Enregistre les mesures d'une requête terminée"""
+    registry.observe('wim_request_duration_seconds', labels, duration)
+    registry.observe('wim_db_queries', labels, stats.queries)
+    registry.observe('wim_db_duration_seconds', labels, stats.db_time)
+    registry.observe('wim_template_render_seconds', labels, stats.template_time)
+    registry.observe('wim_response_size_bytes', labels, size)
+    registry.inc('wim_requests_total', dict(labels, status=str(status)))
+    registry.inc('wim_cache_hits_total', labels, stats.cache_hits)
+    registry.inc('wim_cache_misses_total', labels, stats.cache_misses)
+
+
+# ----------------------------------------------------------------------
+# Agrégation et exposition
+# ----------------------------------------------------------------------
+
+def process_alive(pid):
+    """Vrai si le processus existe encore (signal 0 : aucun envoi)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processus d'un autre utilisateur : il existe
+        pass
+    return True
+
+
+def worker_files():
+    """Fichiers des workers vivants ; ceux des processus terminés sont supprimés"""
+    paths = []
+    for path in metrics_dir().glob('metrics-*.json'):
+        try:
+            pid = int(path.stem.split('-', 1)[1])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not process_alive(pid):
+            # Worker redémarré : son PID ne reviendra pas, le fichier gonflerait les totaux
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            continue
+        paths.append(path)
+    return paths
+
+
+def collect():
+    """Fusionne les fichiers des workers vivants"""
+    histograms = defaultdict(dict)
+    counters = defaultdict(lambda: defaultdict(float))
+    for path in worker_files():
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for name, values in data.get('histograms', {}).items():
+            if name not in HISTOGRAMS:
+                continue
+            for key, series in values.items():
+                merged = histograms[name].get(key)
+                if merged is None:
+                    histograms[name][key] = {'buckets': list(series['buckets']), 'sum': series['sum'],
+                                             'count': series['count']}
+                else:
+                    merged['buckets'] = [a + b for a, b in zip(merged['buckets'], series['buckets'])]
+                    merged['sum'] += series['sum']
+                    merged['count'] += series['count']
+        for name, values in data.get('counters', {}).items():
+            for key, value in values.items():
+                counters[name][key] += value
+    return histograms, counters
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(histograms, counters):
+    """Texte d'exposition Prometheus"""
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        for key, series in sorted(histograms.get(name, {}).items()):
+            labels = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(buckets, series['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(dict(labels, le=str(bound)))} {cumulative}')
+            lines.append(f'{name}_bucket{format_labels(dict(labels, le="+Inf"))} {series["count"]}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_number(series["sum"])}')
+            lines.append(f'{name}_count{format_labels(labels)} {series["count"]}')
+    for name, description in COUNTERS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        for key, value in sorted(counters.get(name, {}).items()):
+            lines.append(f'{name}{format_labels(json.loads(key))} {format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Point d'exposition /metrics (adresses autorisées uniquement)"""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1']):
+        return HttpResponseForbidden()
+    # L'état du worker qui répond est écrit avant la fusion
+    registry.flush()
+    return HttpResponse(render(*collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,5 +1,13 @@
 # config/middleware.py
 
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics
+
+
 class HTMXMiddleware:
     """
     Middleware pour ajouter le support HTMX aux requêtes Django
@@ -19,4 +27,42 @@ class HTMXMiddleware:
         """
         Vérifie si la requête provient de HTMX
         """
-        return request.headers.get('HX-Request') == 'true'
\ No newline at end of file
+        return request.headers.get('HX-Request') == 'true'
+
+
+class MetricsMiddleware:
+    """
+    Middleware de mesure des performances : durée, requêtes SQL, rendu des
+    gabarits, cache et taille de réponse par route, requêtes HTMX et pages
+    complètes comptées séparément
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.install()
+
+    def __call__(self, request):
+        if request.path == '/metrics':
+            return self.get_response(request)
+
+        stats = metrics.begin()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.end()
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        labels = {
+            # Motif de l'URL (et non le chemin) pour borner le nombre de séries
+            'route': match.route if match is not None else 'unmatched',
+            'method': request.method,
+            'kind': 'htmx' if request.headers.get('HX-Request') == 'true' else 'page',
+        }
+        size = 0 if response.streaming else len(response.content)
+        metrics.record(labels, response.status_code, duration, stats, size)
+        return response
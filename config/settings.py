@@ -10,12 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
+import tempfile
 from pathlib import Path
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Lancement de la suite de tests (manage.py test)
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -60,6 +65,7 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -194,6 +200,80 @@ YOUTUBE_MAX_RESULTS = 50
 # Durée de cache des métadonnées YouTube (en secondes)
 YOUTUBE_CACHE_DURATION = 3600  # 1 heure
 
+# ============================================================================
+# CATALOGUE
+# ============================================================================
+
+# Instantané des cours publiés partagé entre les workers (fichier mappé en mémoire)
+CATALOG_SNAPSHOT_PATH = config('CATALOG_SNAPSHOT_PATH', default=str(BASE_DIR / 'var' / 'catalog_snapshot.npy'))
+
+# Délai de regroupement des reconstructions de l'instantané (en secondes)
+CATALOG_SNAPSHOT_REBUILD_DELAY = 2
+
+# Intervalle de reconstruction pour les seuls compteurs (inscrits, notes), en secondes :
+# retard maximal des tris par popularité et par note
+CATALOG_POPULARITY_REBUILD_INTERVAL = 60
+
+# Nombre de cours recommandés précalculés par utilisateur
+RECOMMENDATIONS_PER_USER = 12
+
+# Nombre de cours associés précalculés par cours
+RELATED_COURSES_PER_COURSE = 6
+
+# ============================================================================
+# PROGRESSION
+# ============================================================================
+
+# Intervalle d'écriture des battements de lecture vidéo en tampon (en secondes)
+PROGRESS_HEARTBEAT_FLUSH_INTERVAL = 10
+
+# Temps de lecture maximal compté pour un battement (en secondes)
+PROGRESS_HEARTBEAT_MAX_GAP = 60
+
+# Leçons distinctes en attente d'écriture par utilisateur et par worker
+PROGRESS_HEARTBEAT_MAX_PENDING_LESSONS = 10
+
+# Nombre maximal d'entrées par lot de synchronisation de progression
+PROGRESS_SYNC_MAX_ENTRIES = 500
+
+# Point de reprise de recompute_user_statistics --resume
+USER_STATISTICS_CHECKPOINT_PATH = config('USER_STATISTICS_CHECKPOINT_PATH',
+                                         default=str(BASE_DIR / 'var' / 'user_statistics.checkpoint'))
+
+# Inactivité au-delà de laquelle les événements d'étude ouvrent une nouvelle session (en secondes)
+PROGRESS_STUDY_SESSION_GAP = 30 * 60
+
+# ============================================================================
+# DASHBOARD
+# ============================================================================
+
+# Durée de fraîcheur par défaut des panneaux du tableau de bord (en secondes)
+DASHBOARD_SNAPSHOT_TTL = 5 * 60
+
+# Durée de fraîcheur propre à chaque panneau chargé via HTMX (en secondes)
+DASHBOARD_PANEL_TTL = {
+    'recent_courses': 60,
+    'recommendations': 60 * 60,
+    'recent_activity': 60,
+    'weekly_progress': 5 * 60,
+}
+
+# ============================================================================
+# MÉTRIQUES
+# ============================================================================
+
+# Dossier des fichiers de métriques (un par worker), fusionnés par /metrics
+METRICS_DIR = config('METRICS_DIR', default=str(BASE_DIR / 'var' / 'metrics'))
+if TESTING:
+    # Les requêtes des tests ne se mêlent pas aux métriques des workers
+    METRICS_DIR = str(Path(tempfile.gettempdir()) / 'wim-test-metrics')
+
+# Intervalle d'écriture des métriques de chaque worker (en secondes)
+METRICS_FLUSH_INTERVAL = 10
+
+# Adresses autorisées à lire /metrics
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1').split(',')
+
 # ============================================================================
 # GOOGLE OAUTH & ALLAUTH CONFIGURATION
 # ============================================================================
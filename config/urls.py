@@ -6,6 +6,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
+from config.metrics import metrics_view
+
 # ============================================================================
 # PERSONNALISATION DU SITE ADMIN
 # ============================================================================
@@ -27,6 +29,8 @@ urlpatterns = [
     path('enrollments/', include('apps.enrollments.urls')),
     path('progress/', include('apps.progress.urls')),
     path('certificates/', include('apps.certificates.urls')),
+    path('api/', include('apps.progress.api_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Configuration pour servir les fichiers média et statiques en développement
@@ -23,9 +23,23 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 // Video progress tracking
+// Last heartbeat per lesson: player position and wall-clock time
+const lastHeartbeats = {};
+
 function updateVideoProgress(lessonId, currentTime, duration) {
     const progress = (currentTime / duration) * 100;
 
+    // Seconds played since the previous beat: the position advance, never
+    // more than the real time elapsed (seeking forward is not watching)
+    const now = Date.now();
+    const last = lastHeartbeats[lessonId];
+    let watched = 0;
+    if (last) {
+        const elapsed = (now - last.at) / 1000;
+        watched = Math.min(Math.max(0, currentTime - last.time), elapsed);
+    }
+    lastHeartbeats[lessonId] = { time: currentTime, at: now };
+
     fetch(`/api/lessons/${lessonId}/progress/`, {
         method: 'POST',
         headers: {
@@ -34,7 +48,8 @@ function updateVideoProgress(lessonId, currentTime, duration) {
         },
         body: JSON.stringify({
             progress: progress,
-            current_time: currentTime
+            current_time: currentTime,
+            watched: watched
         })
     });
 }